@@ -1,9 +1,217 @@
 from openai import OpenAI
-import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.llm_cache import get_llm_cache, make_key, candidates_version
+from src.llm_client import get_llm_client
+from src.llm_router import LLMRouter, get_llm_router
+from src.llm_metrics import get_llm_metrics, usage_tokens
+from src.llm_json import (
+    LLMJSONError, parse_json_reply, repair_messages,
+    KEYWORDS_SCHEMA, SECTORS_SCHEMA, ETFS_SCHEMA, COMBINED_SCHEMA, BATCH_SCHEMA
+)
+from src.stream_json import IncrementalJSONScanner
 from src.utils import load_config, setup_logger
 
 logger = setup_logger('ETFAnalyzer')
 
+# Part of every LLM cache key; bump when a prompt changes so old answers aren't reused
+PROMPT_VERSION = 3
+
+
+def cached_prompt_tokens(usage):
+    """Prompt tokens served from the provider's prefix cache (DeepSeek or OpenAI usage fields)."""
+    return usage_tokens(usage)[1]
+
+
+def build_messages(instructions, catalogue, tweet_text):
+    """
+    Lay a request out for provider-side prefix caching: the static instructions and
+    candidate catalogue form a byte-stable leading system message shared by every
+    tweet, and only the short user message at the end changes.
+    """
+    system = instructions.strip()
+    if catalogue:
+        system += "\n\n" + catalogue.strip()
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": f'推文：\n"{tweet_text}"'}
+    ]
+
+
+def build_batch_messages(instructions, catalogue, tweet_texts):
+    """
+    Like build_messages for several tweets. They are numbered 1..n; short sequence
+    numbers instead of 19-digit tweet IDs, which models tend to garble.
+    """
+    messages = build_messages(instructions, catalogue, '')
+    messages[-1]['content'] = '推文列表：\n' + '\n'.join(
+        f'[{i}] "{text}"' for i, text in enumerate(tweet_texts, 1)
+    )
+    return messages
+
+
+def board_names(boards):
+    """Sector/concept names for the catalogue, sorted for a stable prefix."""
+    return sorted(b.get('板块名称', b.get('name', '')) for b in boards)
+
+
+KEYWORDS_INSTRUCTIONS = """
+你是一个精通金融投资和马斯克言论分析的助手。请分析用户给出的马斯克推文。
+
+任务：
+1. 理解推文在谈论什么（加密货币、电动车、太空探索、AI、政治、或其他）。如果是评论（Review context if available），请结合上下文分析。
+2. 用简短的中文总结推文核心内容（不超过50字）。
+3. 请推断如果我要在中国A股市场投资相关的ETF，应该搜索什么关键词？（3-5个最相关的中文关键词）
+
+格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
+{
+    "summary": "推文的中文总结",
+    "keywords": ["关键词1", "关键词2", "关键词3"]
+}
+
+如果推文完全是闲聊或无明确投资指向，keywords返回空数组 []，但summary仍需提供。
+"""
+
+SUMMARY_INSTRUCTIONS = """
+你是一个马斯克言论分析助手。请用简短的中文总结用户给出的马斯克推文（不超过50字），直接返回总结文本，不要包含其他内容。
+"""
+
+SECTORS_INSTRUCTIONS = """
+你是一个精通中国A股行业和概念分类的金融分析助手。请分析用户给出的马斯克推文，并从下面给定的行业和概念列表中找出最相关的。
+
+任务：
+1. 理解推文的核心内容
+2. 从行业列表中选择最相关的3个行业
+3. 从概念列表中选择最相关的3个概念
+
+格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
+{
+    "sectors": ["行业1", "行业2", "行业3"],
+    "concepts": ["概念1", "概念2", "概念3"]
+}
+
+注意事项：
+- 如果没有相关的行业，sectors返回空数组 []
+- 如果没有相关的概念，concepts返回空数组 []
+- 行业和概念名称必须完全匹配列表中的名称
+"""
+
+ETFS_INSTRUCTIONS = """
+你是一个精通中国A股ETF投资和马斯克言论分析的金融助手。请分析用户给出的马斯克推文，并从下面给定的ETF列表中选择最相关的3个。
+
+任务：
+1. 理解推文的核心内容和投资指向，用简短的中文总结（不超过50字）
+2. 从ETF列表中选择最相关的3个ETF
+3. 返回这3个ETF的代码（不是名称）
+
+格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
+{
+    "summary": "推文的中文总结",
+    "etf_codes": ["代码1", "代码2", "代码3"]
+}
+
+注意事项：
+- ETF代码必须是列表中存在的代码
+- 如果没有相关的ETF，etf_codes返回空数组 []，但summary仍需提供
+- 只返回ETF代码，不返回名称
+"""
+
+COMBINED_INSTRUCTIONS = """
+你是一个精通中国A股ETF、行业和概念分类以及马斯克言论分析的金融助手。请分析用户给出的马斯克推文，并从下面给定的ETF、行业和概念列表中找出最相关的。
+
+任务：
+1. 理解推文的核心内容和投资指向，用简短的中文总结（不超过50字）
+2. 从ETF列表中选择最相关的3个ETF，返回它们的代码（不是名称）
+3. 从行业列表中选择最相关的3个行业
+4. 从概念列表中选择最相关的3个概念
+
+格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
+{
+    "etf_codes": ["代码1", "代码2", "代码3"],
+    "sectors": ["行业1", "行业2", "行业3"],
+    "concepts": ["概念1", "概念2", "概念3"],
+    "summary": "推文的中文总结"
+}
+
+注意事项：
+- ETF代码必须是列表中存在的代码，只返回代码，不返回名称
+- 行业和概念名称必须完全匹配列表中的名称
+- 没有相关的ETF、行业或概念时，对应字段返回空数组 []，但summary仍需提供
+"""
+
+
+BATCH_INSTRUCTIONS = """
+你是一个精通中国A股ETF、行业和概念分类以及马斯克言论分析的金融助手。用户会一次给出多条带编号的马斯克推文，请逐条分析，并从下面给定的ETF、行业和概念列表中为每条推文找出最相关的。
+
+每条推文的任务：
+1. 从ETF列表中选择最相关的3个ETF，返回它们的代码（不是名称）
+2. 从行业列表中选择最相关的3个行业
+3. 从概念列表中选择最相关的3个概念
+4. 理解推文的核心内容和投资指向，用简短的中文总结（不超过50字）
+
+格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。results 中每条推文一项，id 为推文编号。
+{
+    "results": [
+        {
+            "id": 1,
+            "etf_codes": ["代码1", "代码2", "代码3"],
+            "sectors": ["行业1", "行业2", "行业3"],
+            "concepts": ["概念1", "概念2", "概念3"],
+            "summary": "推文的中文总结"
+        }
+    ]
+}
+
+注意事项：
+- 每条推文都必须返回一项，不要遗漏或合并
+- ETF代码必须是列表中存在的代码，只返回代码，不返回名称
+- 行业和概念名称必须完全匹配列表中的名称
+- 没有相关的ETF、行业或概念时，对应字段返回空数组 []，但summary仍需提供
+"""
+
+
+def etf_catalogue(etf_list):
+    """ETF list for the prompt, one "代码 名称" per line, sorted by code for a stable prefix."""
+    lines = sorted(f"{etf['code']} {etf['name']}" for etf in etf_list)
+    return "可用ETF列表（格式：代码 名称）：\n" + ('\n'.join(lines) or '（无）')
+
+
+def board_catalogue(sector_list, concept_list):
+    """Sector and concept lists for the prompt."""
+    return (f"可用行业列表：{', '.join(board_names(sector_list)) or '（无）'}\n\n"
+            f"可用概念列表：{', '.join(board_names(concept_list)) or '（无）'}")
+
+def combined_catalogue(etf_list, sector_list, concept_list):
+    """ETF, sector and concept catalogue of a combined request."""
+    return etf_catalogue(etf_list) + "\n\n" + board_catalogue(sector_list, concept_list)
+
+
+def combined_result(result):
+    """Normalize one parsed combined answer: string ETF codes, lists limited to top 3."""
+    analysis = {'summary': result.get('summary', '') or ''}
+    for key in ('etf_codes', 'sectors', 'concepts'):
+        values = result.get(key, [])
+        analysis[key] = values[:3] if isinstance(values, list) else []
+    analysis['etf_codes'] = [str(code) for code in analysis['etf_codes']]
+    return analysis
+
+
+def estimate_tokens(text):
+    """Rough token count: one per CJK character, one per four other characters."""
+    cjk = sum(1 for ch in text if '\u4e00' <= ch <= '\u9fff')
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def merge_candidates(lists, key):
+    """Union of several candidate lists, first occurrence wins."""
+    seen = {}
+    for items in lists:
+        for item in items:
+            seen.setdefault(key(item), item)
+    return list(seen.values())
+
+
 class ETFAnalyzer:
     def __init__(self):
         config = load_config()
@@ -13,70 +221,240 @@ class ETFAnalyzer:
             api_key=llm_conf.get('api_key')
         )
         self.model = llm_conf.get('model', 'gpt-3.5-turbo')
+        # Ask for response_format json_object; switched off if the provider rejects it
+        self.json_mode = llm_conf.get('json_mode', True)
+        # Token usage of the most recent request (for benchmarks and logging)
+        self.last_usage = None
+        self.usage_stats = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+        self.cache = get_llm_cache()
+        # Multi-provider router or async request layer (deadlines, retries, hedging);
+        # None uses the plain client
+        self.llm = get_llm_router() or get_llm_client()
+        self._usage_lock = threading.Lock()
+        # Per-call token usage, latency and cost ledger
+        self.metrics = get_llm_metrics()
+
+    def _json_mode_kwargs(self, json_mode):
+        return {'response_format': {'type': 'json_object'}} if json_mode and self.json_mode else {}
+
+    def _json_mode_rejected(self, error, kwargs):
+        """
+        True (and JSON mode off from now on) if the provider refused response_format.
+        Other 400s (context length, bad model name, ...) must not turn JSON mode off.
+        """
+        if not kwargs.get('response_format') or getattr(error, 'status_code', None) != 400:
+            return False
+        detail = f"{error} {getattr(error, 'body', '')}".lower()
+        if 'response_format' in detail or 'json_object' in detail:
+            logger.warning(f"Provider rejected JSON mode ({error}), continuing without it")
+            self.json_mode = False
+            return True
+        return False
+
+    def _complete(self, messages, call_type='chat', json_mode=False):
+        """Send a chat request, record its token usage and timing and return the reply text."""
+        start = time.perf_counter()
+        create = self.llm.create if self.llm is not None else self.client.chat.completions.create
+        kwargs = self._json_mode_kwargs(json_mode)
+        try:
+            response = create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
+                **kwargs
+            )
+        except Exception as e:
+            self.metrics.record(call_type, self.model, (time.perf_counter() - start) * 1000, ok=False)
+            if self._json_mode_rejected(e, kwargs):
+                return self._complete(messages, call_type)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._record_usage(call_type, getattr(response, 'usage', None), elapsed_ms)
+        return response.choices[0].message.content.strip()
+
+    def _complete_stream(self, messages, on_text, call_type='chat', json_mode=False):
+        """
+        Send a streaming chat request, pass every text delta to on_text as it
+        arrives, record token usage and timing and return the full reply text.
+        """
+        start = time.perf_counter()
+        first = []
+
+        def forward(text):
+            if not first:
+                first.append(time.perf_counter())
+            on_text(text)
+
+        kwargs = self._json_mode_kwargs(json_mode)
+        try:
+            if self.llm is not None:
+                text, usage = self.llm.stream(
+                    forward,
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+            else:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+                parts = []
+                usage = None
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        forward(chunk.choices[0].delta.content)
+                    if getattr(chunk, 'usage', None):
+                        usage = chunk.usage
+                text = ''.join(parts)
+        except Exception as e:
+            self.metrics.record(call_type, self.model, (time.perf_counter() - start) * 1000, ok=False)
+            if not first and self._json_mode_rejected(e, kwargs):
+                return self._complete_stream(messages, on_text, call_type)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        ttft_ms = (first[0] - start) * 1000 if first else None
+        self._record_usage(call_type, usage, elapsed_ms, ttft_ms)
+        return text.strip()
+
+    def _complete_json(self, messages, call_type, schema, on_text=None):
+        """
+        Request a JSON reply (JSON mode where supported) and parse it with
+        src/llm_json.py. A malformed reply gets one repair request that only
+        carries the broken text; if that is unparsable too LLMJSONError is raised.
+        Request errors (transport, status, deadline) propagate as they are.
+
+        Args:
+            messages: Chat messages
+            call_type: Call type for metrics
+            schema: Expected keys and types of the reply object
+            on_text: Stream the reply and pass each text delta to on_text
+
+        Returns:
+            Parsed reply dict
+        """
+        if on_text is not None:
+            content = self._complete_stream(messages, on_text, call_type, json_mode=True)
+        else:
+            content = self._complete(messages, call_type, json_mode=True)
+        try:
+            result = parse_json_reply(content, schema)
+            self.metrics.record_parse(call_type, 'ok')
+            return result
+        except LLMJSONError as e:
+            logger.warning(f"Malformed LLM {call_type} reply ({e}), requesting a repair: {content[:200]}")
+            error = e
+
+        try:
+            result = parse_json_reply(
+                self._complete(repair_messages(content, error, schema), 'repair', json_mode=True), schema
+            )
+        except LLMJSONError as e:
+            self.metrics.record_parse(call_type, 'failed')
+            raise LLMJSONError(f"unparsable {call_type} reply ({error}), repair failed: {e}")
+        except Exception:
+            # The repair request itself failed (transport, deadline): not a parse error
+            self.metrics.record_parse(call_type, 'failed')
+            raise
+        self.metrics.record_parse(call_type, 'repaired')
+        return result
+
+    def _record_usage(self, call_type, usage, elapsed_ms, ttft_ms=None):
+        self.last_usage = usage
+        self.metrics.record(call_type, self._answering_model(), elapsed_ms, usage, ttft_ms)
+        if usage is not None:
+            cached = cached_prompt_tokens(usage)
+            with self._usage_lock:
+                self.usage_stats['requests'] += 1
+                self.usage_stats['prompt_tokens'] += usage.prompt_tokens or 0
+                self.usage_stats['cached_tokens'] += cached
+                self.usage_stats['completion_tokens'] += usage.completion_tokens or 0
+            logger.info(f"LLM {call_type} request took {elapsed_ms:.0f} ms: {usage.prompt_tokens} prompt tokens "
+                        f"({cached} cached), {usage.completion_tokens} completion tokens")
+
+    def _answering_model(self):
+        """Model that answered this thread's last request (the router may have failed over to another)."""
+        if isinstance(self.llm, LLMRouter):
+            return self.llm.served_model() or self.model
+        return self.model
+
+    def _cache_key(self, task, tweet_text, candidates=(), model=None):
+        return make_key(task, tweet_text, PROMPT_VERSION, model or self.model, candidates_version(candidates))
+
+    def _cache_get(self, task, tweet_text, candidates=()):
+        """Cached result of any model the next request could be answered by, in the order it would try them."""
+        if self.cache is None:
+            return None
+        models = self.llm.models() if isinstance(self.llm, LLMRouter) else [self.model]
+        return self.cache.get_first([self._cache_key(task, tweet_text, candidates, model) for model in models])
+
+    def _cache_put(self, task, tweet_text, value, candidates=()):
+        """Cache a result under the model that produced it, so a failover answer isn't served as self.model's."""
+        if self.cache is not None:
+            self.cache.put(self._cache_key(task, tweet_text, candidates, self._answering_model()), value)
+
+    @staticmethod
+    def _item_scanner(on_item, limit=3):
+        """Scanner that forwards the first `limit` elements of each list field to on_item."""
+        def forward(key, value):
+            if key in ('etf_codes', 'sectors', 'concepts') and len(scanner.items[key]) <= limit:
+                on_item(key, str(value) if key == 'etf_codes' else value)
+        scanner = IncrementalJSONScanner(on_item=forward)
+        return scanner
 
     def analyze_tweet(self, tweet_text):
         """
         Analyze tweet text and return a list of related ETF keywords.
         """
         logger.info(f"Analyzing tweet: {tweet_text[:50]}...")
-        
-        prompt = f"""
-请分析这条马斯克的推文：
-"{tweet_text}"
 
-任务：
-1. 理解推文在谈论什么（加密货币、电动车、太空探索、AI、政治、或其他）。如果是评论（Review context if available），请结合上下文分析。
-2. 用简短的中文总结推文核心内容（不超过50字）。
-3. 请推断如果我要在中国A股市场投资相关的ETF，应该搜索什么关键词？（3-5个最相关的中文关键词）
+        cached = self._cache_get('keywords', tweet_text)
+        if cached is not None:
+            logger.info(f"LLM cache hit, keywords: {cached[0]}")
+            return tuple(cached)
+        
+        messages = build_messages(KEYWORDS_INSTRUCTIONS, '', tweet_text)
+        try:
+            result = self._complete_json(messages, 'keywords', KEYWORDS_SCHEMA)
+            keywords = result['keywords']
+            summary = result['summary']
 
-格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
-{{
-    "summary": "推文的中文总结",
-    "keywords": ["关键词1", "关键词2", "关键词3"]
-}}
+            logger.info(f"Extracted keywords: {keywords}, Summary: {summary}")
+            self._cache_put('keywords', tweet_text, [keywords, summary])
+            return keywords, summary
 
-如果推文完全是闲聊或无明确投资指向，keywords返回空数组 []，但summary仍需提供。
-"""
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个精通金融投资和马斯克言论分析的助手。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            
-            content = response.choices[0].message.content.strip()
-            # Clean up potential markdown code blocks
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            content = content.strip()
-            
-            result = json.loads(content)
-            keywords = result.get('keywords', [])
-            summary = result.get('summary', '')
-            
-            if isinstance(keywords, list):
-                logger.info(f"Extracted keywords: {keywords}, Summary: {summary}")
-                return keywords, summary
-            else:
-                logger.warning(f"LLM returned unexpected keywords format: {content}")
-                return [], ""
-                
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse LLM JSON response: {content}")
-            return [], ""
-                
         except Exception as e:
             logger.error(f"LLM analysis failed: {e}")
             return [], ""
 
+    def summarize(self, tweet_text):
+        """
+        Short Chinese summary of a tweet, without any ETF/sector selection
+        (the cheap request for tweets the relevance gate filtered out).
+
+        Returns:
+            Summary string ("" on failure)
+        """
+        cached = self._cache_get('summary', tweet_text)
+        if cached is not None:
+            return cached
+
+        messages = build_messages(SUMMARY_INSTRUCTIONS, '', tweet_text)
+        try:
+            summary = self._complete(messages, 'summary').strip('"')
+            self._cache_put('summary', tweet_text, summary)
+            return summary
+        except Exception as e:
+            logger.error(f"LLM summary failed: {e}")
+            return ""
+
     def analyze_relevant_sectors(self, tweet_text, sector_list, concept_list):
         """
         Analyze tweet and identify relevant sectors and concepts.
@@ -92,81 +470,25 @@ class ETFAnalyzer:
         """
         logger.info(f"Analyzing relevant sectors for tweet: {tweet_text[:50]}...")
 
-        # Extract sector/concept names
-        sector_names = [s.get('板块名称', s.get('name', '')) for s in sector_list]
-        concept_names = [c.get('板块名称', c.get('name', '')) for c in concept_list]
-
-        # Limit to avoid token overflow - take first 500 each
-        sector_names_str = ', '.join(sector_names[:500])
-        concept_names_str = ', '.join(concept_names[:500])
-
-        prompt = f"""
-请分析这条马斯克的推文，并从给定的行业和概念列表中找出最相关的：
-"{tweet_text}"
+        catalogue = board_catalogue(sector_list, concept_list)
 
-可用行业列表：{sector_names_str}
-
-可用概念列表：{concept_names_str}
-
-任务：
-1. 理解推文的核心内容
-2. 从行业列表中选择最相关的3个行业
-3. 从概念列表中选择最相关的3个概念
+        cached = self._cache_get('sectors', tweet_text, catalogue)
+        if cached is not None:
+            logger.info(f"LLM cache hit, sectors: {cached['sectors']}, concepts: {cached['concepts']}")
+            return cached
 
-格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
-{{
-    "sectors": ["行业1", "行业2", "行业3"],
-    "concepts": ["概念1", "概念2", "概念3"]
-}}
-
-注意事项：
-- 如果没有相关的行业，sectors返回空数组 []
-- 如果没有相关的概念，concepts返回空数组 []
-- 行业和概念名称必须完全匹配列表中的名称
-"""
+        messages = build_messages(SECTORS_INSTRUCTIONS, catalogue, tweet_text)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个精通中国A股行业和概念分类的金融分析助手。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-
-            content = response.choices[0].message.content.strip()
-            # Clean up potential markdown code blocks
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-
-            content = content.strip()
-
-            result = json.loads(content)
-            sectors = result.get('sectors', [])
-            concepts = result.get('concepts', [])
-
-            # Ensure they are lists
-            if not isinstance(sectors, list):
-                sectors = []
-            if not isinstance(concepts, list):
-                concepts = []
-
+            result = self._complete_json(messages, 'sectors', SECTORS_SCHEMA)
             # Limit to top 3 each
-            sectors = sectors[:3]
-            concepts = concepts[:3]
+            sectors = result['sectors'][:3]
+            concepts = result['concepts'][:3]
 
             logger.info(f"Extracted sectors: {sectors}, concepts: {concepts}")
+            self._cache_put('sectors', tweet_text, {'sectors': sectors, 'concepts': concepts}, catalogue)
             return {'sectors': sectors, 'concepts': concepts}
 
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse LLM JSON response: {content}")
-            return {'sectors': [], 'concepts': []}
-
         except Exception as e:
             logger.error(f"LLM sector analysis failed: {e}")
             return {'sectors': [], 'concepts': []}
@@ -187,73 +509,190 @@ class ETFAnalyzer:
         """
         logger.info(f"Analyzing relevant ETFs for tweet: {tweet_text[:50]}...")
 
-        # Format ETF list for the prompt: "代码 名称"
-        etf_entries = [f"{etf['code']} {etf['name']}" for etf in etf_list]
-        etf_list_str = '\n'.join(etf_entries)
+        catalogue = etf_catalogue(etf_list)
 
-        prompt = f"""
-请分析这条马斯克的推文，并从给定的ETF列表中选择最相关的3个：
-"{tweet_text}"
+        cached = self._cache_get('etfs', tweet_text, catalogue)
+        if cached is not None:
+            logger.info(f"LLM cache hit, ETF codes: {cached[1]}")
+            return tuple(cached)
 
-可用ETF列表（格式：代码 名称）：
-{etf_list_str}
+        messages = build_messages(ETFS_INSTRUCTIONS, catalogue, tweet_text)
 
-任务：
-1. 理解推文的核心内容和投资指向，用简短的中文总结（不超过50字）
-2. 从ETF列表中选择最相关的3个ETF
-3. 返回这3个ETF的代码（不是名称）
+        try:
+            result = self._complete_json(messages, 'etfs', ETFS_SCHEMA)
+            summary = result['summary']
+            # Limit to top 3
+            etf_codes = [str(code) for code in result['etf_codes'][:3]]
 
-格式要求：请直接返回一个JSON对象，不要包含markdown格式或其他废话。
-{{
-    "summary": "推文的中文总结",
-    "etf_codes": ["代码1", "代码2", "代码3"]
-}}
+            logger.info(f"Summary: {summary}, Selected ETF codes: {etf_codes}")
+            self._cache_put('etfs', tweet_text, [summary, etf_codes], catalogue)
+            return summary, etf_codes
 
-注意事项：
-- ETF代码必须是列表中存在的代码
-- 如果没有相关的ETF，etf_codes返回空数组 []，但summary仍需提供
-- 只返回ETF代码，不返回名称
-"""
+        except Exception as e:
+            logger.error(f"LLM ETF selection failed: {e}")
+            return "", []
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个精通中国A股ETF投资和马斯克言论分析的金融助手。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
+    def analyze_combined(self, tweet_text, etf_list, sector_list, concept_list, on_item=None):
+        """
+        Select relevant ETFs, sectors and concepts for a tweet in one request
+        (replaces analyze_relevant_etfs + analyze_relevant_sectors).
+
+        Args:
+            tweet_text: Tweet content to analyze
+            etf_list: List of available ETFs, each as a dict with 'code' and 'name' keys
+            sector_list: List of available sectors
+            concept_list: List of available concepts
+            on_item: Optional callback on_item(key, value). When given, the reply is
+                streamed and the callback fires for each ETF code, sector and concept
+                (key 'etf_codes', 'sectors' or 'concepts') as soon as it is complete,
+                before the rest of the reply arrives
 
-            content = response.choices[0].message.content.strip()
-            # Clean up potential markdown code blocks
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
+        Returns:
+            Dict with 'summary' (string), 'etf_codes', 'sectors' and 'concepts' (top 3 each)
+            e.g., {'summary': '马斯克谈论特斯拉销量创新高', 'etf_codes': ['159123'],
+                   'sectors': ['汽车整车'], 'concepts': ['特斯拉']}
+        """
+        logger.info(f"Analyzing tweet (combined): {tweet_text[:50]}...")
+        empty = {'summary': '', 'etf_codes': [], 'sectors': [], 'concepts': []}
 
-            content = content.strip()
+        catalogue = combined_catalogue(etf_list, sector_list, concept_list)
 
-            result = json.loads(content)
-            summary = result.get('summary', '')
-            etf_codes = result.get('etf_codes', [])
+        cached = self._cache_get('combined', tweet_text, catalogue)
+        if cached is not None:
+            logger.info(f"LLM cache hit, ETF codes: {cached['etf_codes']}, "
+                        f"sectors: {cached['sectors']}, concepts: {cached['concepts']}")
+            if on_item is not None:
+                for key in ('etf_codes', 'sectors', 'concepts'):
+                    for value in cached[key]:
+                        on_item(key, value)
+            return cached
 
-            # Ensure types
-            if not isinstance(etf_codes, list):
-                etf_codes = []
+        messages = build_messages(COMBINED_INSTRUCTIONS, catalogue, tweet_text)
 
-            # Limit to top 3
-            etf_codes = etf_codes[:3]
+        try:
+            on_text = self._item_scanner(on_item).feed if on_item is not None else None
+            analysis = combined_result(self._complete_json(messages, 'combined', COMBINED_SCHEMA, on_text))
 
-            logger.info(f"Summary: {summary}, Selected ETF codes: {etf_codes}")
-            return summary, etf_codes
+            logger.info(f"Summary: {analysis['summary']}, ETF codes: {analysis['etf_codes']}, "
+                        f"sectors: {analysis['sectors']}, concepts: {analysis['concepts']}")
+            self._cache_put('combined', tweet_text, analysis, catalogue)
+            return analysis
 
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse LLM JSON response: {content}")
-            return "", []
+        except Exception as e:
+            logger.error(f"LLM combined analysis failed: {e}")
+            return empty
 
+    def analyze_combined_batch(self, tweets, max_batch=8, max_tokens=8000):
+        """
+        Analyze several tweets with as few requests as possible: tweets are packed
+        into batches of at most max_batch tweets and about max_tokens prompt tokens,
+        each batch is one request against the union of its tweets' candidates, and a
+        batch whose reply can't be parsed is split in half and retried.
+
+        Args:
+            tweets: List of dicts with 'id', 'text' and the tweet's candidate lists
+                'etf_list', 'sector_list' and 'concept_list'
+            max_batch: Maximum number of tweets per request
+            max_tokens: Approximate prompt token budget per request
+
+        Returns:
+            Dict mapping tweet id to an analyze_combined result; tweets whose
+            analysis failed are missing
+        """
+        results = {}
+        pending = []
+        for tweet in tweets:
+            catalogue = combined_catalogue(tweet['etf_list'], tweet['sector_list'], tweet['concept_list'])
+            cached = self._cache_get('combined', tweet['text'], catalogue)
+            if cached is not None:
+                results[tweet['id']] = cached
+            else:
+                pending.append(tweet)
+        if results:
+            logger.info(f"LLM cache hit for {len(results)}/{len(tweets)} tweets of the batch")
+
+        batches, batch = [], []
+        for tweet in pending:
+            if batch and (len(batch) >= max_batch or
+                          estimate_tokens(self._batch_prompt(batch + [tweet])) > max_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(tweet)
+        if batch:
+            batches.append(batch)
+
+        if self.llm is not None and len(batches) > 1:
+            # The async layer bounds how many of these are actually in flight
+            with ThreadPoolExecutor(max_workers=self.llm.concurrency) as executor:
+                for batch_results in executor.map(self._try_batch, batches):
+                    results.update(batch_results)
+        else:
+            for batch in batches:
+                results.update(self._try_batch(batch))
+        return results
+
+    def _try_batch(self, batch):
+        """_analyze_batch, with a failed request logged and its tweets left without results."""
+        try:
+            return self._analyze_batch(batch)
         except Exception as e:
-            logger.error(f"LLM ETF selection failed: {e}")
-            return "", []
+            logger.error(f"LLM batch analysis of {len(batch)} tweets failed: {e}")
+            return {}
+
+    @staticmethod
+    def _batch_catalogue(batch):
+        return combined_catalogue(
+            merge_candidates((t['etf_list'] for t in batch), key=lambda e: e['code']),
+            merge_candidates((t['sector_list'] for t in batch), key=lambda b: b.get('板块名称', b.get('name', ''))),
+            merge_candidates((t['concept_list'] for t in batch), key=lambda b: b.get('板块名称', b.get('name', '')))
+        )
+
+    def _batch_prompt(self, batch):
+        """Full prompt text of a batch (for the token budget)."""
+        messages = build_batch_messages(BATCH_INSTRUCTIONS, self._batch_catalogue(batch), [t['text'] for t in batch])
+        return ''.join(m['content'] for m in messages)
+
+    def _analyze_batch(self, batch):
+        """One batch request; split and retry on unparsable or incomplete replies."""
+        if len(batch) == 1:
+            tweet = batch[0]
+            analysis = self.analyze_combined(tweet['text'], tweet['etf_list'], tweet['sector_list'], tweet['concept_list'])
+            return {tweet['id']: analysis} if analysis.get('summary') or analysis.get('etf_codes') else {}
+
+        logger.info(f"Analyzing {len(batch)} tweets in one request")
+        messages = build_batch_messages(BATCH_INSTRUCTIONS, self._batch_catalogue(batch), [t['text'] for t in batch])
+
+        results = {}
+        try:
+            reply = self._complete_json(messages, 'combined_batch', BATCH_SCHEMA)
+        except LLMJSONError as e:
+            # Only an unusable reply is worth splitting; transport, auth and deadline errors propagate
+            logger.error(f"LLM batch analysis of {len(batch)} tweets failed: {e}")
+            reply = {'results': []}
+        for item in reply['results']:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get('id')) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(batch):
+                results[batch[index]['id']] = combined_result(item)
+
+        if not results:
+            # Nothing usable: split in half and retry each part
+            middle = len(batch) // 2
+            logger.info(f"Splitting batch of {len(batch)} tweets and retrying")
+            return {**self._analyze_batch(batch[:middle]), **self._analyze_batch(batch[middle:])}
+
+        for tweet in batch:
+            if tweet['id'] in results:
+                # Cached under the tweet's own candidates, where analyze_combined looks it up
+                catalogue = combined_catalogue(tweet['etf_list'], tweet['sector_list'], tweet['concept_list'])
+                self._cache_put('combined', tweet['text'], results[tweet['id']], catalogue)
+        missing = [t for t in batch if t['id'] not in results]
+        if missing:
+            logger.warning(f"Batch reply is missing {len(missing)} of {len(batch)} tweets, retrying them")
+            results.update(self._analyze_batch(missing))
+        logger.info(f"Batch analysis returned results for {len(results)}/{len(batch)} tweets")
+        return results
@@ -0,0 +1,205 @@
+"""
+Concurrent multi-account scraping on the Playwright async API.
+All accounts are fetched at once, each in its own context of the shared
+BrowserManager's Chromium, so cycle latency follows the slowest account
+instead of the sum. Only the browser and network waits differ from
+TwitterMonitor; entry parsing and processing are inherited from it.
+"""
+
+import asyncio
+import time
+from src.browser import get_browser_manager
+from src.monitor import TwitterMonitor, RSSUnavailableError, PARENT_TWEET_JS, TIMELINE_ITEMS_JS
+from src.utils import load_config, setup_logger
+
+logger = setup_logger('AsyncMonitor')
+
+
+class AsyncTwitterMonitor(TwitterMonitor):
+    """TwitterMonitor whose browser work runs on the async API of the shared browser."""
+
+    def __init__(self, account, browser_manager=None):
+        super().__init__(account=account, browser_manager=browser_manager)
+
+    async def fetch_tweets_async(self):
+        for instance in self._ordered_instances():
+            if self._rss_enabled(instance):
+                try:
+                    # RSS is a plain HTTP request; keep it off the event loop
+                    download = await asyncio.to_thread(self._download_rss, instance)
+                    if download is None:
+                        return []
+                    resp, digest = download
+                    entries = self._parse_rss_entries(resp, instance)
+                    new_tweets = await self._process_entries_async(entries, instance)
+                    self._store_rss_validators(instance, resp, digest)
+                    return new_tweets
+                except RSSUnavailableError as e:
+                    self._disable_rss(instance, e)
+                except Exception as e:
+                    self._fetch_failed(instance, e, 'rss')
+                    continue
+
+            if self.fetch_mode == 'rss':
+                continue
+
+            try:
+                return await self._fetch_browser_async(instance)
+            except Exception as e:
+                self._fetch_failed(instance, e, 'browser')
+
+        return []
+
+    async def _fetch_browser_async(self, instance):
+        """Async counterpart of TwitterMonitor._fetch_browser."""
+        url = self.get_profile_url(instance)
+        logger.info(f"Trying to fetch tweets from {url}")
+        context = await self.browser_manager.async_new_context(first_party=instance)
+        try:
+            page = await self.browser_manager.async_new_page(context)
+            timeout_ms = self.health.timeout_for(instance, 'browser')
+            start = time.perf_counter()
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=timeout_ms)
+            self._check_status(response, url)
+            await page.wait_for_selector('.timeline-item', timeout=timeout_ms)
+            self.health.record_success(instance, (time.perf_counter() - start) * 1000, 'browser')
+
+            timeline = self._read_timeline(await page.evaluate(TIMELINE_ITEMS_JS, self._scan_args()), instance, url)
+            if timeline is None:
+                return []
+            entries, digest = timeline
+            new_tweets = await self._process_entries_async(entries, instance, context)
+            self.validators.update(url, digest)
+            return new_tweets
+        finally:
+            await context.close()
+
+    async def _process_entries_async(self, entries, instance, context=None):
+        """Async counterpart of TwitterMonitor._process_entries."""
+        new_entries = self._select_new_entries(entries)
+        parent_texts, failed, deadline_at = await asyncio.to_thread(
+            self._resolve_reply_contexts, new_entries, instance
+        )
+
+        if failed:
+            own_context = None
+            try:
+                for i, (tweet_id, full_link) in enumerate(failed):
+                    if not self._has_reply_time(deadline_at, len(failed) - i):
+                        break
+                    if context is None and own_context is None:
+                        own_context = await self.browser_manager.async_new_context(first_party=instance)
+                    parent_texts[tweet_id] = await self._fetch_reply_context_async(
+                        context or own_context, tweet_id, full_link, deadline_at
+                    )
+            finally:
+                if own_context is not None:
+                    await own_context.close()
+
+        return self._finish_entries(new_entries, instance, parent_texts)
+
+    async def _fetch_reply_context_async(self, context, tweet_id, full_link, deadline_at):
+        logger.info(f"Tweet {tweet_id} is a reply. Fetching context...")
+        detail_page = None
+        try:
+            detail_page = await self.browser_manager.async_new_page(context)
+            await detail_page.goto(full_link, wait_until='domcontentloaded',
+                                   timeout=self._step_timeout(deadline_at, 30000))
+            await detail_page.wait_for_selector('.main-tweet',
+                                                timeout=self._step_timeout(deadline_at, 10000))
+            return self._parent_found(tweet_id, await detail_page.evaluate(PARENT_TWEET_JS))
+
+        except Exception as e:
+            logger.error(f"Failed to fetch context for {tweet_id}: {e}")
+            return None
+
+        finally:
+            if detail_page is not None:
+                await detail_page.close()
+
+
+class AsyncMonitorRunner:
+    def __init__(self, concurrency=4, account_timeout=90, browser_manager=None):
+        """
+        Own an event loop that lives across job() calls.
+
+        Args:
+            concurrency: Maximum number of accounts scraped at the same time
+            account_timeout: Seconds before an account's fetch is abandoned for this cycle
+            browser_manager: BrowserManager whose browser the contexts are opened on
+        """
+        self.concurrency = concurrency
+        self.account_timeout = account_timeout
+        self.browser_manager = browser_manager or get_browser_manager()
+        self.loop = asyncio.new_event_loop()
+
+    async def _fetch_account(self, semaphore, account):
+        async with semaphore:
+            monitor = AsyncTwitterMonitor(account, self.browser_manager)
+            try:
+                new_tweets = await asyncio.wait_for(monitor.fetch_tweets_async(), self.account_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Fetching {account} timed out after {self.account_timeout}s")
+                return []
+            except Exception as e:
+                logger.error(f"Error fetching {account}: {e}")
+                return []
+            for t in new_tweets:
+                t.setdefault("author", account)
+            return new_tweets
+
+    async def _fetch_all(self, accounts):
+        # Between cycles no context is open, so the browser can be recycled safely
+        await self.browser_manager.recycle_async()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._fetch_account(semaphore, a) for a in accounts))
+        return [t for new_tweets in results for t in new_tweets]
+
+    def fetch_all(self, accounts):
+        """
+        Fetch all accounts concurrently.
+
+        Returns:
+            Merged list of new tweet dicts, in account order
+        """
+        start = time.perf_counter()
+        # One Chromium process: stop the sync browser and driver (if the sync path ran) here,
+        # outside the event loop, where the sync Playwright API may still be called
+        self.browser_manager.close()
+        all_new_tweets = self.loop.run_until_complete(self._fetch_all(accounts))
+        logger.info(f"Fetched {len(accounts)} accounts concurrently in {time.perf_counter() - start:.1f}s")
+        return all_new_tweets
+
+    def close(self):
+        try:
+            # The async browser handles belong to this loop
+            self.loop.run_until_complete(self.browser_manager.aclose())
+        except Exception as e:
+            logger.warning(f"Error closing async browser: {e}")
+        finally:
+            self.loop.close()
+
+
+# Global async runner instance
+_async_runner = None
+
+
+def get_async_runner():
+    """Get or create global async monitor runner."""
+    global _async_runner
+    if _async_runner is None:
+        async_conf = load_config().get('async_fetch', {})
+        _async_runner = AsyncMonitorRunner(
+            concurrency=async_conf.get('concurrency', 4),
+            account_timeout=async_conf.get('account_timeout', 90),
+            browser_manager=get_browser_manager()
+        )
+    return _async_runner
+
+
+def close_async_runner():
+    """Close the global async runner if it was created."""
+    global _async_runner
+    if _async_runner is not None:
+        _async_runner.close()
+        _async_runner = None
@@ -0,0 +1,306 @@
+"""
+Long-lived Chromium manager shared by all Twitter monitors.
+Owns one browser process for the whole daemon and recycles it after a crash
+or after a configurable number of pages. The concurrent fetch path
+(src/async_monitor.py) gets its contexts here too, from the same browser
+process driven through the Playwright async API.
+"""
+
+import time
+import asyncio
+from urllib.parse import urlparse
+from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+from src.utils import load_config, setup_logger
+
+logger = setup_logger('BrowserManager')
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Resource types the monitor never needs: it only reads text and a few attributes
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+
+def should_block(url, resource_type, first_party_host, allow_list=()):
+    """
+    Decide whether the lean scraping profile aborts a request.
+
+    Args:
+        url: Request URL
+        resource_type: Playwright resource type ('document', 'image', ...)
+        first_party_host: Host of the Nitter instance being scraped
+        allow_list: Resource types or URL substrings that are always let through (for debugging)
+
+    Returns:
+        True if the request should be aborted
+    """
+    for allowed in allow_list:
+        if resource_type == allowed or allowed in url:
+            return False
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(url).hostname
+    return bool(first_party_host and host and host != first_party_host)
+
+
+class BrowserManager:
+    def __init__(self, headless=True, max_pages=200, user_agent=DEFAULT_USER_AGENT,
+                 block_resources=True, allow_list=()):
+        """
+        Initialize browser manager. The browser is launched lazily on first use.
+
+        Args:
+            headless: Run Chromium headless
+            max_pages: Restart the browser after this many pages (0 disables recycling)
+            user_agent: Default user agent for new contexts
+            block_resources: Abort images, media, fonts, stylesheets and third-party requests
+            allow_list: Resource types or URL substrings exempt from blocking
+        """
+        self.headless = headless
+        self.max_pages = max_pages
+        self.user_agent = user_agent
+        self.block_resources = block_resources
+        self.allow_list = tuple(allow_list)
+
+        self._playwright = None
+        self._browser = None
+        self._pages_since_launch = 0
+        # Async API handles (only used by the concurrent fetch path)
+        self._async_playwright = None
+        self._async_browser = None
+        self._async_lock = None
+
+        self.stats = {
+            'launches': 0,
+            'restarts': 0,
+            'pages': 0,
+            'last_launch_ms': 0.0,
+            'total_launch_ms': 0.0,
+            'total_acquire_ms': 0.0,
+        }
+
+    def _launch(self):
+        """Start Playwright (if needed) and launch a fresh Chromium process."""
+        start = time.perf_counter()
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=self.headless)
+        self._record_launch(start)
+
+    def _record_launch(self, start):
+        self._pages_since_launch = 0
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats['launches'] += 1
+        self.stats['last_launch_ms'] = elapsed_ms
+        self.stats['total_launch_ms'] += elapsed_ms
+        logger.info(f"Chromium launched in {elapsed_ms:.0f} ms (launch #{self.stats['launches']})")
+
+    def _should_recycle(self):
+        return bool(self.max_pages) and self._pages_since_launch >= self.max_pages
+
+    def _should_block(self, first_party):
+        """Request filter of a context loading first_party (None when nothing is blocked)."""
+        if not self.block_resources:
+            return None
+        first_party_host = urlparse(first_party).hostname if first_party else None
+        return lambda request: should_block(request.url, request.resource_type, first_party_host, self.allow_list)
+
+    def _close_browser(self):
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+            self._browser = None
+
+    def restart(self, reason=""):
+        """Close the current browser process and launch a new one."""
+        logger.info(f"Restarting browser{': ' + reason if reason else ''}")
+        self._close_browser()
+        self.stats['restarts'] += 1
+        self._launch()
+
+    def _ensure_browser(self):
+        """Make sure a healthy browser is running, recycling it when needed."""
+        if self._browser is None:
+            self._launch()
+        elif not self._browser.is_connected():
+            self.restart("browser disconnected")
+        elif self._should_recycle():
+            self.restart(f"served {self._pages_since_launch} pages")
+        return self._browser
+
+    def new_context(self, first_party=None, **kwargs):
+        """
+        Create a new browser context on the shared browser.
+
+        Keyword arguments are passed to browser.new_context(); user_agent and
+        ignore_https_errors get sensible defaults. The caller owns the context
+        and must close it.
+
+        Args:
+            first_party: URL of the Nitter instance the context will load; requests
+                to other hosts are blocked when block_resources is on
+        """
+        kwargs.setdefault('user_agent', self.user_agent)
+        kwargs.setdefault('ignore_https_errors', True)
+
+        browser = self._ensure_browser()
+        try:
+            context = browser.new_context(**kwargs)
+        except Exception as e:
+            # Most likely the browser crashed between polls; retry once on a fresh process
+            logger.warning(f"new_context failed ({e}), relaunching browser")
+            self.restart("new_context failed")
+            context = self._browser.new_context(**kwargs)
+
+        blocked = self._should_block(first_party)
+        if blocked is not None:
+            def handle(route):
+                if blocked(route.request):
+                    route.abort()
+                else:
+                    route.continue_()
+
+            context.route("**/*", handle)
+        return context
+
+    def new_page(self, context):
+        """Open a new page in the given context and record acquire latency."""
+        start = time.perf_counter()
+        page = context.new_page()
+        self._record_page(start)
+        return page
+
+    async def _ensure_async_browser(self):
+        """
+        Async counterpart of _ensure_browser. The sync browser must already be closed
+        (AsyncMonitorRunner does that before entering its loop): the sync Playwright
+        API can't be driven from inside a running event loop.
+        """
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if self._async_browser is not None and self._async_browser.is_connected():
+                return self._async_browser
+            if self._async_browser is not None:
+                logger.info("Restarting browser: browser disconnected")
+                self.stats['restarts'] += 1
+            start = time.perf_counter()
+            if self._async_playwright is None:
+                self._async_playwright = await async_playwright().start()
+            self._async_browser = await self._async_playwright.chromium.launch(headless=self.headless)
+            self._record_launch(start)
+            return self._async_browser
+
+    async def recycle_async(self):
+        """
+        Restart the async browser if it served max_pages. Only call this between
+        fetch cycles: contexts still open on the old process would break.
+        """
+        if self._async_browser is not None and self._should_recycle():
+            logger.info(f"Restarting browser: served {self._pages_since_launch} pages")
+            await self._close_async_browser()
+            self.stats['restarts'] += 1
+
+    async def async_new_context(self, first_party=None, **kwargs):
+        """new_context() for the async API (awaited on the caller's event loop)."""
+        kwargs.setdefault('user_agent', self.user_agent)
+        kwargs.setdefault('ignore_https_errors', True)
+
+        browser = await self._ensure_async_browser()
+        context = await browser.new_context(**kwargs)
+
+        blocked = self._should_block(first_party)
+        if blocked is not None:
+            async def handle(route):
+                if blocked(route.request):
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route("**/*", handle)
+        return context
+
+    async def async_new_page(self, context):
+        """new_page() for the async API."""
+        start = time.perf_counter()
+        page = await context.new_page()
+        self._record_page(start)
+        return page
+
+    async def _close_async_browser(self):
+        if self._async_browser is not None:
+            try:
+                await self._async_browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+            self._async_browser = None
+
+    async def aclose(self):
+        """Close the async browser and stop the async Playwright driver."""
+        await self._close_async_browser()
+        if self._async_playwright is not None:
+            try:
+                await self._async_playwright.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping Playwright: {e}")
+            self._async_playwright = None
+        self._async_lock = None
+
+    def _record_page(self, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._pages_since_launch += 1
+        self.stats['pages'] += 1
+        self.stats['total_acquire_ms'] += elapsed_ms
+        logger.debug(f"Page acquired in {elapsed_ms:.1f} ms")
+
+    def get_stats(self):
+        """Return launch and page-acquire latency statistics."""
+        launches = self.stats['launches']
+        pages = self.stats['pages']
+        return {
+            **self.stats,
+            'avg_launch_ms': self.stats['total_launch_ms'] / launches if launches else 0.0,
+            'avg_acquire_ms': self.stats['total_acquire_ms'] / pages if pages else 0.0,
+            'pages_since_launch': self._pages_since_launch,
+        }
+
+    def close(self):
+        """Close the browser and stop Playwright."""
+        self._close_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping Playwright: {e}")
+            self._playwright = None
+
+
+# Global browser manager instance
+_browser_manager = None
+
+
+def get_browser_manager():
+    """Get or create global browser manager instance."""
+    global _browser_manager
+    if _browser_manager is None:
+        try:
+            browser_conf = load_config().get('browser', {})
+        except FileNotFoundError:
+            browser_conf = {}
+        _browser_manager = BrowserManager(
+            headless=browser_conf.get('headless', True),
+            max_pages=browser_conf.get('max_pages_per_browser', 200),
+            block_resources=browser_conf.get('block_resources', True),
+            allow_list=browser_conf.get('resource_allow_list', [])
+        )
+    return _browser_manager
+
+
+def close_browser_manager():
+    """Close the global browser manager if it was started."""
+    global _browser_manager
+    if _browser_manager is not None:
+        _browser_manager.close()
+        _browser_manager = None
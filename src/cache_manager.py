@@ -110,6 +110,18 @@ class CacheManager:
 
         return data
 
+    def get_cached(self, cache_key, file_type='json'):
+        """
+        Return cached data even if expired, without fetching.
+
+        Returns:
+            Cached data, or None if nothing is cached for the key
+        """
+        cache_file = self._get_cache_file_path(cache_key, file_type)
+        if not os.path.exists(cache_file):
+            return None
+        return self._load(cache_file, file_type)
+
     def _load(self, cache_file, file_type):
         """Load data from cache file."""
         try:
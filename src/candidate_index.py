@@ -0,0 +1,231 @@
+"""
+Local candidate retrieval for LLM prompts.
+A small BM25 index over character bigrams of candidate names (ETF names,
+sector/concept names), queried with the tweet text plus a bilingual
+topic-to-keyword expansion table, so only the top-K candidates are sent to
+the LLM instead of the whole list.
+"""
+
+import re
+import math
+from collections import Counter, defaultdict
+
+# Topic words (English words match whole words case-insensitively, Chinese ones as substrings)
+# mapped to A-share keywords that appear in fund, sector and concept names
+TOPIC_EXPANSIONS = {
+    'tesla': ['新能源车', '新能源汽车', '汽车', '锂电池', '电池'],
+    '特斯拉': ['新能源车', '新能源汽车', '汽车', '锂电池', '电池'],
+    'cybertruck': ['新能源车', '汽车'],
+    'ev': ['新能源车', '汽车'],
+    'electric vehicle': ['新能源车', '汽车'],
+    'battery': ['电池', '锂电池', '储能'],
+    'lithium': ['锂电池', '有色金属'],
+    'fsd': ['智能驾驶', '汽车', '人工智能'],
+    'self-driving': ['智能驾驶', '汽车'],
+    'robotaxi': ['智能驾驶', '汽车'],
+    'optimus': ['机器人', '人工智能'],
+    'robot': ['机器人', '人工智能'],
+    'spacex': ['航天', '军工', '卫星', '通信'],
+    'starship': ['航天', '军工', '卫星'],
+    'rocket': ['航天', '军工'],
+    'falcon': ['航天', '卫星'],
+    'mars': ['航天'],
+    'starlink': ['卫星', '通信', '航天'],
+    'satellite': ['卫星', '通信'],
+    'xai': ['人工智能', '算力', '芯片'],
+    'grok': ['人工智能', '算力'],
+    'ai': ['人工智能', '算力', '芯片', '软件'],
+    'artificial intelligence': ['人工智能', '算力'],
+    'gpu': ['芯片', '半导体', '算力'],
+    'nvidia': ['芯片', '半导体', '算力'],
+    'chip': ['芯片', '半导体'],
+    'semiconductor': ['芯片', '半导体'],
+    'data center': ['算力', '通信', '云计算'],
+    'neuralink': ['医疗', '脑机接口', '生物'],
+    'bitcoin': ['区块链', '金融科技', '证券'],
+    'crypto': ['区块链', '金融科技'],
+    'doge': ['区块链', '金融科技'],
+    'payment': ['金融科技', '银行'],
+    'x.com': ['传媒', '软件'],
+    'twitter': ['传媒', '互联网'],
+    'solar': ['光伏', '新能源'],
+    'energy': ['新能源', '能源', '电力'],
+    'grid': ['电力', '电网'],
+    'oil': ['石油', '能源', '油气'],
+    'gas': ['油气', '能源'],
+    'gold': ['黄金'],
+    'tariff': ['出口', '外贸'],
+    'trade war': ['出口', '外贸'],
+    'china': ['中国', '恒生'],
+    'hong kong': ['恒生', '港股'],
+    'fed': ['银行', '证券', '国债'],
+    'interest rate': ['银行', '国债', '证券'],
+    'inflation': ['黄金', '国债'],
+    'stock market': ['证券', '沪深300'],
+    'defense': ['军工', '国防'],
+    'drone': ['无人机', '军工'],
+    'tunnel': ['基建', '建筑'],
+    'boring': ['基建', '建筑'],
+    'healthcare': ['医疗', '医药'],
+    'drug': ['医药', '创新药'],
+    'game': ['游戏', '传媒'],
+    'film': ['影视', '传媒'],
+}
+
+# Extra index terms for industry/concept boards whose name contains the key, so English
+# tweets and everyday wording reach boards named in A-share jargon
+BOARD_SYNONYMS = {
+    '汽车': ['tesla', 'ev', 'car', 'cybertruck', '电动车', '新能源车'],
+    '新能源车': ['tesla', 'ev', '电动车'],
+    '电池': ['battery', 'lithium', 'megapack'],
+    '锂': ['lithium', 'battery'],
+    '储能': ['battery', 'megapack', 'powerwall', 'energy'],
+    '光伏': ['solar', '太阳能'],
+    '电力': ['energy', 'grid', 'power'],
+    '半导体': ['chip', 'semiconductor', 'gpu', 'nvidia', '芯片'],
+    '芯片': ['chip', 'semiconductor', 'gpu', 'nvidia'],
+    '算力': ['gpu', 'compute', 'datacenter', 'ai'],
+    '人工智能': ['ai', 'xai', 'grok', 'llm'],
+    'AI': ['ai', 'xai', 'grok', '人工智能'],
+    '机器人': ['optimus', 'robot', 'humanoid'],
+    '驾驶': ['fsd', 'robotaxi', 'autopilot', 'autonomous'],
+    '航天': ['spacex', 'rocket', 'starship', 'space', 'mars', 'falcon'],
+    '卫星': ['starlink', 'satellite', 'spacex'],
+    '通信': ['starlink', '5g', 'network'],
+    '脑机': ['neuralink', 'brain'],
+    '区块链': ['bitcoin', 'crypto', 'doge', 'blockchain'],
+    '数字货币': ['bitcoin', 'crypto', 'doge', '比特币'],
+    '支付': ['payment', 'xmoney'],
+    '软件': ['software', 'app'],
+    '互联网': ['twitter', 'x', 'internet'],
+    '传媒': ['media', 'twitter', 'x'],
+    '游戏': ['game', 'gaming'],
+    '军工': ['defense', 'military', '国防'],
+    '无人机': ['drone'],
+    '黄金': ['gold'],
+    '石油': ['oil'],
+    '银行': ['bank', 'fed', 'rate'],
+    '证券': ['stock', 'market'],
+    '医疗': ['healthcare', 'medical'],
+    '基建': ['tunnel', 'boring', 'infrastructure'],
+}
+
+
+def board_text(name, members=()):
+    """Indexed text of a board: its name, synonyms for the name and optional member-stock names."""
+    extra = [term for key, terms in BOARD_SYNONYMS.items() if key in name for term in terms]
+    return ' '.join([name] + extra + list(members))
+
+
+_LATIN_RE = re.compile(r'[a-z0-9]+')
+_CJK_RE = re.compile(r'[一-鿿]+')
+
+
+def tokenize(text):
+    """Character bigrams of CJK runs (single characters for one-char runs) plus lowercase Latin words."""
+    text = (text or '').lower()
+    tokens = _LATIN_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+_TOPIC_PATTERNS = [
+    (re.compile(rf'(?<![a-z0-9]){re.escape(topic)}(?![a-z0-9])' if topic.isascii() else re.escape(topic)), keywords)
+    for topic, keywords in TOPIC_EXPANSIONS.items()
+]
+
+
+def matched_topics(text):
+    """TOPIC_EXPANSIONS topics the text mentions."""
+    lowered = (text or '').lower()
+    return [topic for topic, (pattern, _) in zip(TOPIC_EXPANSIONS, _TOPIC_PATTERNS) if pattern.search(lowered)]
+
+
+def expand_query(text):
+    """Tweet text followed by the A-share keywords of every topic it mentions."""
+    extra = []
+    for topic in matched_topics(text):
+        extra.extend(TOPIC_EXPANSIONS[topic])
+    return ' '.join([text or ''] + extra)
+
+
+class CandidateIndex:
+    def __init__(self, candidates, text_of, k1=1.2, b=0.75):
+        """
+        Build a BM25 inverted index.
+
+        Args:
+            candidates: List of candidate objects (e.g. ETF dicts)
+            text_of: Function returning the indexed text of a candidate
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.candidates = list(candidates)
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # {token: [(doc index, term frequency)]}
+        self.doc_lengths = []
+
+        for i, candidate in enumerate(self.candidates):
+            counts = Counter(tokenize(text_of(candidate)))
+            self.doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings[token].append((i, tf))
+
+        n = len(self.candidates)
+        self.avg_length = sum(self.doc_lengths) / n if n else 0.0
+        self.idf = {
+            token: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+
+    def search(self, query, top_k=40, expand=True):
+        """
+        Rank candidates against a query.
+
+        Args:
+            query: Tweet text
+            top_k: Maximum number of candidates returned
+            expand: Add topic expansion keywords to the query
+
+        Returns:
+            Up to top_k candidates with a positive score, best first
+        """
+        if expand:
+            query = expand_query(query)
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for i, tf in self.postings[token]:
+                norm = 1 - self.b + self.b * self.doc_lengths[i] / (self.avg_length or 1)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.candidates[i] for i, _ in ranked[:top_k]]
+
+    def shortlist(self, query, top_k=40):
+        """
+        Candidates to put in a prompt: the search hits, padded up to top_k with
+        the remaining candidates in list order. A query nothing matches (wording
+        the index and topic expansions don't know) gets the whole list, so
+        retrieval never hides the right candidate from the LLM.
+
+        Returns:
+            List of candidates, search hits first
+        """
+        hits = self.search(query, top_k)
+        if not hits:
+            return list(self.candidates)
+        if len(hits) < top_k:
+            chosen = {id(candidate) for candidate in hits}
+            hits += [c for c in self.candidates if id(c) not in chosen][:top_k - len(hits)]
+        return hits
+
+    def __len__(self):
+        return len(self.candidates)
@@ -0,0 +1,173 @@
+"""
+Reconciliation of LLM-picked entities with the real ETF / sector / concept lists.
+The model is told to copy names and codes exactly, but near-misses ("半导体概念"
+for "半导体", "159206.SZ", full-width digits) still come back, and an unknown
+board name costs an akshare call that fails and then caches an empty list.
+Every pick is mapped to a canonical existing entity, or dropped, before any
+network fetch: exact match, then normalized form (NFKC full/half width,
+case, punctuation), then with common suffixes stripped, then the closest name
+by edit distance among candidates sharing character trigrams.
+"""
+
+import re
+import unicodedata
+from src.utils import setup_logger
+
+logger = setup_logger('EntityResolver')
+
+# Stripped from both sides before comparing names (longest first)
+NAME_SUFFIXES = ('概念股', '产业链', '概念', '板块', '行业', '指数', '产业', '主题', '基金', 'etf')
+
+_PUNCT_RE = re.compile(r'[\s\-_·・.,，。、()（）\[\]【】"\'“”]+')
+_CODE_RE = re.compile(r'(?<!\d)(\d{6})(?!\d)')
+
+
+def normalize_name(name):
+    """NFKC (full-width to half-width), lowercase, no whitespace or punctuation."""
+    return _PUNCT_RE.sub('', unicodedata.normalize('NFKC', str(name or '')).lower())
+
+
+def core_name(name):
+    """Normalized name without trailing NAME_SUFFIXES (never reduced to nothing)."""
+    core = normalize_name(name)
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in NAME_SUFFIXES:
+            if core.endswith(suffix) and len(core) > len(suffix):
+                core = core[:-len(suffix)]
+                stripped = True
+                break
+    return core
+
+
+def trigrams(text):
+    padded = f'^{text}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """Levenshtein distance."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class EntityIndex:
+    def __init__(self, names, max_candidates=20):
+        """
+        Build lookup tables over a list of canonical names.
+
+        Args:
+            names: Canonical entity names
+            max_candidates: Trigram candidates compared by edit distance per lookup
+        """
+        self.max_candidates = max_candidates
+        self.exact = {}
+        self.normalized = {}
+        self.cores = {}      # core name -> [canonical names]
+        self.postings = {}   # trigram -> set of core names
+        for name in names:
+            if not name or name in self.exact:
+                continue
+            self.exact[name] = name
+            self.normalized.setdefault(normalize_name(name), name)
+            core = core_name(name)
+            self.cores.setdefault(core, []).append(name)
+            for gram in trigrams(core):
+                self.postings.setdefault(gram, set()).add(core)
+
+    def resolve(self, name):
+        """Canonical name for an LLM-returned name, or None if nothing is close enough."""
+        if name in self.exact:
+            return name
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+        if normalized in self.normalized:
+            return self.normalized[normalized]
+        core = core_name(name)
+        if core in self.cores:
+            matches = self.cores[core]
+            # "半导体概念" for a list holding both "半导体" and "半导体设备": prefer the bare core
+            return next((m for m in matches if normalize_name(m) == core), matches[0])
+        return self._fuzzy(core)
+
+    def _fuzzy(self, core):
+        shared = {}
+        for gram in trigrams(core):
+            for candidate in self.postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        if not shared:
+            return None
+        candidates = sorted(shared, key=lambda c: (-shared[c], len(c)))[:self.max_candidates]
+        # One edit for short names, roughly one per three characters beyond that
+        limit = max(1, len(core) // 3)
+        scored = sorted((edit_distance(core, c), len(c), c) for c in candidates)
+        distance, _, best = scored[0]
+        if distance > limit:
+            return None
+        if len(scored) > 1 and scored[1][0] == distance:
+            # Ambiguous near-miss: better to drop it than fetch the wrong board
+            return None
+        return self.cores[best][0]
+
+
+class EntityResolver:
+    def __init__(self, etf_list, sector_list, concept_list):
+        """
+        Build the indexes for one round of analysis.
+
+        Args:
+            etf_list: ETF dicts with 'code' and 'name'
+            sector_list: Sector dicts with '板块名称'
+            concept_list: Concept dicts with '板块名称'
+        """
+        self.etfs_by_code = {str(etf['code']): etf for etf in etf_list}
+        self._etf_names = EntityIndex(etf['name'] for etf in etf_list)
+        self._etf_code_by_name = {etf['name']: str(etf['code']) for etf in etf_list}
+        self._sectors = EntityIndex(b.get('板块名称', b.get('name', '')) for b in sector_list)
+        self._concepts = EntityIndex(b.get('板块名称', b.get('name', '')) for b in concept_list)
+
+    def resolve_etf_code(self, value):
+        """Canonical ETF code for a returned code ("159206", 159206, "SZ159206", "159206.SZ") or name."""
+        text = unicodedata.normalize('NFKC', str(value)).strip()
+        match = _CODE_RE.search(text)
+        if match and match.group(1) in self.etfs_by_code:
+            return match.group(1)
+        name = self._etf_names.resolve(text)
+        return self._etf_code_by_name[name] if name else None
+
+    def resolve_board(self, kind, name):
+        """Canonical sector ('sector') or concept ('concept') name, or None."""
+        index = self._sectors if kind == 'sector' else self._concepts
+        return index.resolve(name)
+
+    def etf_codes(self, values):
+        return self._resolve_all('ETF', values, self.resolve_etf_code)
+
+    def sectors(self, names):
+        return self._resolve_all('sector', names, lambda name: self.resolve_board('sector', name))
+
+    def concepts(self, names):
+        return self._resolve_all('concept', names, lambda name: self.resolve_board('concept', name))
+
+    @staticmethod
+    def _resolve_all(kind, values, resolve):
+        """Resolved values in order, duplicates and unknowns dropped."""
+        resolved = []
+        for value in values or []:
+            canonical = resolve(value)
+            if canonical is None:
+                logger.warning(f"Dropping unknown {kind} '{value}' returned by the LLM")
+            elif canonical not in resolved:
+                if canonical != value:
+                    logger.info(f"Resolved {kind} '{value}' -> '{canonical}'")
+                resolved.append(canonical)
+        return resolved
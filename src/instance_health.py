@@ -0,0 +1,227 @@
+"""
+Nitter instance health registry.
+Tracks success rate, page latency, rate limits and failures per instance,
+persisted to disk so it survives polls and is shared between processes.
+Instances are ordered fastest-healthy-first with circuit-breaker cooldowns
+for failing ones.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from src.utils import DATA_DIR, load_config, setup_logger
+
+logger = setup_logger('InstanceHealth')
+
+HEALTH_FILE = os.path.join(DATA_DIR, 'instance_health.json')
+
+# Latency assumed for instances without samples (ms); they sort after known-fast ones
+UNKNOWN_LATENCY_MS = 5000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class InstanceHealthRegistry:
+    def __init__(self, path=HEALTH_FILE, window=50, base_cooldown=60, max_cooldown=1800,
+                 rate_limit_cooldown=900, probe_rate=0.05, min_timeout=5000, max_timeout=30000):
+        """
+        Initialize health registry.
+
+        Args:
+            path: JSON file shared by all monitor processes
+            window: Number of recent latency samples kept per instance
+            base_cooldown: Seconds an instance is skipped after its first consecutive failure (doubles per failure)
+            max_cooldown: Upper bound for the failure cooldown in seconds
+            rate_limit_cooldown: Minimum cooldown in seconds after a rate-limit response
+            probe_rate: Chance per poll of trying a random non-leading healthy instance first, to refresh its stats
+            min_timeout: Lower bound (ms) for the adaptive page timeout
+            max_timeout: Timeout (ms) for instances without history and upper bound for the adaptive timeout
+        """
+        self.path = path
+        self.window = window
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.probe_rate = probe_rate
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+        self._lock = threading.Lock()
+        self._mtime = 0
+        self.instances = {}
+        self._reload()
+
+    def _reload(self):
+        """Pick up changes written by other processes."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime <= self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.instances = json.load(f)
+            self._mtime = mtime
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load instance health: {e}")
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.instances, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save instance health: {e}")
+
+    def _entry(self, instance):
+        return self.instances.setdefault(instance, {
+            'successes': 0,
+            'failures': 0,
+            'rate_limited': 0,
+            'consecutive_failures': 0,
+            # {kind: [ms, ...]}, kind is 'rss' or 'browser'
+            'latencies': {},
+            'last_success': 0,
+            'last_failure': 0,
+            'last_error': '',
+            'cooldown_until': 0,
+        })
+
+    def record_success(self, instance, latency_ms, kind='browser'):
+        """Record a successful feed ('rss') or page ('browser') load and its latency."""
+        with self._lock:
+            self._reload()
+            entry = self._entry(instance)
+            entry['successes'] += 1
+            entry['consecutive_failures'] = 0
+            entry['cooldown_until'] = 0
+            entry['last_success'] = time.time()
+            samples = entry['latencies'].get(kind, []) + [round(latency_ms, 1)]
+            entry['latencies'][kind] = samples[-self.window:]
+            self._save()
+
+    def record_failure(self, instance, reason='', rate_limited=False):
+        """Record a failed attempt and open the circuit breaker for a while."""
+        with self._lock:
+            self._reload()
+            entry = self._entry(instance)
+            entry['failures'] += 1
+            entry['consecutive_failures'] += 1
+            entry['last_failure'] = time.time()
+            entry['last_error'] = str(reason)[:200]
+
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (entry['consecutive_failures'] - 1))
+            if rate_limited:
+                entry['rate_limited'] += 1
+                cooldown = max(cooldown, self.rate_limit_cooldown)
+            entry['cooldown_until'] = time.time() + cooldown
+            self._save()
+
+        logger.info(f"Instance {instance} cooling down for {cooldown:.0f}s"
+                    f"{' (rate limited)' if rate_limited else ''}")
+
+    def _score(self, entry, kind):
+        """Lower is better: median latency inflated by the failure rate."""
+        latencies = entry['latencies'].get(kind, [])
+        p50 = percentile(latencies, 50) if latencies else UNKNOWN_LATENCY_MS
+        total = entry['successes'] + entry['failures']
+        success_rate = entry['successes'] / total if total else 1.0
+        return p50 / max(success_rate, 0.1)
+
+    def order_instances(self, instances, kind='browser'):
+        """
+        Order instances for the next request of the given kind.
+
+        Healthy instances come first, fastest first. Instances whose cooldown has
+        expired count as healthy again, so the next request probes them.
+        Instances still cooling down go last, soonest-available first, so a poll
+        still has somewhere to go when everything is failing.
+        """
+        with self._lock:
+            self._reload()
+            now = time.time()
+            healthy, cooling = [], []
+            for instance in instances:
+                entry = self.instances.get(instance)
+                if entry is None:
+                    healthy.append((UNKNOWN_LATENCY_MS, instance))
+                elif entry['cooldown_until'] > now:
+                    cooling.append((entry['cooldown_until'], instance))
+                else:
+                    healthy.append((self._score(entry, kind), instance))
+
+        ordered = [i for _, i in sorted(healthy)]
+        if len(ordered) > 1 and random.random() < self.probe_rate:
+            # Occasionally lead with another healthy instance so stale stats get refreshed
+            probe = random.choice(ordered[1:])
+            ordered.remove(probe)
+            ordered.insert(0, probe)
+        return ordered + [i for _, i in sorted(cooling)]
+
+    def timeout_for(self, instance, kind='browser'):
+        """
+        Adaptive request timeout in ms: a few times the instance's p95 latency,
+        so a dead instance fails over in about the time of one normal request.
+        """
+        entry = self.instances.get(instance)
+        latencies = entry['latencies'].get(kind, []) if entry else []
+        if len(latencies) < 5:
+            return self.max_timeout
+        p95 = percentile(latencies, 95)
+        return int(min(self.max_timeout, max(self.min_timeout, p95 * 3)))
+
+    def get_stats(self):
+        """Return per-instance success rate, p50/p95 latency and failure info."""
+        with self._lock:
+            self._reload()
+            now = time.time()
+            stats = {}
+            for instance, entry in self.instances.items():
+                total = entry['successes'] + entry['failures']
+                stats[instance] = {
+                    'success_rate': entry['successes'] / total if total else None,
+                    'latency_ms': {
+                        kind: {'p50': percentile(samples, 50), 'p95': percentile(samples, 95)}
+                        for kind, samples in entry['latencies'].items()
+                    },
+                    'rate_limited': entry['rate_limited'],
+                    'last_failure': entry['last_failure'],
+                    'last_error': entry['last_error'],
+                    'cooling_down': entry['cooldown_until'] > now,
+                }
+            return stats
+
+
+# Global health registry instance
+_health_registry = None
+
+
+def get_health_registry():
+    """Get or create global instance health registry."""
+    global _health_registry
+    if _health_registry is None:
+        try:
+            health_conf = load_config().get('instance_health', {})
+        except FileNotFoundError:
+            health_conf = {}
+        _health_registry = InstanceHealthRegistry(
+            base_cooldown=health_conf.get('base_cooldown', 60),
+            max_cooldown=health_conf.get('max_cooldown', 1800),
+            rate_limit_cooldown=health_conf.get('rate_limit_cooldown', 900),
+            probe_rate=health_conf.get('probe_rate', 0.05),
+            min_timeout=health_conf.get('min_timeout', 5000),
+            max_timeout=health_conf.get('max_timeout', 30000)
+        )
+    return _health_registry
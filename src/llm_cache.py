@@ -0,0 +1,144 @@
+"""
+Content-addressed cache for LLM analysis results.
+Results are keyed by a hash of the normalized tweet text, the prompt version,
+the model and the candidate-list version, kept in SQLite (WAL) so several
+processes share them, expired after a TTL and evicted least-recently-used
+beyond a size bound. A hit skips the network entirely.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from src.utils import DATA_DIR, load_config, setup_logger
+
+logger = setup_logger('LLMCache')
+
+LLM_CACHE_FILE = os.path.join(DATA_DIR, 'llm_cache.db')
+
+_URL_RE = re.compile(r'https?://\S+')
+
+
+def normalize_text(text):
+    """Canonical form of a tweet for cache keys: NFKC, no links, lowercase, single spaces."""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = _URL_RE.sub('', text)
+    return ' '.join(text.lower().split())
+
+
+def candidates_version(candidates):
+    """Short fingerprint of a candidate list (any JSON-serializable sequence)."""
+    data = json.dumps(candidates, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+def make_key(task, text, prompt_version, model, candidate_version=''):
+    """Cache key of one analysis request."""
+    data = json.dumps([task, prompt_version, model, candidate_version, normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path=LLM_CACHE_FILE, max_size=5000, ttl=7 * 86400):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            path: SQLite database file shared by all processes
+            max_size: Maximum number of cached results; least recently used are evicted first
+            ttl: Seconds a result stays valid
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)')
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss or expired entry."""
+        return self.get_first([key])
+
+    def get_first(self, keys):
+        """Return the cached result of the first key that has one (one lookup in the stats), or None."""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    row = None
+                if row is not None:
+                    self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+                    self.stats['hits'] += 1
+                    return json.loads(row[0])
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        """Store a JSON-serializable result and evict beyond max_size."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self.stats['stores'] += 1
+            cursor = self._conn.execute('''
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_size,))
+            self.stats['evictions'] += max(cursor.rowcount, 0)
+
+    def get_stats(self):
+        """Return hit/miss counters of this process and the number of cached results."""
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'size': size,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Global LLM cache instance
+_llm_cache = None
+
+
+def get_llm_cache():
+    """Get or create global LLM response cache (None when disabled in config)."""
+    global _llm_cache
+    if _llm_cache is None:
+        try:
+            cache_conf = load_config().get('llm_cache', {})
+        except FileNotFoundError:
+            cache_conf = {}
+        if not cache_conf.get('enabled', True):
+            return None
+        _llm_cache = LLMResponseCache(
+            max_size=cache_conf.get('max_size', 5000),
+            ttl=cache_conf.get('ttl', 7 * 86400)
+        )
+    return _llm_cache
@@ -0,0 +1,296 @@
+"""
+Async LLM request layer on AsyncOpenAI.
+Requests run on an event loop in a background thread, so any thread can submit
+one and several can be in flight at once (bounded by a semaphore). Every call
+has a deadline; 429/5xx and connection errors are retried with exponential
+backoff, and a request can optionally be hedged: if it hasn't answered after the
+p95 of recent latencies, a duplicate is sent and the first reply wins.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError
+from src.utils import load_config, setup_logger
+
+logger = setup_logger('LLMClient')
+
+
+class LLMDeadlineExceeded(Exception):
+    """A request did not complete within its deadline (including retries)."""
+    pass
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return True
+    # APIStatusError and anything else carrying an HTTP status
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return False
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClientMetrics:
+    """Latency and retry counters of an AsyncLLMClient."""
+
+    def __init__(self, window=200):
+        self.latencies = deque(maxlen=window)  # seconds of successful attempts
+        self.counts = {'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0,
+                       'deadline_exceeded': 0, 'hedges': 0, 'hedge_wins': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def observe(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def quantile(self, q):
+        """Latency quantile in seconds over the recent window (None without data)."""
+        with self._lock:
+            values = sorted(self.latencies)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def get_stats(self):
+        """Counters plus p50/p95/max latency in milliseconds."""
+        with self._lock:
+            counts = dict(self.counts)
+            values = sorted(self.latencies)
+        stats = {**counts, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+        if values:
+            stats['p50_ms'] = values[len(values) // 2] * 1000
+            stats['p95_ms'] = values[min(len(values) - 1, int(0.95 * len(values)))] * 1000
+            stats['max_ms'] = values[-1] * 1000
+        return stats
+
+
+class AsyncLLMClient:
+    def __init__(self, base_url=None, api_key=None, concurrency=4, timeout=30, deadline=90,
+                 max_retries=3, backoff=0.5, max_backoff=8.0, hedge=False, hedge_quantile=0.95,
+                 hedge_min_delay=2.0, client=None):
+        """
+        Start the client's event loop.
+
+        Args:
+            base_url: OpenAI-compatible API base
+            api_key: API key
+            concurrency: Maximum requests in flight (hedges included)
+            timeout: Seconds per attempt
+            deadline: Seconds per call, retries and backoff included
+            max_retries: Retries of a failed attempt (429/5xx/timeouts only)
+            backoff: First backoff in seconds, doubled per retry (with jitter)
+            max_backoff: Upper bound of a single backoff
+            hedge: Send a duplicate request when the first one is slow
+            hedge_quantile: Latency quantile after which the duplicate is sent
+            hedge_min_delay: Minimum seconds before hedging (also used until latencies are known)
+            client: AsyncOpenAI-compatible client to use instead of creating one
+        """
+        self.client = client or AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.metrics = LLMClientMetrics()
+
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name='llm-client', daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the client's loop and wait for its result (callable from any thread)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def create(self, **kwargs):
+        """Blocking chat completion with deadline, retries and optional hedging."""
+        return self.run(self.acreate(**kwargs))
+
+    def stream(self, on_text, **kwargs):
+        """Blocking streamed chat completion; returns (text, usage)."""
+        return self.run(self.astream(on_text, **kwargs))
+
+    async def acreate(self, **kwargs):
+        """Chat completion with deadline, retries and optional hedging."""
+        self.metrics.count('requests')
+        try:
+            response = await asyncio.wait_for(self._with_retries(self._hedged, kwargs), self.deadline)
+        except asyncio.TimeoutError:
+            self.metrics.count('deadline_exceeded')
+            raise LLMDeadlineExceeded(f"LLM request exceeded its {self.deadline}s deadline")
+        except Exception:
+            self.metrics.count('failures')
+            raise
+        return response
+
+    async def astream(self, on_text, **kwargs):
+        """
+        Streamed chat completion: on_text gets each text delta. Only attempts that
+        failed before the first delta are retried; streams are never hedged.
+        """
+        self.metrics.count('requests')
+        try:
+            result = await asyncio.wait_for(
+                self._with_retries(self._stream_attempt, dict(kwargs, on_text=on_text)), self.deadline
+            )
+        except asyncio.TimeoutError:
+            self.metrics.count('deadline_exceeded')
+            raise LLMDeadlineExceeded(f"LLM request exceeded its {self.deadline}s deadline")
+        except Exception:
+            self.metrics.count('failures')
+            raise
+        return result
+
+    async def _with_retries(self, attempt, kwargs):
+        for retry in range(self.max_retries + 1):
+            try:
+                return await attempt(kwargs)
+            except Exception as e:
+                if retry == self.max_retries or not is_retryable(e) or getattr(e, 'streamed', False):
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** retry) * random.uniform(0.5, 1.0)
+                self.metrics.count('retries')
+                logger.warning(f"LLM request failed ({e}), retry {retry + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _hedge_delay(self):
+        p = self.metrics.quantile(self.hedge_quantile)
+        return max(self.hedge_min_delay, p or 0)
+
+    async def _attempt(self, kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self.metrics.count('attempts')
+            start = time.perf_counter()
+            response = await self.client.chat.completions.create(**kwargs)
+            # Only the successful attempt: backoff sleeps would inflate the hedge delay
+            self.metrics.observe(time.perf_counter() - start)
+            return response
+
+    async def _hedged(self, kwargs):
+        if not self.hedge:
+            return await self._attempt(kwargs)
+
+        primary = asyncio.ensure_future(self._attempt(kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+
+        self.metrics.count('hedges')
+        backup = asyncio.ensure_future(self._attempt(kwargs))
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.metrics.count('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _stream_attempt(self, kwargs):
+        kwargs = dict(kwargs)
+        on_text = kwargs.pop('on_text')
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self.metrics.count('attempts')
+            start = time.perf_counter()
+            parts, usage = [], None
+            try:
+                stream = await self.client.chat.completions.create(stream=True, **kwargs)
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        text = chunk.choices[0].delta.content
+                        parts.append(text)
+                        on_text(text)
+                    if getattr(chunk, 'usage', None):
+                        usage = chunk.usage
+            except Exception as e:
+                # Text already handed to on_text can't be taken back
+                e.streamed = bool(parts)
+                raise
+            self.metrics.observe(time.perf_counter() - start)
+            return ''.join(parts), usage
+
+    def close(self):
+        async def shutdown():
+            await self.client.close()
+
+        try:
+            self.run(shutdown())
+        except Exception as e:
+            logger.warning(f"Error closing LLM client: {e}")
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+
+# Global async LLM client instance
+_llm_client = None
+
+
+def get_llm_client():
+    """Get or create global async LLM client (None when llm_async is disabled in config)."""
+    global _llm_client
+    if _llm_client is None:
+        try:
+            config = load_config()
+        except FileNotFoundError:
+            config = {}
+        async_conf = config.get('llm_async', {})
+        if not async_conf.get('enabled', False):
+            return None
+        llm_conf = config.get('llm_config', {})
+        _llm_client = AsyncLLMClient(
+            base_url=llm_conf.get('api_base'),
+            api_key=llm_conf.get('api_key'),
+            concurrency=async_conf.get('concurrency', 4),
+            timeout=async_conf.get('timeout', 30),
+            deadline=async_conf.get('deadline', 90),
+            max_retries=async_conf.get('max_retries', 3),
+            backoff=async_conf.get('backoff', 0.5),
+            hedge=async_conf.get('hedge', False),
+            hedge_quantile=async_conf.get('hedge_quantile', 0.95),
+            hedge_min_delay=async_conf.get('hedge_min_delay', 2.0)
+        )
+    return _llm_client
+
+
+def close_llm_client():
+    """Close the global async LLM client if it was created."""
+    global _llm_client
+    if _llm_client is not None:
+        _llm_client.close()
+        _llm_client = None
@@ -0,0 +1,140 @@
+"""
+Structured-output parsing of LLM replies.
+Replies are expected to hold one JSON object, but models wrap it in code
+fences, add a sentence before or after it, or break it. The first balanced
+object is extracted from whatever surrounds it and checked against a small
+schema; callers make one repair request before giving up.
+"""
+
+import json
+
+# A list of ETF codes / names: strings, but some models write codes as numbers
+STRING_LIST = 'string_list'
+
+# Schemas: required key -> str, list, dict or STRING_LIST
+KEYWORDS_SCHEMA = {'summary': str, 'keywords': STRING_LIST}
+SECTORS_SCHEMA = {'sectors': STRING_LIST, 'concepts': STRING_LIST}
+ETFS_SCHEMA = {'summary': str, 'etf_codes': STRING_LIST}
+COMBINED_SCHEMA = {'etf_codes': STRING_LIST, 'sectors': STRING_LIST, 'concepts': STRING_LIST, 'summary': str}
+BATCH_SCHEMA = {'results': list}
+
+# Value of a key the model left out; only a wrong type or broken syntax is an error
+_DEFAULTS = {str: str, list: list, dict: dict, STRING_LIST: list}
+
+REPAIR_INSTRUCTIONS = """
+下面是一段本应为JSON对象但格式有误的文本。请修复它，只返回修复后的JSON对象，不要包含markdown格式或其他内容，不要改动其中的取值。
+"""
+
+
+class LLMJSONError(ValueError):
+    """A reply did not contain a valid JSON object matching the expected schema."""
+    pass
+
+
+def _balanced_from(text, start):
+    """The balanced {...} starting at text[start], or None if it never closes."""
+    depth = 0
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def extract_json_object(text):
+    """
+    Return the first balanced {...} in text that parses as JSON (code fences and
+    surrounding prose are ignored); failing that the first balanced {...}, or
+    None if there is none.
+    """
+    text = text or ''
+    first = None
+    start = text.find('{')
+    while start != -1:
+        candidate = _balanced_from(text, start)
+        if candidate is None:
+            start = text.find('{', start + 1)
+            continue
+        try:
+            json.loads(candidate)
+            return candidate
+        except json.JSONDecodeError:
+            first = first or candidate
+        # Objects nested in a broken one are fragments of it, not answers
+        start = text.find('{', start + len(candidate))
+    return first
+
+
+def validate(obj, schema):
+    """List of schema violations of a parsed object (empty if valid)."""
+    if not isinstance(obj, dict):
+        return [f"expected an object, got {type(obj).__name__}"]
+    errors = []
+    for key, expected in schema.items():
+        if key not in obj:
+            errors.append(f"missing key '{key}'")
+        elif expected == STRING_LIST:
+            value = obj[key]
+            if not isinstance(value, list) or not all(isinstance(v, (str, int)) for v in value):
+                errors.append(f"'{key}' must be a list of strings")
+        elif not isinstance(obj[key], expected):
+            errors.append(f"'{key}' must be {expected.__name__}")
+    return errors
+
+
+def parse_json_reply(text, schema=None):
+    """
+    Parse an LLM reply into a dict.
+
+    Args:
+        text: Raw reply text
+        schema: Optional schema (see validate)
+
+    Returns:
+        Parsed dict; schema keys the reply left out are filled with an empty value
+
+    Raises:
+        LLMJSONError: No JSON object, invalid JSON or a value of the wrong type
+    """
+    candidate = extract_json_object(text)
+    if candidate is None:
+        raise LLMJSONError("no JSON object in reply")
+    try:
+        obj = json.loads(candidate)
+    except json.JSONDecodeError as e:
+        raise LLMJSONError(f"invalid JSON: {e}")
+    if isinstance(obj, dict):
+        for key, expected in (schema or {}).items():
+            if key not in obj:
+                obj[key] = _DEFAULTS[expected]()
+    errors = validate(obj, schema or {})
+    if errors:
+        raise LLMJSONError('; '.join(errors))
+    return obj
+
+
+def repair_messages(text, error, schema):
+    """Messages of the one-shot repair request: the broken reply, the error and the required keys."""
+    keys = ', '.join(schema) if schema else ''
+    content = f"错误：{error}\n"
+    if keys:
+        content += f"必须包含的字段：{keys}\n"
+    content += f"文本：\n{text}"
+    return [
+        {"role": "system", "content": REPAIR_INSTRUCTIONS.strip()},
+        {"role": "user", "content": content}
+    ]
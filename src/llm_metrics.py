@@ -0,0 +1,243 @@
+"""
+Instrumentation of LLM calls.
+Every chat completion is recorded with its call type, model, prompt / cached /
+completion tokens, wall time and (when streamed) time to first token: in a
+rolling in-process window with latency histograms, and as one line of an
+append-only JSONL ledger (data/llm_ledger.jsonl) for reports over past hours
+(python -m src.main --llm-report 24). JSON replies also record whether they
+parsed, needed a repair request or failed.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from src.utils import DATA_DIR, load_config, setup_logger
+
+logger = setup_logger('LLMMetrics')
+
+LLM_LEDGER_FILE = os.path.join(DATA_DIR, 'llm_ledger.jsonl')
+
+# Upper bounds of the latency histogram buckets in milliseconds (plus one overflow bucket)
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# Default prices per million tokens (DeepSeek, CNY): uncached prompt, cached prompt, completion
+DEFAULT_PRICES = {'prompt': 2.0, 'cached': 0.5, 'completion': 8.0}
+
+
+def model_prices(prices, model):
+    """
+    Per-million-token prices of one model: the flat prices (or the defaults),
+    overridden by prices['models'][model] when the config lists that model.
+    """
+    prices = prices or {}
+    flat = {key: value for key, value in prices.items() if key != 'models'}
+    return {**DEFAULT_PRICES, **flat, **(prices.get('models') or {}).get(model, {})}
+
+
+def usage_tokens(usage):
+    """(prompt, cached, completion) tokens of an OpenAI-style usage object (zeros if missing)."""
+    if usage is None:
+        return 0, 0, 0
+    # DeepSeek: prompt_cache_hit_tokens; OpenAI: prompt_tokens_details.cached_tokens
+    cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if cached is None:
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', 0) if details is not None else 0
+    return getattr(usage, 'prompt_tokens', 0) or 0, cached or 0, getattr(usage, 'completion_tokens', 0) or 0
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+
+    def observe(self, ms):
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.total += 1
+
+    def quantile(self, q):
+        """Upper bound (ms) of the bucket holding the q-quantile; None if empty, inf for overflow."""
+        if not self.total:
+            return None
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= q * self.total:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def render(self, width=30):
+        """Text bar chart, one line per bucket."""
+        lines = []
+        peak = max(self.counts) or 1
+        for i, count in enumerate(self.counts):
+            label = f"<= {self.buckets[i]:>6} ms" if i < len(self.buckets) else f" > {self.buckets[-1]:>6} ms"
+            lines.append(f"{label} {'#' * round(width * count / peak):<{width}} {count}")
+        return lines
+
+
+def summarize(records, prices=None):
+    """
+    Aggregate call records per call type.
+
+    Args:
+        records: Ledger entries (dicts as written by LLMMetrics.record)
+        prices: Per-million-token prices {'prompt', 'cached', 'completion'}, optionally
+            with per-model overrides under 'models' (see model_prices)
+
+    Returns:
+        Dict mapping call type to {'calls', 'errors', 'prompt_tokens', 'cached_tokens',
+        'completion_tokens', 'cost', 'cost_by_model', 'wall': LatencyHistogram,
+        'ttft': LatencyHistogram, 'parsed', 'repaired', 'parse_failures'}
+    """
+    summary = {}
+    for r in records:
+        s = summary.setdefault(r['type'], {
+            'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0,
+            'cost': 0.0, 'cost_by_model': {}, 'wall': LatencyHistogram(), 'ttft': LatencyHistogram(),
+            'parsed': 0, 'repaired': 0, 'parse_failures': 0
+        })
+        if r.get('event') == 'parse':
+            # Outcome of parsing a JSON reply: ok / repaired / failed
+            s['parsed'] += 1
+            s['repaired'] += r['outcome'] == 'repaired'
+            s['parse_failures'] += r['outcome'] == 'failed'
+            continue
+        s['calls'] += 1
+        s['errors'] += 0 if r.get('ok', True) else 1
+        s['prompt_tokens'] += r.get('prompt_tokens', 0)
+        s['cached_tokens'] += r.get('cached_tokens', 0)
+        s['completion_tokens'] += r.get('completion_tokens', 0)
+        # Each call at its own model's prices (a failover may have switched models)
+        price = model_prices(prices, r.get('model'))
+        cost = ((r.get('prompt_tokens', 0) - r.get('cached_tokens', 0)) * price['prompt'] +
+                r.get('cached_tokens', 0) * price['cached'] +
+                r.get('completion_tokens', 0) * price['completion']) / 1e6
+        s['cost'] += cost
+        s['cost_by_model'][r.get('model')] = s['cost_by_model'].get(r.get('model'), 0.0) + cost
+        s['wall'].observe(r.get('wall_ms', 0))
+        if r.get('ttft_ms') is not None:
+            s['ttft'].observe(r['ttft_ms'])
+    return summary
+
+
+def load_ledger(path=LLM_LEDGER_FILE, since=0):
+    """Ledger entries with a timestamp >= since (unreadable lines are skipped)."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('ts', 0) >= since:
+                records.append(record)
+    return records
+
+
+def format_report(records, hours, prices=None):
+    """Human-readable report of the calls of the last `hours` hours."""
+    summary = summarize(records, prices)
+    calls = sum(1 for r in records if r.get('event') != 'parse')
+    lines = [f"LLM calls in the last {hours:g}h: {calls}"]
+    for call_type, s in sorted(summary.items(), key=lambda item: -item[1]['calls']):
+        p50, p95 = s['wall'].quantile(0.5), s['wall'].quantile(0.95)
+        lines.append("")
+        lines.append(f"[{call_type}] {s['calls']} calls, {s['errors']} errors, cost {s['cost']:.4f}")
+        if len(s['cost_by_model']) > 1:
+            costs = sorted(s['cost_by_model'].items(), key=lambda item: str(item[0]))
+            lines.append("  cost by model: " + ', '.join(f"{model} {cost:.4f}" for model, cost in costs))
+        lines.append(f"  tokens: {s['prompt_tokens']} prompt ({s['cached_tokens']} cached), "
+                     f"{s['completion_tokens']} completion, "
+                     f"{s['prompt_tokens'] / max(s['calls'], 1):.0f} prompt tokens per call")
+        lines.append(f"  wall time: p50 <= {p50} ms, p95 <= {p95} ms")
+        lines.extend('    ' + line for line in s['wall'].render())
+        if s['ttft'].total:
+            lines.append(f"  time to first token: p50 <= {s['ttft'].quantile(0.5)} ms, "
+                         f"p95 <= {s['ttft'].quantile(0.95)} ms")
+        if s['parsed']:
+            lines.append(f"  JSON replies: {s['parsed']}, {s['repaired']} repaired, "
+                         f"{s['parse_failures']} unparsable ({s['parse_failures'] / s['parsed']:.1%})")
+    return '\n'.join(lines)
+
+
+class LLMMetrics:
+    def __init__(self, ledger_path=LLM_LEDGER_FILE, window=3600):
+        """
+        Initialize metrics.
+
+        Args:
+            ledger_path: Append-only JSONL ledger, None to keep metrics in memory only
+            window: Seconds of calls kept in the in-process window
+        """
+        self.ledger_path = ledger_path
+        self.window = window
+        self.records = deque()
+        self._lock = threading.Lock()
+
+    def record(self, call_type, model, wall_ms, usage=None, ttft_ms=None, ok=True):
+        """Record one chat completion."""
+        prompt, cached, completion = usage_tokens(usage)
+        entry = {
+            'ts': time.time(),
+            'type': call_type,
+            'model': model,
+            'prompt_tokens': prompt,
+            'cached_tokens': cached,
+            'completion_tokens': completion,
+            'wall_ms': round(wall_ms, 1),
+            'ttft_ms': round(ttft_ms, 1) if ttft_ms is not None else None,
+            'ok': ok,
+        }
+        self._append(entry)
+
+    def record_parse(self, call_type, outcome):
+        """Record how a JSON reply parsed: 'ok', 'repaired' or 'failed'."""
+        self._append({'ts': time.time(), 'type': call_type, 'event': 'parse', 'outcome': outcome})
+
+    def _append(self, entry):
+        with self._lock:
+            self.records.append(entry)
+            while self.records and self.records[0]['ts'] < entry['ts'] - self.window:
+                self.records.popleft()
+            if self.ledger_path:
+                try:
+                    with open(self.ledger_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                except OSError as e:
+                    logger.warning(f"Failed to append to LLM ledger: {e}")
+
+    def summary(self, prices=None):
+        """summarize() over the in-process window."""
+        with self._lock:
+            records = list(self.records)
+        return summarize(records, prices)
+
+
+# Global LLM metrics instance
+_llm_metrics = None
+
+
+def get_llm_metrics():
+    """Get or create global LLM metrics."""
+    global _llm_metrics
+    if _llm_metrics is None:
+        try:
+            metrics_conf = load_config().get('llm_metrics', {})
+        except FileNotFoundError:
+            metrics_conf = {}
+        _llm_metrics = LLMMetrics(
+            ledger_path=LLM_LEDGER_FILE if metrics_conf.get('ledger', True) else None,
+            window=metrics_conf.get('window', 3600)
+        )
+    return _llm_metrics
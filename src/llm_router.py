@@ -0,0 +1,362 @@
+"""
+Routing of LLM requests over several OpenAI-compatible providers.
+Each provider (endpoint + model + weight) keeps a rolling window of its recent
+latencies and errors. Every call goes to the healthy provider with the lowest
+latency / weight; a provider that fails or times out is put in a cooldown and
+the call fails over to the next one, all within one deadline. A provider is
+retried (after all others failed) only once its cooldown, or the Retry-After it
+sent, has passed; calls are not hedged, the per-attempt timeout plays that role.
+Exposes the same create / stream interface as AsyncLLMClient, so ETFAnalyzer
+uses either.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from openai import AsyncOpenAI
+from src.llm_client import LLMClientMetrics, LLMDeadlineExceeded, is_retryable, retry_after
+from src.utils import load_config, setup_logger
+
+logger = setup_logger('LLMRouter')
+
+
+def should_fail_over(error):
+    """
+    Errors another provider may not have: timeouts, rate limits, server errors,
+    dropped connections and a rejected key or unknown model (401/403/404).
+    A malformed request (400/422) would fail everywhere and is raised as is.
+    """
+    if isinstance(error, asyncio.TimeoutError) or is_retryable(error):
+        return True
+    return getattr(error, 'status_code', None) in (401, 403, 404)
+
+
+class Provider:
+    def __init__(self, name, model, base_url=None, api_key=None, weight=1.0, timeout=30,
+                 concurrency=4, window=300, client=None):
+        """
+        One OpenAI-compatible endpoint.
+
+        Args:
+            name: Name used in logs and stats
+            model: Model requested from this provider (replaces the caller's model)
+            base_url: API base
+            api_key: API key
+            weight: Preference; the routing score is recent latency divided by weight
+            timeout: Seconds per attempt
+            concurrency: Maximum requests in flight to this provider
+            window: Seconds of outcomes kept for latency and error rate
+            client: AsyncOpenAI-compatible client to use instead of creating one
+        """
+        self.name = name
+        self.model = model
+        self.weight = weight
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.window = window
+        self.client = client or AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self.outcomes = deque()  # (timestamp, seconds, ok)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.counts = {'requests': 0, 'failures': 0}
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok, cooldown=0.0):
+        """Record one attempt; a failure also starts a cooldown of the given length."""
+        now = time.time()
+        with self._lock:
+            self.outcomes.append((now, seconds, ok))
+            while self.outcomes and self.outcomes[0][0] < now - self.window:
+                self.outcomes.popleft()
+            self.counts['requests'] += 1
+            if ok:
+                self.consecutive_failures = 0
+                self.cooldown_until = 0.0
+            else:
+                self.counts['failures'] += 1
+                self.consecutive_failures += 1
+                self.cooldown_until = now + cooldown
+
+    def latency(self):
+        """Mean seconds of the successful attempts in the window (None without data)."""
+        with self._lock:
+            values = [seconds for _, seconds, ok in self.outcomes if ok]
+        return sum(values) / len(values) if values else None
+
+    def samples(self):
+        with self._lock:
+            return len(self.outcomes)
+
+    def error_rate(self):
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return sum(1 for _, _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def get_stats(self):
+        latency = self.latency()
+        return {
+            **self.counts,
+            'latency_ms': latency * 1000 if latency is not None else None,
+            'error_rate': self.error_rate(),
+            'cooling_down': self.cooldown_until > time.time(),
+        }
+
+
+class LLMRouter:
+    def __init__(self, providers, deadline=90, max_attempts=None, max_error_rate=0.5, min_samples=3,
+                 cooldown=5.0, max_cooldown=120.0, prior_latency=5.0, explore=0.05):
+        """
+        Start the router's event loop.
+
+        Args:
+            providers: Provider instances (the first is preferred while nothing is measured)
+            deadline: Seconds per call, failovers included
+            max_attempts: Attempts per call (default: two per provider)
+            max_error_rate: Error rate in the window above which a provider is unhealthy
+            min_samples: Outcomes needed before the error rate counts
+            cooldown: Seconds a provider is skipped after a failure, doubled per consecutive failure
+            max_cooldown: Upper bound of a cooldown
+            prior_latency: Seconds assumed for a provider without measurements
+            explore: Share of calls sent to a random healthy provider (by weight) to keep
+                the latencies of the others current
+        """
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.max_attempts = max_attempts or 2 * len(self.providers)
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.prior_latency = prior_latency
+        self.explore = explore
+        self.concurrency = sum(p.concurrency for p in self.providers)
+        self.metrics = LLMClientMetrics()
+        self.metrics.counts['failovers'] = 0
+        self._served = threading.local()
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='llm-router', daemon=True)
+        self._thread.start()
+
+    def healthy(self, provider, now=None):
+        if provider.cooldown_until > (now or time.time()):
+            return False
+        return provider.samples() < self.min_samples or provider.error_rate() <= self.max_error_rate
+
+    def score(self, provider):
+        """Expected seconds of a call, divided by the provider's weight (lower is better)."""
+        latency = provider.latency()
+        return (latency if latency is not None else self.prior_latency) / max(provider.weight, 1e-6)
+
+    def ranked(self, explore=True):
+        """
+        Providers in the order a call tries them: healthy ones by score, then the
+        unhealthy ones by the end of their cooldown (as a last resort).
+        """
+        now = time.time()
+        order = {id(p): i for i, p in enumerate(self.providers)}
+        healthy = sorted((p for p in self.providers if self.healthy(p, now)),
+                         key=lambda p: (self.score(p), order[id(p)]))
+        unhealthy = sorted((p for p in self.providers if not self.healthy(p, now)),
+                           key=lambda p: (p.cooldown_until, order[id(p)]))
+        if explore and len(healthy) > 1 and random.random() < self.explore:
+            pick = random.choices(healthy, weights=[max(p.weight, 1e-6) for p in healthy])[0]
+            healthy.remove(pick)
+            healthy.insert(0, pick)
+        return healthy + unhealthy
+
+    def models(self):
+        """Distinct provider models in the order a call would try them (exploration aside)."""
+        return list(dict.fromkeys(p.model for p in self.ranked(explore=False)))
+
+    def run(self, coro):
+        """Run a coroutine on the router's loop and wait for its result (callable from any thread)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def create(self, **kwargs):
+        """Blocking chat completion on the best provider, failing over within the deadline."""
+        result, self._served.model = self.run(self._route(self._attempt, kwargs))
+        return result
+
+    def stream(self, on_text, **kwargs):
+        """Blocking streamed chat completion; returns (text, usage)."""
+        result, self._served.model = self.run(self._route_stream(on_text, kwargs))
+        return result
+
+    def served_model(self):
+        """Model of the provider that answered the calling thread's last create / stream (None before one did)."""
+        return getattr(self._served, 'model', None)
+
+    async def acreate(self, **kwargs):
+        return (await self._route(self._attempt, kwargs))[0]
+
+    async def astream(self, on_text, **kwargs):
+        """Streamed chat completion; fails over only while no text has reached on_text."""
+        return (await self._route_stream(on_text, kwargs))[0]
+
+    async def _route_stream(self, on_text, kwargs):
+        received = []
+
+        def forward(text):
+            received.append(len(text))
+            on_text(text)
+        return await self._route(self._stream_attempt, dict(kwargs, on_text=forward), streamed=lambda: bool(received))
+
+    async def _route(self, attempt, kwargs, streamed=lambda: False):
+        """Run attempt on the best provider, failing over within the deadline; returns (result, model)."""
+        self.metrics.count('requests')
+        start = time.perf_counter()
+        tried = set()
+        error = reason = previous = None
+        for n in range(self.max_attempts):
+            remaining = self.deadline - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            candidates = [p for p in self.ranked() if p.name not in tried]
+            if not candidates:
+                # Every provider failed once: start another round
+                tried.clear()
+                candidates = self.ranked()
+            provider = candidates[0]
+            wait = provider.cooldown_until - time.time()
+            if wait > 0:
+                # Every provider is cooling down: back off until the first one may be asked again
+                await asyncio.sleep(min(wait, remaining))
+                remaining = self.deadline - (time.perf_counter() - start)
+                if remaining <= 0:
+                    break
+            if n:
+                self.metrics.count('failovers' if provider.name != previous else 'retries')
+                logger.warning(f"LLM request {reason}, trying {provider.name}")
+            tried.add(provider.name)
+            previous = provider.name
+            self.metrics.count('attempts')
+            attempt_start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    attempt(provider, dict(kwargs, model=provider.model)), min(provider.timeout, remaining)
+                )
+            except Exception as e:
+                seconds = time.perf_counter() - attempt_start
+                if not should_fail_over(e):
+                    # The request itself is at fault, not the provider
+                    self.metrics.count('failures')
+                    raise
+                cooldown = min(self.max_cooldown, self.cooldown * 2 ** provider.consecutive_failures)
+                provider.record(seconds, False, max(cooldown, retry_after(e) or 0))
+                error = e
+                reason = f"to {provider.name} timed out" if isinstance(e, asyncio.TimeoutError) \
+                    else f"to {provider.name} failed ({e})"
+                if streamed():
+                    # Text already handed to on_text can't be taken back
+                    self.metrics.count('failures')
+                    raise
+                continue
+            provider.record(time.perf_counter() - attempt_start, True)
+            self.metrics.observe(time.perf_counter() - start)
+            return result, provider.model
+
+        if error is None or time.perf_counter() - start >= self.deadline:
+            self.metrics.count('deadline_exceeded')
+            detail = f" (last request {reason})" if reason else ''
+            raise LLMDeadlineExceeded(f"LLM request exceeded its {self.deadline}s deadline{detail}")
+        self.metrics.count('failures')
+        raise error
+
+    @staticmethod
+    async def _attempt(provider, kwargs):
+        if provider._semaphore is None:
+            provider._semaphore = asyncio.Semaphore(provider.concurrency)
+        async with provider._semaphore:
+            return await provider.client.chat.completions.create(**kwargs)
+
+    @staticmethod
+    async def _stream_attempt(provider, kwargs):
+        kwargs = dict(kwargs)
+        on_text = kwargs.pop('on_text')
+        if provider._semaphore is None:
+            provider._semaphore = asyncio.Semaphore(provider.concurrency)
+        async with provider._semaphore:
+            parts, usage = [], None
+            stream = await provider.client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = chunk.choices[0].delta.content
+                    parts.append(text)
+                    on_text(text)
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+            return ''.join(parts), usage
+
+    def get_stats(self):
+        """Per-provider requests, failures, mean latency, error rate and cooldown state."""
+        return {p.name: p.get_stats() for p in self.providers}
+
+    def close(self):
+        async def shutdown():
+            for provider in self.providers:
+                await provider.client.close()
+
+        try:
+            self.run(shutdown())
+        except Exception as e:
+            logger.warning(f"Error closing LLM router: {e}")
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+
+# Global LLM router instance
+_llm_router = None
+
+
+def get_llm_router():
+    """Get or create global LLM router (None unless llm_router is enabled with providers in config)."""
+    global _llm_router
+    if _llm_router is None:
+        try:
+            config = load_config()
+        except FileNotFoundError:
+            config = {}
+        router_conf = config.get('llm_router', {})
+        if not router_conf.get('enabled', False) or not router_conf.get('providers'):
+            return None
+        llm_conf = config.get('llm_config', {})
+        providers = [
+            Provider(
+                name=p.get('name', p.get('model', f"provider{i}")),
+                model=p.get('model', llm_conf.get('model')),
+                base_url=p.get('api_base'),
+                api_key=p.get('api_key'),
+                weight=p.get('weight', 1.0),
+                timeout=p.get('timeout', 30),
+                concurrency=p.get('concurrency', 4),
+                window=router_conf.get('window', 300)
+            )
+            for i, p in enumerate(router_conf['providers'])
+        ]
+        _llm_router = LLMRouter(
+            providers,
+            deadline=router_conf.get('deadline', 90),
+            max_attempts=router_conf.get('max_attempts'),
+            max_error_rate=router_conf.get('max_error_rate', 0.5),
+            cooldown=router_conf.get('cooldown', 5.0),
+            max_cooldown=router_conf.get('max_cooldown', 120.0),
+            prior_latency=router_conf.get('prior_latency', 5.0),
+            explore=router_conf.get('explore', 0.05)
+        )
+    return _llm_router
+
+
+def close_llm_router():
+    """Close the global LLM router if it was created."""
+    global _llm_router
+    if _llm_router is not None:
+        _llm_router.close()
+        _llm_router = None
@@ -2,8 +2,18 @@ import time
 import schedule
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from src.utils import load_config, setup_logger
-from src.monitor import TwitterMonitor
+from src.monitor import TwitterMonitor, MultiAccountMonitor
+from src.browser import get_browser_manager, close_browser_manager
+from src.async_monitor import get_async_runner, close_async_runner
+from src.llm_client import close_llm_client
+from src.llm_router import LLMRouter, close_llm_router
+from src.llm_metrics import format_report, load_ledger
+from src.timeline_cache import get_validator_cache
+from src.scheduler import get_poll_scheduler
+from src.relevance import get_relevance_gate
+from src.entity_resolver import EntityResolver
 from src.analyzer import ETFAnalyzer
 from src.market_data import MarketData
 from src.sector_data import SectorData
@@ -74,117 +84,260 @@ def process_sectors_and_concepts(tweet_text, sectors, concepts, sector_data, sto
     return result
 
 
-def job(config, analyzer, market_data, sector_data, stock_hot, notifier):
-    accounts = config.get("accounts", ["elonmusk"])
-    logger.info("Checking for new tweets...")
+def make_prefetcher(market_data, sector_data, resolver, executor):
+    """
+    Callback for streamed LLM picks: start the holdings / constituent fetch of each
+    ETF, sector and concept as soon as it is streamed, while the rest of the reply
+    (including the summary) is still being generated.
+
+    Args:
+        market_data: MarketData instance
+        sector_data: SectorData instance
+        resolver: EntityResolver (picks are fetched under their canonical name, unknown ones not at all)
+        executor: Executor the fetches run on
+    """
+    def on_item(key, value):
+        if key == 'etf_codes':
+            code = resolver.resolve_etf_code(value)
+            if code:
+                market_data.prefetch_holdings(code, executor)
+        elif key in ('sectors', 'concepts'):
+            kind = 'sector' if key == 'sectors' else 'concept'
+            name = resolver.resolve_board(kind, value)
+            if name:
+                sector_data.prefetch_board_stocks(kind, name, executor)
+    return on_item
+
+
+def job(config, analyzer, market_data, sector_data, stock_hot, notifier, accounts=None):
+    """
+    Fetch new tweets of the given accounts (all configured ones by default), analyze and notify.
+
+    Returns:
+        List of new tweets found (so the adaptive scheduler can tell busy accounts from quiet ones),
+        or None if the job failed
+    """
+    accounts = accounts or config.get("accounts", ["elonmusk"])
+    logger.info(f"Checking for new tweets ({', '.join(accounts)})...")
+    all_new_tweets = []
+    prefetch_pool = None
     try:
-        all_new_tweets = []
-        for account in accounts:
-            monitor = TwitterMonitor(account=account)
-            new_tweets = monitor.fetch_tweets()
-            for t in new_tweets:
-                t.setdefault("author", account)
-            all_new_tweets.extend(new_tweets)
+        browser_manager = get_browser_manager()
+        batch_size = config.get("multi_account_batch_size", 0)
+        if config.get("async_fetch", {}).get("enabled", False):
+            # All accounts concurrently, each in its own context of one async browser
+            all_new_tweets.extend(get_async_runner().fetch_all(accounts))
+        elif batch_size > 1 and len(accounts) > 1:
+            # One combined timeline per batch instead of one page per account
+            for i in range(0, len(accounts), batch_size):
+                monitor = MultiAccountMonitor(accounts[i:i + batch_size], browser_manager=browser_manager)
+                all_new_tweets.extend(monitor.fetch_tweets())
+        else:
+            for account in accounts:
+                monitor = TwitterMonitor(account=account, browser_manager=browser_manager)
+                new_tweets = monitor.fetch_tweets()
+                for t in new_tweets:
+                    t.setdefault("author", account)
+                all_new_tweets.extend(new_tweets)
+
+        stats = browser_manager.get_stats()
+        logger.info(
+            f"Browser stats: launches={stats['launches']}, pages={stats['pages']}, "
+            f"avg_launch={stats['avg_launch_ms']:.0f}ms, avg_page_acquire={stats['avg_acquire_ms']:.1f}ms"
+        )
+        cache_stats = get_validator_cache().get_stats()
+        logger.info(
+            f"Timeline cache: {cache_stats['hits']}/{cache_stats['requests']} unchanged "
+            f"(hit rate {cache_stats['hit_rate']:.0%}, 304s={cache_stats['not_modified']}, "
+            f"~{cache_stats['bytes_saved'] / 1024:.0f} KB not downloaded)"
+        )
 
         if not all_new_tweets:
             logger.info("No new tweets found.")
-            return
+            return all_new_tweets
 
         # Get ETF list once for all tweets
-        etf_list = market_data.get_etf_list_for_analysis()
+        etf_list = market_data.get_etf_list_for_analysis() or []
         if not etf_list:
             logger.warning("ETF list not available, skipping ETF analysis")
 
+        # Get sector and concept lists once for all tweets
+        try:
+            sectors_list = sector_data.get_sector_list()
+            concepts_list = sector_data.get_concept_list()
+        except Exception as e:
+            logger.error(f"Failed to load sector/concept lists: {e}", exc_info=True)
+            sectors_list, concepts_list = [], []
+
+        # LLM picks are mapped onto these lists (or dropped) before anything is fetched
+        resolver = EntityResolver(etf_list, sectors_list, concepts_list)
+
+        combined_analysis = config.get('llm_config', {}).get('combined_analysis', True)
+        # Stream the combined reply and start enrichment fetches as picks arrive
+        prefetch = None
+        if combined_analysis and config.get('llm_config', {}).get('stream', False):
+            prefetch_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix='prefetch')
+            prefetch = make_prefetcher(market_data, sector_data, resolver, prefetch_pool)
+        # Only the top-K ETFs by local retrieval go into the prompt (0 sends the whole list)
+        retrieval_conf = config.get('candidate_retrieval', {})
+        etf_top_k = retrieval_conf.get('etf_top_k', 40)
+        sector_top_k = retrieval_conf.get('sector_top_k', 20)
+        concept_top_k = retrieval_conf.get('concept_top_k', 40)
+
+        # Local relevance gate: tweets without a market angle get no full analysis
+        gate = get_relevance_gate()
+        gated = {}  # {tweet id: reason}
+        for tweet in all_new_tweets:
+            relevant, reason = gate.check(tweet['text'])
+            if not relevant:
+                gated[tweet['id']] = reason
+        analyzed_tweets = [tweet for tweet in all_new_tweets if tweet['id'] not in gated]
+        analysis_seconds = 0.0
+
+        # Candidate shortlists of every tweet
+        tweet_candidates = {}
+        for tweet in analyzed_tweets:
+            etf_candidates = etf_list
+            if etf_list and etf_top_k:
+                etf_candidates = market_data.shortlist_etfs(tweet['text'], etf_top_k, etf_list)
+            tweet_candidates[tweet['id']] = (etf_candidates,) + sector_data.shortlist_boards(
+                tweet['text'], sectors_list, concepts_list, sector_top_k, concept_top_k
+            )
+
+        # A burst of new tweets is analyzed a batch at a time instead of one request per tweet
+        batch_size = config.get('llm_config', {}).get('batch_size', 8)
+        batch_analyses = {}
+        batched = set()  # ids the batch attempted; failures aren't retried one by one
+        if combined_analysis and batch_size > 1 and len(analyzed_tweets) > 1:
+            batched = {tweet['id'] for tweet in analyzed_tweets}
+            start = time.perf_counter()
+            batch_analyses = analyzer.analyze_combined_batch(
+                [{'id': tweet['id'], 'text': tweet['text'], 'etf_list': tweet_candidates[tweet['id']][0],
+                  'sector_list': tweet_candidates[tweet['id']][1], 'concept_list': tweet_candidates[tweet['id']][2]}
+                 for tweet in analyzed_tweets],
+                max_batch=batch_size,
+                max_tokens=config.get('llm_config', {}).get('batch_max_tokens', 8000)
+            )
+            analysis_seconds += time.perf_counter() - start
+
+        durations = []  # seconds of each per-tweet analysis
+
+        def analyze(tweet):
+            """(summary, ETF codes, relevant sectors/concepts) of one tweet the batch didn't cover."""
+            etf_candidates, sector_candidates, concept_candidates = tweet_candidates[tweet['id']]
+            summary, etf_codes = "", []
+            start = time.perf_counter()
+            if combined_analysis:
+                # One request for summary, ETFs, sectors and concepts
+                analysis = analyzer.analyze_combined(
+                    tweet['text'], etf_candidates, sector_candidates, concept_candidates, on_item=prefetch
+                )
+                summary, etf_codes = analysis['summary'], analysis['etf_codes']
+                relevant = {'sectors': analysis['sectors'], 'concepts': analysis['concepts']}
+            else:
+                if etf_list:
+                    summary, etf_codes = analyzer.analyze_relevant_etfs(tweet['text'], etf_candidates)
+                relevant = analyzer.analyze_relevant_sectors(tweet['text'], sector_candidates, concept_candidates)
+            durations.append(time.perf_counter() - start)
+            return summary, etf_codes, relevant
+
+        # The rest get one request each; with the async layer they are in flight at the same time
+        single = [tweet for tweet in analyzed_tweets if tweet['id'] not in batched]
+        if analyzer.llm is not None and len(single) > 1:
+            with ThreadPoolExecutor(max_workers=analyzer.llm.concurrency) as executor:
+                analyses = dict(zip([tweet['id'] for tweet in single], executor.map(analyze, single)))
+        else:
+            analyses = {tweet['id']: analyze(tweet) for tweet in single}
+        for tweet_id in batched:
+            analysis = batch_analyses.get(tweet_id, {})
+            analyses[tweet_id] = (analysis.get('summary', ''), analysis.get('etf_codes', []),
+                                  {'sectors': analysis.get('sectors', []), 'concepts': analysis.get('concepts', [])})
+        analysis_seconds += sum(durations)
+
         for tweet in all_new_tweets:
             logger.info(f"Processing new tweet [{tweet.get('author', '?')}] {tweet['id']}")
 
-            # 1. Analyze with LLM to get summary and ETF codes
+            # 1. LLM summary, ETF codes and sectors/concepts (analyzed above)
             summary = ""
+            etf_codes = []
+            relevant = {'sectors': [], 'concepts': []}
             etf_results = []
             final_common_stocks = []
 
-            if etf_list:
-                summary, etf_codes = analyzer.analyze_relevant_etfs(tweet['text'], etf_list)
-
-                # 2. Get ETF details and holdings for selected ETFs
-                if etf_codes:
-                    stock_stats = {}  # {code: {'name': name, 'count': 0, 'weight': 0.0}}
-
-                    # Build ETF results from selected codes
-                    for code in etf_codes:
-                        # Find ETF name from list
-                        etf_info = next((e for e in etf_list if e['code'] == code), None)
-                        if not etf_info:
-                            logger.warning(f"ETF code {code} not found in ETF list")
-                            continue
-
-                        holdings = market_data.get_holdings(code)
-                        # Only include ETFs that have valid holdings data
-                        if not holdings:
-                            logger.info(f"ETF {etf_info['name']}({code}) has no holdings data, skipping")
-                            continue
-
-                        etf_results.append({
-                            'code': code,
-                            'name': etf_info['name'],
-                            'holdings': holdings
-                        })
-
-                        # Deduplicate holdings by stock code within this ETF
-                        # (akshare may return multiple records for the same stock)
-                        unique_holdings = {}
-                        for h in holdings:
-                            s_code = h.get('股票代码')
-                            if s_code and s_code not in unique_holdings:
-                                unique_holdings[s_code] = h
-
-                        # Accumulate stock stats for intersection (using deduplicated holdings)
-                        for h in unique_holdings.values():
-                            s_code = h.get('股票代码')
-                            s_name = h.get('股票名称')
-                            # '占净值比例' is usually a string like "10.5" or float
-                            try:
-                                weight = float(h.get('占净值比例', 0))
-                            except:
-                                weight = 0.0
-
-                            if s_code not in stock_stats:
-                                stock_stats[s_code] = {'name': s_name, 'count': 0, 'total_weight': 0.0}
-
-                            stock_stats[s_code]['count'] += 1
-                            stock_stats[s_code]['total_weight'] += weight
-
-                    # Rank stocks: primarily by count (intersection), secondarily by total weight
-                    ranked_stocks = sorted(
-                        stock_stats.items(),
-                        key=lambda x: (x[1]['count'], x[1]['total_weight']),
-                        reverse=True
-                    )
+            if tweet['id'] in gated:
+                logger.info(f"Relevance gate: no ETF/sector analysis ({gated[tweet['id']]})")
+                if gate.mode == 'summary_only':
+                    summary = analyzer.summarize(tweet['text'])
+            else:
+                summary, etf_codes, relevant = analyses[tweet['id']]
+                etf_codes = resolver.etf_codes(etf_codes)
+
+            if etf_codes:
+                stock_stats = {}  # {code: {'name': name, 'count': 0, 'weight': 0.0}}
+
+                # Build ETF results from selected codes
+                for code in etf_codes:
+                    etf_info = resolver.etfs_by_code[code]
+                    holdings = market_data.get_holdings(code)
+                    # Only include ETFs that have valid holdings data
+                    if not holdings:
+                        logger.info(f"ETF {etf_info['name']}({code}) has no holdings data, skipping")
+                        continue
+
+                    etf_results.append({
+                        'code': code,
+                        'name': etf_info['name'],
+                        'holdings': holdings
+                    })
+
+                    # Deduplicate holdings by stock code within this ETF
+                    # (akshare may return multiple records for the same stock)
+                    unique_holdings = {}
+                    for h in holdings:
+                        s_code = h.get('股票代码')
+                        if s_code and s_code not in unique_holdings:
+                            unique_holdings[s_code] = h
+
+                    # Accumulate stock stats for intersection (using deduplicated holdings)
+                    for h in unique_holdings.values():
+                        s_code = h.get('股票代码')
+                        s_name = h.get('股票名称')
+                        # '占净值比例' is usually a string like "10.5" or float
+                        try:
+                            weight = float(h.get('占净值比例', 0))
+                        except:
+                            weight = 0.0
+
+                        if s_code not in stock_stats:
+                            stock_stats[s_code] = {'name': s_name, 'count': 0, 'total_weight': 0.0}
+
+                        stock_stats[s_code]['count'] += 1
+                        stock_stats[s_code]['total_weight'] += weight
+
+                # Rank stocks: primarily by count (intersection), secondarily by total weight
+                ranked_stocks = sorted(
+                    stock_stats.items(),
+                    key=lambda x: (x[1]['count'], x[1]['total_weight']),
+                    reverse=True
+                )
 
-                    # Take top 10 common stocks
-                    for s_code, stats in ranked_stocks[:10]:
-                        final_common_stocks.append({
-                            'code': s_code,
-                            'name': stats['name'],
-                            'occurrence': stats['count'],
-                            'total_weight': stats['total_weight']
-                        })
+                # Take top 10 common stocks
+                for s_code, stats in ranked_stocks[:10]:
+                    final_common_stocks.append({
+                        'code': s_code,
+                        'name': stats['name'],
+                        'occurrence': stats['count'],
+                        'total_weight': stats['total_weight']
+                    })
 
             # 3. Process sectors and concepts (new feature)
             sector_result = {}
             try:
-                # Get sector and concept lists
-                sectors_list = sector_data.get_sector_list()
-                concepts_list = sector_data.get_concept_list()
-
-                # Analyze relevant sectors/concepts
-                relevant = analyzer.analyze_relevant_sectors(tweet['text'], sectors_list, concepts_list)
-
                 # Process and get hot stocks
                 sector_result = process_sectors_and_concepts(
                     tweet['text'],
-                    relevant.get('sectors', []),
-                    relevant.get('concepts', []),
+                    resolver.sectors(relevant.get('sectors', [])),
+                    resolver.concepts(relevant.get('concepts', [])),
                     sector_data,
                     stock_hot
                 )
@@ -202,16 +355,109 @@ def job(config, analyzer, market_data, sector_data, stock_hot, notifier):
                 'concept_names': sector_result.get('concept_names', [])
             })
 
+        if gated:
+            # Estimated at the average time of the analyses that did run this round
+            saved = len(gated) * analysis_seconds / len(analyzed_tweets) if analyzed_tweets else 0.0
+            logger.info(
+                f"Relevance gate ({gate.mode}): {len(gated)}/{len(all_new_tweets)} tweets without full analysis, "
+                f"~{saved:.1f}s of LLM time saved; {gate.stats['gated']}/{gate.stats['checked']} "
+                f"({gate.stats['gated'] / gate.stats['checked']:.0%}) since start"
+            )
+
+        if analyzer.cache is not None:
+            llm_stats = analyzer.cache.get_stats()
+            logger.info(
+                f"LLM cache: {llm_stats['hits']} hits / {llm_stats['misses']} misses "
+                f"(hit rate {llm_stats['hit_rate']:.0%}, {llm_stats['size']} cached)"
+            )
+        usage = analyzer.usage_stats
+        if usage['prompt_tokens']:
+            logger.info(
+                f"LLM usage: {usage['requests']} requests, {usage['prompt_tokens']} prompt tokens "
+                f"({usage['cached_tokens'] / usage['prompt_tokens']:.0%} served from provider cache), "
+                f"{usage['completion_tokens']} completion tokens"
+            )
+        for call_type, stats in analyzer.metrics.summary().items():
+            if not stats['calls']:
+                continue
+            parse_info = ''
+            if stats['parsed']:
+                parse_info = (f", {stats['parse_failures']}/{stats['parsed']} JSON replies unparsable "
+                              f"({stats['repaired']} repaired)")
+            logger.info(
+                f"LLM {call_type} calls (rolling window): {stats['calls']}, "
+                f"p95 <= {stats['wall'].quantile(0.95)} ms, "
+                f"{stats['prompt_tokens'] / stats['calls']:.0f} prompt tokens per call{parse_info}"
+            )
+        if analyzer.llm is not None:
+            client_stats = analyzer.llm.metrics.get_stats()
+            if client_stats['requests']:
+                logger.info(
+                    f"LLM latency p50 {client_stats['p50_ms'] or 0:.0f} ms / p95 {client_stats['p95_ms'] or 0:.0f} ms, "
+                    f"{client_stats['retries']} retries, {client_stats['hedges']} hedged "
+                    f"({client_stats['hedge_wins']} won), {client_stats.get('failovers', 0)} failovers, "
+                    f"{client_stats['deadline_exceeded']} past deadline"
+                )
+            if isinstance(analyzer.llm, LLMRouter):
+                for name, provider_stats in analyzer.llm.get_stats().items():
+                    latency = provider_stats['latency_ms']
+                    logger.info(
+                        f"LLM provider {name}: {provider_stats['requests']} requests, "
+                        f"{provider_stats['failures']} failed (error rate {provider_stats['error_rate']:.0%}), "
+                        f"mean latency {f'{latency:.0f} ms' if latency is not None else '-'}"
+                        f"{', cooling down' if provider_stats['cooling_down'] else ''}"
+                    )
+
     except Exception as e:
         logger.error(f"Error in job loop: {e}", exc_info=True)
+        return None
+    finally:
+        if prefetch_pool is not None:
+            # Picks of all tweets were prefetched up front; drop the ones never asked for,
+            # and don't leak the pool's threads when the round failed halfway
+            market_data.clear_prefetched()
+            sector_data.clear_prefetched()
+            prefetch_pool.shutdown(wait=False)
+
+    return all_new_tweets
+
+
+def run_adaptive(config, analyzer, market_data, sector_data, stock_hot, notifier):
+    """Poll each account on its own adaptive schedule instead of one global interval."""
+    accounts = config.get('accounts', ['elonmusk'])
+    scheduler = get_poll_scheduler(accounts, base_interval=config.get('check_interval', 300))
+    logger.info(f"Monitor started. Accounts: {accounts}. Adaptive polling "
+                f"({scheduler.min_interval}-{scheduler.max_interval} seconds per account).")
+
+    while True:
+        due = scheduler.due_accounts()
+        if due:
+            new_tweets = job(config, analyzer, market_data, sector_data, stock_hot, notifier, accounts=due)
+            if new_tweets is None:
+                scheduler.record_failure(due)
+            else:
+                scheduler.record_polls(due, new_tweets)
+            logger.info(f"Scheduler: {scheduler.stats['polls']} account polls so far, "
+                        f"{scheduler.stats['polls_with_news']} with new tweets")
+        time.sleep(max(1.0, scheduler.seconds_until_next()))
 
 
 def main():
     parser = argparse.ArgumentParser(description='Musk Tweet Monitor')
     parser.add_argument('--dry-run', action='store_true', help='Run once and exit, do not save processed tweets (not fully implemented in submodules but main loop will exit)')
     parser.add_argument('--test-notify', action='store_true', help='Send a test notification and exit')
+    parser.add_argument('--llm-report', type=float, metavar='HOURS',
+                        help='Print token usage, latency and cost of the LLM calls of the last HOURS hours and exit')
     args = parser.parse_args()
 
+    if args.llm_report is not None:
+        try:
+            prices = load_config().get('llm_metrics', {}).get('prices')
+        except FileNotFoundError:
+            prices = None
+        print(format_report(load_ledger(since=time.time() - args.llm_report * 3600), args.llm_report, prices))
+        return
+
     try:
         config = load_config()
     except Exception as e:
@@ -220,7 +466,9 @@ def main():
 
     analyzer = ETFAnalyzer()
     market_data = MarketData()
-    sector_data = SectorData()
+    sector_data = SectorData(
+        use_member_stocks=config.get('candidate_retrieval', {}).get('use_member_stocks', True)
+    )
     stock_hot = StockHot()
     notifier = Notifier(config)
 
@@ -245,7 +493,23 @@ def main():
     # If dry run, we might want to just fetch current RSS and print what we WOULD do
     if args.dry_run:
         logger.info("Dry run mode: Checking once...")
-        job(config, analyzer, market_data, sector_data, stock_hot, notifier)
+        try:
+            job(config, analyzer, market_data, sector_data, stock_hot, notifier)
+        finally:
+            close_async_runner()
+            close_browser_manager()
+            close_llm_client()
+            close_llm_router()
+        return
+
+    if config.get('adaptive_schedule', {}).get('enabled', False):
+        try:
+            run_adaptive(config, analyzer, market_data, sector_data, stock_hot, notifier)
+        finally:
+            close_async_runner()
+            close_browser_manager()
+            close_llm_client()
+            close_llm_router()
         return
 
     # Schedule
@@ -254,12 +518,18 @@ def main():
 
     logger.info(f"Monitor started. Accounts: {config.get('accounts', ['elonmusk'])}. Checking every {interval} seconds.")
 
-    # Run once at startup
-    job(config, analyzer, market_data, sector_data, stock_hot, notifier)
+    try:
+        # Run once at startup
+        job(config, analyzer, market_data, sector_data, stock_hot, notifier)
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
+    finally:
+        close_async_runner()
+        close_browser_manager()
+        close_llm_client()
+        close_llm_router()
 
 
 if __name__ == "__main__":
@@ -4,7 +4,9 @@ Market data module for ETF data using akshare with caching.
 
 import akshare as ak
 import pandas as pd
+import time
 from src.cache_manager import get_cache_manager
+from src.candidate_index import CandidateIndex
 from src.utils import DATA_DIR, setup_logger
 import os
 
@@ -16,6 +18,11 @@ ETF_CACHE_FILE = os.path.join(DATA_DIR, 'etf_cache.csv')
 class MarketData:
     def __init__(self):
         self.cache = get_cache_manager()
+        # Retrieval index over ETF names and the list it was built from
+        self._etf_index = None
+        self._etf_index_key = None
+        # {code: Future} of holdings fetches started by prefetch_holdings
+        self._prefetched = {}
 
     def _load_or_update_cache(self):
         """
@@ -131,6 +138,57 @@ class MarketData:
 
         return etf_list
 
+    def get_etf_index(self, etf_list=None):
+        """
+        Get the BM25 index over ETF names, rebuilt only when the ETF list changes.
+
+        Args:
+            etf_list: Result of get_etf_list_for_analysis() (fetched if None)
+        """
+        if etf_list is None:
+            etf_list = self.get_etf_list_for_analysis()
+        key = hash(tuple((etf['code'], etf['name']) for etf in etf_list))
+        if self._etf_index is None or key != self._etf_index_key:
+            start = time.perf_counter()
+            self._etf_index = CandidateIndex(etf_list, lambda etf: etf['name'])
+            self._etf_index_key = key
+            logger.info(f"Built ETF retrieval index over {len(etf_list)} ETFs "
+                        f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return self._etf_index
+
+    def shortlist_etfs(self, tweet_text, top_k=40, etf_list=None):
+        """
+        Shortlist the ETFs whose names best match a tweet (plus topic expansions).
+
+        Args:
+            tweet_text: Tweet content
+            top_k: Number of ETFs returned (padded with other ETFs if fewer match)
+            etf_list: Result of get_etf_list_for_analysis() (fetched if None)
+
+        Returns:
+            List of dicts with 'code' and 'name' keys, best match first; the whole
+            list if nothing matches
+        """
+        candidates = self.get_etf_index(etf_list).shortlist(tweet_text, top_k)
+        logger.info(f"Shortlisted {len(candidates)} ETF candidates for the LLM")
+        return candidates
+
+    def prefetch_holdings(self, code, executor):
+        """
+        Start fetching an ETF's holdings in the background; the next
+        get_holdings(code) waits for this fetch instead of starting another.
+
+        Args:
+            code: ETF code
+            executor: concurrent.futures executor to run the fetch on
+        """
+        if code not in self._prefetched:
+            self._prefetched[code] = executor.submit(self._fetch_holdings, code)
+
+    def clear_prefetched(self):
+        """Forget prefetched holdings that were never asked for."""
+        self._prefetched.clear()
+
     def get_holdings(self, code):
         """
         Get all holdings for a given ETF code.
@@ -141,6 +199,12 @@ class MarketData:
         Returns:
             List of holding dicts with stock info
         """
+        future = self._prefetched.pop(code, None)
+        if future is not None:
+            return future.result()
+        return self._fetch_holdings(code)
+
+    def _fetch_holdings(self, code):
         logger.info(f"Fetching holdings for ETF {code}")
 
         def fetch():
@@ -1,177 +1,600 @@
 import time
-import random
-from playwright.sync_api import sync_playwright
-from src.utils import load_config, load_processed_tweets, save_processed_tweets, setup_logger, convert_to_beijing_time
+from urllib.parse import urlparse
+import requests
+import feedparser
+from src.browser import get_browser_manager, DEFAULT_USER_AGENT
+from src.timeline_cache import get_validator_cache, content_digest
+from src.instance_health import get_health_registry
+from src.reply_context import get_reply_resolver
+from src.tweet_store import get_tweet_store, snowflake
+from src.utils import load_config, setup_logger, convert_to_beijing_time
 
 logger = setup_logger('TwitterMonitor')
 
+# Fetch modes: 'auto' tries RSS first and falls back to the browser, 'rss' and 'browser' use only one engine
+FETCH_MODES = ('auto', 'rss', 'browser')
+
+# Seconds to skip RSS on an instance after it turned out to be disabled or broken
+RSS_RETRY_AFTER = 3600
+
+# Nitter RSS titles prefix replies and retweets, e.g. "R to @user: text" / "RT by @user: text"
+REPLY_PREFIX = 'R to @'
+RETWEET_PREFIX = 'RT by @'
+
+# Shared HTTP session so RSS polls reuse connections across monitors
+_http = requests.Session()
+_http.headers.update({'User-Agent': DEFAULT_USER_AGENT})
+
+# {instance: timestamp until which RSS is not attempted}
+_rss_unavailable = {}
+
+
+# Extract the first maxItems timeline items in one round trip instead of ~5 IPC calls per item.
+# Items are newest first, so the scan stops after the first regular tweet at or below the
+# watermark; pinned tweets and retweets are out of order and never end it.
+TIMELINE_ITEMS_JS = '''({maxItems, watermark}) => {
+    // Tweet IDs exceed Number precision, compare them as BigInt
+    const stopAt = watermark ? BigInt(watermark) : null;
+    const items = [];
+    for (const item of Array.from(document.querySelectorAll('.timeline-item')).slice(0, maxItems)) {
+        const link = item.querySelector('a.tweet-link');
+        if (!link) continue;
+        const href = link.getAttribute('href');
+        const id = href.split('/').pop().split('#')[0];
+        const content = item.querySelector('.tweet-content');
+        const date = item.querySelector('.tweet-date a');
+        const username = item.querySelector('.tweet-header a.username');
+        const isPinned = item.querySelector('.pinned') !== null;
+        const isRetweet = item.querySelector('.retweet-header') !== null;
+        items.push({
+            id: id,
+            href: href,
+            text: content ? content.innerText : '',
+            date_title: date ? date.getAttribute('title') : null,
+            is_reply: item.querySelector('.replying-to') !== null,
+            is_pinned: isPinned,
+            is_retweet: isRetweet,
+            author: username ? username.innerText : ''
+        });
+        if (stopAt !== null && !isPinned && !isRetweet && /^[0-9]+$/.test(id) && BigInt(id) <= stopAt) break;
+    }
+    return items;
+}'''
+
+# The parent is the timeline item immediately preceding the main tweet on a detail page.
+# Returns {id, text} of the parent, or null when the page shows none.
+PARENT_TWEET_JS = '''() => {
+    const main = document.querySelector('.main-tweet');
+    if (!main) return null;
+    // The main-tweet div itself might be a timeline-item, or wrapped.
+    // Usually class="timeline-item main-tweet"
+
+    // We want the previous sibling that is also a timeline-item (containing the parent tweet)
+    let prev = main.previousElementSibling;
+    while (prev && !prev.classList.contains('timeline-item')) {
+        prev = prev.previousElementSibling;
+    }
+
+    if (prev) {
+        const content = prev.querySelector('.tweet-content');
+        const link = prev.querySelector('a.tweet-link');
+        const href = link ? link.getAttribute('href') : '';
+        return {
+            id: href ? href.split('/').pop().split('#')[0] : null,
+            text: content ? content.innerText : ''
+        };
+    }
+    return null;
+}'''
+
+
+class RSSUnavailableError(Exception):
+    """Raised when an instance does not serve a usable RSS feed."""
+
+
+class RateLimitedError(Exception):
+    """Raised when an instance answers with a rate-limit response."""
+
+
+def _strip_title_prefix(title):
+    """Remove Nitter's 'R to @user: ' / 'RT by @user: ' prefix from an RSS title."""
+    for prefix in (REPLY_PREFIX, RETWEET_PREFIX):
+        if title.startswith(prefix):
+            sep = title.find(': ')
+            if sep != -1:
+                return title[sep + 2:]
+    return title
+
+
+def entries_from_items(items):
+    """Convert items returned by TIMELINE_ITEMS_JS into entry dicts."""
+    return [{
+        'id': item['id'],
+        'href': item['href'],
+        'text': item['text'],
+        'published_raw': item['date_title'] or "Unknown time",
+        'is_reply': item['is_reply'],
+        'is_pinned': item.get('is_pinned', False),
+        'is_retweet': item.get('is_retweet', False),
+        'author': item['author']
+    } for item in items]
+
+
+def timeline_digest(entries):
+    """Fingerprint a rendered timeline by its tweet links."""
+    return content_digest('\n'.join(entry['href'] for entry in entries))
+
+
 class TwitterMonitor:
-    def __init__(self, account="elonmusk"):
+    # Timeline items looked at per poll
+    max_items = 10
+
+    def __init__(self, account="elonmusk", browser_manager=None):
         self.account = account
+        self.browser_manager = browser_manager or get_browser_manager()
+        self.validators = get_validator_cache()
+        self.health = get_health_registry()
+        self.reply_resolver = get_reply_resolver()
         self.config = load_config()
         self.nitter_instances = self.config.get('nitter_instances', [])
         self.nitter_instances = [url.rstrip('/') for url in self.nitter_instances]
-        by_account = load_processed_tweets()
-        loaded_ids = by_account.get(self.account, [])
-        self.processed_tweets = set(loaded_ids)
-        self.is_first_run = len(loaded_ids) == 0
+        self.fetch_mode = self.config.get('fetch_mode', 'auto')
+        if self.fetch_mode not in FETCH_MODES:
+            logger.warning(f"Unknown fetch_mode '{self.fetch_mode}', using 'auto'")
+            self.fetch_mode = 'auto'
+        self.store = get_tweet_store()
+        # Newest tweet ID seen on this account's timeline (None before the first poll)
+        self.watermark = self.store.get_watermark(self.account)
+        # IDs marked processed and the new watermark from this poll, written to the store in one batch
+        self._pending_ids = []
+        self._pending_high = None
+
+    @property
+    def is_first_run(self):
+        return self.watermark is None
 
     def get_profile_url(self, instance):
         return f"{instance}/{self.account}"
 
-    def fetch_tweets(self):
-        new_tweets = []
-        # Shuffle instances to distribute load
-        instances = self.nitter_instances.copy()
-        random.shuffle(instances)
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            
-            for instance in instances:
-                url = self.get_profile_url(instance)
-                logger.info(f"Trying to fetch tweets from {url}")
-                context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    ignore_https_errors=True
-                )
-                page = context.new_page()
+    def get_rss_url(self, instance):
+        return f"{instance}/{self.account}/rss"
 
-                try:
-                    page.goto(url, timeout=30000)
-                    # Wait for timeline to load
-                    page.wait_for_selector('.timeline-item', timeout=30000)
-                    
-                    # Get timeline items
-                    timeline_items = page.query_selector_all('.timeline-item')
-                    
-                    if not timeline_items:
-                        logger.warning(f"No timeline items found on {instance}")
-                        continue
-
-                    logger.info(f"Successfully fetched {len(timeline_items)} items from {instance}")
-                    
-                    # Process entries
-                    for item in timeline_items[:10]:
-                        link_el = item.query_selector('a.tweet-link')
-                        if not link_el: continue
-                        tweet_link_suffix = link_el.get_attribute('href')
-                        tweet_id = tweet_link_suffix.split('/')[-1].split('#')[0]
-                        
-                        if tweet_id not in self.processed_tweets:
-                            # It's a new tweet
-                            if self.is_first_run:
-                                # Silent add for first run
-                                self.processed_tweets.add(tweet_id)
-                                continue
-
-                            # Normal processing
-                            full_link = f"{instance}{tweet_link_suffix}"
-                            content_el = item.query_selector('.tweet-content')
-                            text = content_el.inner_text() if content_el else ""
-                            date_el = item.query_selector('.tweet-date a')
-                            raw_published = date_el.get_attribute('title') if date_el else "Unknown time"
-                            published = convert_to_beijing_time(raw_published)
-                            
-                            replying_to_el = item.query_selector('.replying-to')
-                            is_reply = replying_to_el is not None
-                            
-                            final_text = text
-                            if is_reply:
-                                logger.info(f"Tweet {tweet_id} is a reply. Fetching context...")
-                                try:
-                                    # Open detail page to get context
-                                    # We can simply navigate the current page or open a new one. 
-                                    # Let's open a new page/tab for the detail to keep timeline intact or just navigate back?
-                                    # Navigating main page is fine since we are iterating elements handles matching DOM,
-                                    # BUT navigating away invalidates element handles. 
-                                    # So we must open a new page.
-                                    detail_page = context.new_page()
-                                    detail_page.goto(full_link, timeout=30000)
-                                    
-                                    # On detail page, find the main tweet's parent
-                                    # The container is usually .conversation
-                                    # The main tweet has class .main-tweet or ID 'm' sometimes
-                                    # The parent is the tweet immediately preceding the main tweet in the conversation flow
-                                    
-                                    detail_page.wait_for_selector('.main-tweet', timeout=10000)
-                                    
-                                    # Strategy: Find the .main-tweet, then look for previous sibling that is a tweet-body or timeline-item?
-                                    # Actually, Nitter structure:
-                                    # <div class="timeline-item thread">
-                                    #   <div class="timeline-item ">... parent ...</div>
-                                    #   <div class="timeline-item thread-last "> ... </div>
-                                    #   <div class="timeline-item main-tweet"> ... </div>
-                                    # </div>
-                                    # It varies. Safe bet: Look for all .timeline-item which are NOT replies to the main tweet (replies come after).
-                                    # The one closely before main-tweet is the parent.
-                                    
-                                    # Get all timeline items in the conversation
-                                    # We need to find the one where the next sibling is the main tweet?
-                                    # Let's try to just grab all text from items *before* the main tweet.
-                                    
-                                    # Simple robust logic:
-                                    # 1. Find .main-tweet
-                                    # 2. Look for .tweet-content inside items that appear before it.
-                                    
-                                    # Using playwright evaluation to get text of the PREVIOUS timeline item
-                                    parent_text = detail_page.evaluate('''() => {
-                                        const main = document.querySelector('.main-tweet');
-                                        if (!main) return null;
-                                        // The main-tweet div itself might be a timeline-item, or wrapped.
-                                        // Usually class="timeline-item main-tweet"
-                                        
-                                        // We want the previous sibling that is also a timeline-item (containing the parent tweet)
-                                        let prev = main.previousElementSibling;
-                                        while (prev && !prev.classList.contains('timeline-item')) {
-                                            prev = prev.previousElementSibling;
-                                        }
-                                        
-                                        if (prev) {
-                                            const content = prev.querySelector('.tweet-content');
-                                            return content ? content.innerText : null;
-                                        }
-                                        return null;
-                                    }''')
-                                    
-                                    if parent_text:
-                                        logger.info("Found parent tweet text.")
-                                        final_text = f"Context (Parent Tweet): {parent_text}\n\nReplying: {text}"
-                                    else:
-                                        logger.warning("Could not find parent tweet on detail page.")
-                                        # Fallback: maybe it's not in the DOM tree as sibling?
-                                        # Just allow normal text.
-                                    
-                                    detail_page.close()
-                                    
-                                except Exception as e:
-                                    logger.error(f"Failed to fetch context for {tweet_id}: {e}")
-                                    if 'detail_page' in locals():
-                                        detail_page.close()
-                        
-                            new_tweets.append({
-                                'id': tweet_id,
-                                'text': final_text,
-                                'link': full_link,
-                                'published': published,
-                                'author': self.account
-                            })
-                            self.processed_tweets.add(tweet_id)
-                    
-                    if new_tweets or self.is_first_run:
-                        by_account = load_processed_tweets()
-                        by_account[self.account] = list(self.processed_tweets)
-                        save_processed_tweets(by_account)
-                    
-                    # If success, break
-                    break
+    def _ordered_instances(self):
+        # Fastest healthy instance first, failing ones last (see InstanceHealthRegistry)
+        kind = 'browser' if self.fetch_mode == 'browser' else 'rss'
+        return self.health.order_instances(self.nitter_instances, kind)
 
+    def fetch_tweets(self):
+        for instance in self._ordered_instances():
+            if self._rss_enabled(instance):
+                try:
+                    return self._fetch_rss(instance)
+                except RSSUnavailableError as e:
+                    self._disable_rss(instance, e)
                 except Exception as e:
-                    logger.error(f"Error scraping {instance}: {e}")
-                    page.close()
+                    # Instance is down or too slow; fail over instead of waiting on its browser page too
+                    self._fetch_failed(instance, e, 'rss')
                     continue
-            
-            browser.close()
-                
+
+            if self.fetch_mode == 'rss':
+                continue
+
+            try:
+                return self._fetch_browser(instance)
+            except Exception as e:
+                self._fetch_failed(instance, e, 'browser')
+
+        return []
+
+    def _fetch_failed(self, instance, error, engine):
+        """Record a failed RSS or browser fetch in the instance health registry."""
+        if isinstance(error, RateLimitedError):
+            self.health.record_failure(instance, error, rate_limited=True)
+            return
+        logger.error(f"Error {'fetching RSS from' if engine == 'rss' else 'scraping'} {instance}: {error}")
+        self.health.record_failure(instance, error)
+
+    def _rss_enabled(self, instance):
+        if self.fetch_mode == 'browser':
+            return False
+        return _rss_unavailable.get(instance, 0) <= time.time()
+
+    def _disable_rss(self, instance, reason):
+        logger.warning(f"RSS unavailable on {instance}: {reason}")
+        _rss_unavailable[instance] = time.time() + RSS_RETRY_AFTER
+
+    def _fetch_rss(self, instance):
+        """
+        Fetch the account's Nitter RSS feed with a plain HTTP client and process it.
+        Unchanged feeds (304 or same content hash) return early without parsing.
+        """
+        download = self._download_rss(instance)
+        if download is None:
+            return []
+
+        resp, digest = download
+        entries = self._parse_rss_entries(resp, instance)
+        new_tweets = self._process_entries(entries, instance)
+        self._store_rss_validators(instance, resp, digest)
+        return new_tweets
+
+    def _download_rss(self, instance):
+        """
+        Download the RSS feed with conditional request headers.
+
+        Returns:
+            (response, content digest), or None when the feed is unchanged
+        """
+        url = self.get_rss_url(instance)
+        logger.info(f"Trying to fetch RSS from {url}")
+        # Validators are ignored on first run so the silent-add pass always sees the feed
+        headers = {} if self.is_first_run else self.validators.request_headers(url)
+        timeout_ms = min(15000, self.health.timeout_for(instance, 'rss'))
+        start = time.perf_counter()
+        resp = _http.get(url, timeout=timeout_ms / 1000, headers=headers)
+        if resp.status_code == 429:
+            raise RateLimitedError(f"HTTP 429 from {url}")
+        if resp.status_code >= 500:
+            raise RuntimeError(f"HTTP {resp.status_code} from {url}")
+        self.health.record_success(instance, (time.perf_counter() - start) * 1000, 'rss')
+
+        if resp.status_code == 304:
+            self.validators.record_not_modified(url)
+            logger.info(f"RSS for {self.account} not modified on {instance}")
+            return None
+        if resp.status_code != 200:
+            raise RSSUnavailableError(f"HTTP {resp.status_code}")
+
+        digest = content_digest(resp.content)
+        if not self.is_first_run and self.validators.is_unchanged(url, digest):
+            logger.info(f"RSS for {self.account} unchanged on {instance}")
+            return None
+        return resp, digest
+
+    def _store_rss_validators(self, instance, resp, digest):
+        self.validators.update(
+            self.get_rss_url(instance), digest,
+            etag=resp.headers.get('ETag'),
+            last_modified=resp.headers.get('Last-Modified'),
+            size=len(resp.content)
+        )
+
+    def _parse_rss_entries(self, resp, instance):
+        """
+        Parse an RSS response into entry dicts.
+
+        Returns:
+            List of entry dicts: {'id', 'href', 'text', 'published_raw', 'is_reply', 'is_pinned', 'is_retweet', 'author'}
+        """
+        feed = feedparser.parse(resp.content)
+        if not feed.entries:
+            if feed.bozo or 'xml' not in resp.headers.get('Content-Type', ''):
+                raise RSSUnavailableError("response is not a valid RSS feed")
+            return []
+
+        entries = []
+        for item in feed.entries[:self.max_items]:
+            link = urlparse(item.get('link', ''))
+            if '/status/' not in link.path:
+                continue
+            href = link.path + (f"#{link.fragment}" if link.fragment else "")
+            title = item.get('title', '')
+            entries.append({
+                'id': link.path.rstrip('/').split('/')[-1],
+                'href': href,
+                'text': _strip_title_prefix(title),
+                'published_raw': item.get('published', 'Unknown time'),
+                'is_reply': title.startswith(REPLY_PREFIX),
+                # RSS feeds don't mark pinned tweets
+                'is_pinned': False,
+                'is_retweet': title.startswith(RETWEET_PREFIX),
+                # dc:creator, e.g. "@elonmusk"
+                'author': item.get('author', '')
+            })
+
+        logger.info(f"Successfully fetched {len(entries)} RSS items from {instance}")
+        return entries
+
+    def _fetch_browser(self, instance):
+        """Render the timeline in the shared browser and process its items."""
+        url = self.get_profile_url(instance)
+        logger.info(f"Trying to fetch tweets from {url}")
+        context = self.browser_manager.new_context(first_party=instance)
+        try:
+            page = self.browser_manager.new_page(context)
+            timeout_ms = self.health.timeout_for(instance, 'browser')
+            start = time.perf_counter()
+            # Only the server-rendered DOM is needed, not the full load event
+            response = page.goto(url, wait_until='domcontentloaded', timeout=timeout_ms)
+            self._check_status(response, url)
+            # Wait for timeline to load
+            page.wait_for_selector('.timeline-item', timeout=timeout_ms)
+            self.health.record_success(instance, (time.perf_counter() - start) * 1000, 'browser')
+
+            timeline = self._read_timeline(page.evaluate(TIMELINE_ITEMS_JS, self._scan_args()), instance, url)
+            if timeline is None:
+                return []
+            entries, digest = timeline
+            new_tweets = self._process_entries(entries, instance, context)
+            self.validators.update(url, digest)
+            return new_tweets
+        finally:
+            context.close()
+
+    @staticmethod
+    def _check_status(response, url):
+        if response is not None and response.status == 429:
+            raise RateLimitedError(f"HTTP 429 from {url}")
+
+    def _read_timeline(self, items, instance, url):
+        """
+        Turn TIMELINE_ITEMS_JS items into entries.
+
+        Returns:
+            (entries, digest), or None when the timeline is unchanged since the last poll
+        """
+        entries = entries_from_items(items)
+        if not entries:
+            raise RuntimeError(f"No timeline items found on {instance}")
+
+        # Fingerprint the timeline by its tweet links
+        # (rendered dates like "5m" change every poll, so the raw HTML can't be hashed)
+        digest = timeline_digest(entries)
+        if not self.is_first_run and self.validators.is_unchanged(url, digest):
+            logger.info(f"Timeline for {self.account} unchanged on {instance}")
+            return None
+        logger.info(f"Successfully fetched {len(entries)} items from {instance}")
+        return entries, digest
+
+    def _scan_args(self):
+        """Arguments for TIMELINE_ITEMS_JS; the watermark is passed as a string to keep its precision."""
+        watermark = self._scan_watermark()
+        return {'maxItems': self.max_items, 'watermark': str(watermark) if watermark else None}
+
+    def _scan_watermark(self):
+        """Tweet ID at which timeline scanning may stop (None scans all max_items)."""
+        return self.watermark
+
+    def _process_entries(self, entries, instance, context=None):
+        """
+        Dedup timeline entries against processed IDs and build tweet dicts.
+
+        Args:
+            entries: Entry dicts from the RSS or browser engine
+            instance: Nitter instance the entries came from
+            context: Browser context to reuse for browser reply lookups (one is opened on demand if None)
+
+        Returns:
+            List of new tweet dicts
+        """
+        new_entries = self._select_new_entries(entries)
+        parent_texts, failed, deadline_at = self._resolve_reply_contexts(new_entries, instance)
+
+        if failed:
+            # The instance may refuse plain HTTP clients; read those detail pages in the browser,
+            # within what is left of the reply-context deadline
+            own_context = None
+            try:
+                for i, (tweet_id, full_link) in enumerate(failed):
+                    if not self._has_reply_time(deadline_at, len(failed) - i):
+                        break
+                    if context is None and own_context is None:
+                        own_context = self.browser_manager.new_context(first_party=instance)
+                    parent_texts[tweet_id] = self._fetch_reply_context(
+                        context or own_context, tweet_id, full_link, deadline_at
+                    )
+            finally:
+                if own_context is not None:
+                    own_context.close()
+
+        return self._finish_entries(new_entries, instance, parent_texts)
+
+    def _finish_entries(self, new_entries, instance, parent_texts):
+        """Build the tweet dicts of new entries and commit the poll to the store."""
+        new_tweets = [self._build_tweet(entry, instance, parent_texts.get(entry['id'])) for entry in new_entries]
+        self._save_processed()
+        return new_tweets
+
+    def _resolve_reply_contexts(self, new_entries, instance):
+        """
+        Resolve parent tweets of new replies through the shared ReplyContextResolver.
+
+        Returns:
+            (parent_texts, failed, deadline_at): {tweet_id: parent_text}, the (tweet_id, link)
+            pairs whose detail page couldn't be fetched and should go to the browser, and the
+            time.monotonic() by which the browser fallback must be done
+        """
+        deadline_at = time.monotonic() + self.reply_resolver.deadline
+        replies = [(e['id'], f"{instance}{e['href']}") for e in new_entries if e['is_reply']]
+        if not replies:
+            return {}, [], deadline_at
+
+        logger.info(f"Fetching context for {len(replies)} reply tweet(s)...")
+        parent_texts = self.reply_resolver.resolve(replies)
+        failed = []
+        if self.fetch_mode != 'rss':
+            failed = [(tweet_id, link) for tweet_id, link in replies
+                      if tweet_id in parent_texts and parent_texts[tweet_id] is None]
+        return parent_texts, failed, deadline_at
+
+    @staticmethod
+    def _has_reply_time(deadline_at, pending):
+        """True while the reply-context deadline allows another browser lookup."""
+        if time.monotonic() < deadline_at:
+            return True
+        logger.warning(f"Reply context deadline reached; {pending} reply(ies) left without context")
+        return False
+
+    def _select_new_entries(self, entries):
+        """
+        Return entries newer than the account's watermark, newest first.
+
+        Regular tweets are time-ordered, so the scan stops at the first one at or
+        below the watermark. Pinned tweets and retweets (which carry the original
+        tweet's ID) sit out of order: they are skipped over and deduped against
+        the processed store instead. The first poll only sets the watermark.
+        """
+        regular, out_of_order = [], []
+        for entry in entries:
+            if entry.get('is_pinned') or entry.get('is_retweet'):
+                out_of_order.append(entry)
+                continue
+            if self.watermark is not None and snowflake(entry['id']) <= self.watermark:
+                break
+            regular.append(entry)
+
+        if regular:
+            self._pending_high = max(snowflake(entry['id']) for entry in regular)
+        elif entries:
+            # Only pinned tweets and retweets on screen: without a watermark every later
+            # poll would be another silent first run
+            self._pending_high = max(snowflake(entry['id']) for entry in entries) or None
+
+        unseen = self.store.filter_new(self.account, [entry['id'] for entry in out_of_order])
+        if self.is_first_run:
+            # Baseline: the out-of-order items on screen now aren't news either
+            self._pending_ids.extend(unseen)
+            logger.info(f"First poll for {self.account}: watermark set to {self._pending_high}")
+            return []
+
+        new_entries = regular
+        selected = {entry['id'] for entry in regular}
+        for entry in out_of_order:
+            # A new tweet that is also pinned shows up twice: once in order, once on top
+            if entry['id'] not in unseen or entry['id'] in selected:
+                continue
+            # A pinned tweet is only news if it was posted after the last poll (re-pinning an old one isn't)
+            if entry.get('is_pinned') and snowflake(entry['id']) <= self.watermark:
+                continue
+            unseen.discard(entry['id'])
+            selected.add(entry['id'])
+            new_entries.append(entry)
+        logger.info(f"{self.account}: {len(new_entries)} new since watermark {self.watermark}")
+        return new_entries
+
+    def _build_tweet(self, entry, instance, parent_text=None):
+        """Build the tweet dict for a new entry and mark it processed."""
+        text = entry['text']
+        if parent_text:
+            text = f"Context (Parent Tweet): {parent_text}\n\nReplying: {entry['text']}"
+
+        self._pending_ids.append(entry['id'])
+        return {
+            'id': entry['id'],
+            'text': text,
+            'link': f"{instance}{entry['href']}",
+            'published': convert_to_beijing_time(entry['published_raw']),
+            'author': self.account
+        }
+
+    def _save_processed(self):
+        self.store.add(self.account, self._pending_ids)
+        self._pending_ids = []
+        if self._pending_high:
+            self.store.set_watermark(self.account, self._pending_high)
+            self.watermark = max(self.watermark or 0, self._pending_high)
+            self._pending_high = None
+
+    @staticmethod
+    def _step_timeout(deadline_at, cap_ms):
+        """Playwright timeout (ms) of one page step: cap_ms, cut to what is left before deadline_at."""
+        return max(1, min(cap_ms, (deadline_at - time.monotonic()) * 1000))
+
+    def _fetch_reply_context(self, context, tweet_id, full_link, deadline_at):
+        """Open the reply's detail page and return the parent tweet text, or None (also past deadline_at)."""
+        logger.info(f"Tweet {tweet_id} is a reply. Fetching context...")
+        detail_page = None
+        try:
+            # A separate page keeps the timeline page (and its element handles) intact
+            detail_page = self.browser_manager.new_page(context)
+            detail_page.goto(full_link, wait_until='domcontentloaded',
+                             timeout=self._step_timeout(deadline_at, 30000))
+            detail_page.wait_for_selector('.main-tweet', timeout=self._step_timeout(deadline_at, 10000))
+
+            return self._parent_found(tweet_id, detail_page.evaluate(PARENT_TWEET_JS))
+
+        except Exception as e:
+            logger.error(f"Failed to fetch context for {tweet_id}: {e}")
+            return None
+
+        finally:
+            if detail_page is not None:
+                detail_page.close()
+
+
+    def _parent_found(self, tweet_id, parent):
+        """Log and cache a PARENT_TWEET_JS result so later polls don't open the page again."""
+        parent_text = parent['text'] if parent else None
+        if parent_text:
+            logger.info("Found parent tweet text.")
+        else:
+            logger.warning("Could not find parent tweet on detail page.")
+        self.reply_resolver.remember(tweet_id, parent['id'] if parent else None, parent_text)
+        return parent_text
+
+
+class MultiAccountMonitor(TwitterMonitor):
+    """
+    Fetch several accounts from one combined Nitter timeline (/user1,user2,...).
+
+    Each item is attributed back to its account from the tweet's username element
+    (dc:creator in RSS) and handed to that account's TwitterMonitor, so dedup
+    state stays per account. Nitter builds combined timelines from a
+    "from:a OR from:b" search, so retweets of other users don't show up there.
+    """
+
+    # One Nitter page of items; a busy account must not crowd the others out
+    max_items = 20
+
+    def __init__(self, accounts, browser_manager=None):
+        super().__init__(account=",".join(accounts), browser_manager=browser_manager)
+        self.accounts = list(accounts)
+        self.monitors = {
+            account: TwitterMonitor(account=account, browser_manager=self.browser_manager)
+            for account in self.accounts
+        }
+        self._account_keys = {account.lower(): account for account in self.accounts}
+
+    @property
+    def is_first_run(self):
+        return any(m.is_first_run for m in self.monitors.values())
+
+    def _scan_watermark(self):
+        # Every account's tweets below the lowest watermark are known
+        watermarks = [m.watermark for m in self.monitors.values()]
+        return None if None in watermarks else min(watermarks)
+
+    def _process_entries(self, entries, instance, context=None):
+        """Split combined timeline entries by author and process them per account."""
+        by_account = {account: [] for account in self.accounts}
+        for entry in entries:
+            author = entry.get('author', '').strip().lstrip('@').lower()
+            account = self._account_keys.get(author)
+            if account is None:
+                logger.debug(f"Skipping item {entry['id']} by unmonitored author '{author}'")
+                continue
+            by_account[account].append(entry)
+
+        new_tweets = []
+        for account, account_entries in by_account.items():
+            if account_entries:
+                new_tweets.extend(self.monitors[account]._process_entries(account_entries, instance, context))
+        self._seed_missing_watermarks(entries)
         return new_tweets
 
+    def _seed_missing_watermarks(self, entries):
+        """
+        Give accounts absent from the page a watermark at the page's oldest tweet.
+        The page holds the batch's newest tweets, so anything such an account posts
+        later is newer; without a watermark its next tweet would only set the
+        baseline, and the batch would never leave first-run mode.
+        """
+        ordered = [e for e in entries if not (e.get('is_pinned') or e.get('is_retweet'))] or entries
+        if not ordered:
+            return
+        lowest = min(snowflake(entry['id']) for entry in ordered)
+        for account, monitor in self.monitors.items():
+            if monitor.is_first_run and lowest:
+                logger.info(f"{account} not on the combined page: watermark set to {lowest}")
+                monitor._pending_high = lowest
+                monitor._save_processed()
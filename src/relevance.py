@@ -0,0 +1,280 @@
+"""
+Local relevance gate in front of the LLM analysis.
+Most tweets (one-word replies, memes, emoji) have nothing to do with markets;
+a keyword/entity lexicon and a small logistic-regression model over hashed
+character n-grams (NumPy weights in data/relevance_model.npz) decide which
+tweets get the full ETF/sector analysis. The rest get a summary-only request or
+no request at all. No model is shipped: train one on the labeled set
+(src/relevance_tweets.jsonl) with `python -m src.relevance --train` before
+enabling the gate, otherwise only trivial tweets are gated.
+"""
+
+import os
+import re
+import json
+import argparse
+import zlib
+import time
+import unicodedata
+import numpy as np
+from src.candidate_index import matched_topics
+from src.utils import DATA_DIR, load_config, setup_logger
+
+logger = setup_logger('Relevance')
+
+RELEVANCE_MODEL_FILE = os.path.join(DATA_DIR, 'relevance_model.npz')
+# Labeled tweets, one {"text": ..., "relevant": true/false} object per line
+RELEVANCE_TRAINING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'relevance_tweets.jsonl')
+
+# Market/economy vocabulary on top of the TOPIC_EXPANSIONS entities
+FINANCE_TERMS = [
+    'stock', 'stocks', 'share', 'shares', 'market', 'markets', 'economy', 'economic', 'inflation',
+    'recession', 'interest rate', 'interest rates', 'fed', 'tariff', 'tariffs', 'tax', 'taxes',
+    'earnings', 'revenue', 'profit', 'deliveries', 'production', 'factory', 'gigafactory', 'price',
+    'prices', 'ipo', 'valuation', 'investor', 'investors', 'dollar', 'debt', 'deficit', 'bank',
+    'banks', 'trade', 'china', 'sales', 'launch', 'supply chain', 'manufacturing', 'export', 'import',
+    '股', '市场', '经济', '关税', '利率', '通胀', '美联储', '财报', '销量', '产量', '价格', '投资',
+]
+
+_FINANCE_RE = re.compile('|'.join(
+    rf'(?<![a-z0-9]){re.escape(term)}(?![a-z0-9])' if term.isascii() else re.escape(term)
+    for term in FINANCE_TERMS
+))
+_CASHTAG_RE = re.compile(r'\$[A-Za-z]{1,5}\b')
+_NOISE_RE = re.compile(r'https?://\S+|@\w+')
+_WORD_RE = re.compile(r'[0-9a-z一-鿿]')
+
+
+def normalize(text):
+    """NFKC, lowercase, links and @mentions removed, single spaces."""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return ' '.join(_NOISE_RE.sub(' ', text).split())
+
+
+def lexicon_hits(text):
+    """Finance terms, cashtags and TOPIC_EXPANSIONS topics the tweet mentions."""
+    hits = matched_topics(text) + _CASHTAG_RE.findall(text or '')
+    hits.extend(m.group(0) for m in _FINANCE_RE.finditer(normalize(text)))
+    return hits
+
+
+def hashed_ngrams(text, dim, ngram_range=(2, 4)):
+    """
+    Feature vector of a tweet as (indices, values): character n-grams of the
+    normalized text hashed into dim buckets, L2-normalized.
+    """
+    text = f' {normalize(text)} '
+    counts = {}
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for i in range(len(text) - n + 1):
+            index = zlib.crc32(text[i:i + n].encode('utf-8')) % dim
+            counts[index] = counts.get(index, 0) + 1
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return indices, values / np.linalg.norm(values)
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class RelevanceModel:
+    """Logistic regression over hashed character n-grams."""
+
+    def __init__(self, weights, bias=0.0, ngram_range=(2, 4)):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.ngram_range = tuple(ngram_range)
+
+    @property
+    def dim(self):
+        return len(self.weights)
+
+    def score(self, text):
+        """Probability that the tweet is market-relevant."""
+        indices, values = hashed_ngrams(text, self.dim, self.ngram_range)
+        return float(sigmoid(self.weights[indices] @ values + self.bias))
+
+    def save(self, path=RELEVANCE_MODEL_FILE):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, ngram_range=np.array(self.ngram_range))
+
+    @classmethod
+    def load(cls, path=RELEVANCE_MODEL_FILE):
+        with np.load(path) as data:
+            return cls(data['weights'], float(data['bias']), tuple(int(n) for n in data['ngram_range']))
+
+    @classmethod
+    def train(cls, texts, labels, dim=2 ** 15, ngram_range=(2, 4), epochs=20, lr=0.5, l2=1e-5, seed=0):
+        """
+        Fit with plain SGD on the log loss.
+
+        Args:
+            texts: Tweet texts
+            labels: 1 for market-relevant, 0 otherwise
+            dim: Number of hash buckets
+            ngram_range: (min, max) character n-gram length
+            epochs: Passes over the data
+            lr: Learning rate
+            l2: L2 penalty
+
+        Returns:
+            Trained RelevanceModel
+        """
+        features = [hashed_ngrams(text, dim, ngram_range) for text in texts]
+        labels = np.asarray(labels, dtype=np.float32)
+        weights = np.zeros(dim, dtype=np.float32)
+        bias = 0.0
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            for i in rng.permutation(len(features)):
+                indices, values = features[i]
+                error = float(sigmoid(weights[indices] @ values + bias)) - labels[i]
+                weights[indices] -= lr * (error * values + l2 * weights[indices])
+                bias -= lr * error
+        return cls(weights, bias, ngram_range)
+
+
+class RelevanceGate:
+    def __init__(self, mode='skip', threshold=0.35, min_chars=12, model_path=RELEVANCE_MODEL_FILE):
+        """
+        Initialize gate.
+
+        Args:
+            mode: 'off' (analyze everything), 'summary_only' (irrelevant tweets only get a
+                summary) or 'skip' (irrelevant tweets get no LLM request)
+            threshold: Model probability below which a tweet is irrelevant
+            min_chars: Tweets shorter than this (links and mentions removed) without a
+                lexicon hit are irrelevant
+            model_path: Trained RelevanceModel; without one only trivial tweets are gated ('' for none)
+        """
+        self.mode = mode
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.model = None
+        if mode != 'off' and model_path:
+            if os.path.exists(model_path):
+                try:
+                    self.model = RelevanceModel.load(model_path)
+                except Exception as e:
+                    logger.warning(f"Failed to load relevance model {model_path}: {e}")
+            else:
+                logger.warning(f"Relevance gate is on but {model_path} does not exist, only trivial tweets "
+                               f"will be gated; run python -m src.relevance --train first")
+        self.stats = {'checked': 0, 'gated': 0}
+
+    def check(self, text):
+        """
+        Decide whether a tweet deserves the full analysis.
+
+        Returns:
+            Tuple of (relevant, reason)
+        """
+        relevant, reason = self._classify(text)
+        self.stats['checked'] += 1
+        if not relevant:
+            self.stats['gated'] += 1
+        return relevant, reason
+
+    def _classify(self, text):
+        if self.mode == 'off':
+            return True, 'gate off'
+        hits = lexicon_hits(text)
+        if hits:
+            return True, f"lexicon: {', '.join(hits[:3])}"
+        cleaned = normalize(text)
+        if not _WORD_RE.search(cleaned) or len(cleaned) < self.min_chars:
+            return False, 'trivial'
+        if self.model is None:
+            return True, 'no model'
+        score = self.model.score(text)
+        return score >= self.threshold, f"model {score:.2f}"
+
+
+def load_labeled_tweets(path=RELEVANCE_TRAINING_FILE):
+    """
+    Read a labeled tweet set.
+
+    Returns:
+        Tuple of (texts, labels)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [row['text'] for row in rows], [bool(row['relevant']) for row in rows]
+
+
+def replay(gate, texts, labels):
+    """Gate decisions on a labeled set: skipped, false skips and per-tweet latency."""
+    start = time.perf_counter()
+    decisions = [gate.check(text)[0] for text in texts]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    gated = [not d for d in decisions]
+    return {
+        'skipped': sum(gated),
+        'false_skips': sum(1 for g, label in zip(gated, labels) if g and label),
+        'relevant': sum(labels),
+        'missed': sum(1 for g, label in zip(gated, labels) if not g and not label),
+        'gate_ms': elapsed_ms / max(len(texts), 1),
+    }
+
+
+def cross_validate(texts, labels, threshold, folds=5):
+    """Out-of-fold gate decisions with a model trained on the other folds."""
+    order = np.random.default_rng(0).permutation(len(texts))
+    total = {'skipped': 0, 'false_skips': 0, 'relevant': 0, 'missed': 0, 'gate_ms': 0.0}
+    for k in range(folds):
+        test = set(order[k::folds].tolist())
+        train = [i for i in range(len(texts)) if i not in test]
+        gate = RelevanceGate(mode='skip', threshold=threshold, model_path='')
+        gate.model = RelevanceModel.train([texts[i] for i in train], [labels[i] for i in train])
+        result = replay(gate, [texts[i] for i in sorted(test)], [labels[i] for i in sorted(test)])
+        for key in total:
+            total[key] += result[key]
+    total['gate_ms'] /= folds
+    return total
+
+
+# Global relevance gate instance
+_relevance_gate = None
+
+
+def get_relevance_gate():
+    """Get or create global relevance gate."""
+    global _relevance_gate
+    if _relevance_gate is None:
+        try:
+            gate_conf = load_config().get('relevance_gate', {})
+        except FileNotFoundError:
+            gate_conf = {}
+        _relevance_gate = RelevanceGate(
+            mode=gate_conf.get('mode', 'off'),
+            threshold=gate_conf.get('threshold', 0.35),
+            min_chars=gate_conf.get('min_chars', 12)
+        )
+    return _relevance_gate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the relevance gate model')
+    parser.add_argument('--train', action='store_true', help='Cross-validate, then train and save the model')
+    parser.add_argument('--data', default=RELEVANCE_TRAINING_FILE, help='Labeled tweets (JSONL)')
+    parser.add_argument('--output', default=RELEVANCE_MODEL_FILE, help='Where to save the model')
+    parser.add_argument('--threshold', type=float, default=0.35)
+    args = parser.parse_args()
+    if not args.train:
+        parser.print_help()
+        return
+
+    texts, labels = load_labeled_tweets(args.data)
+    result = cross_validate(texts, labels, args.threshold)
+    print(f"5-fold cross-validation on {len(texts)} tweets: skipped {result['skipped']}, "
+          f"false skips {result['false_skips']}/{result['relevant']} relevant "
+          f"({result['false_skips'] / max(result['relevant'], 1):.1%})")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    RelevanceModel.train(texts, labels).save(args.output)
+    print(f"Model trained on all {len(texts)} tweets, saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
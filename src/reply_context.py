@@ -0,0 +1,319 @@
+"""
+Reply-context resolution stage.
+Fetches the parent tweets of replies concurrently from Nitter detail pages and
+keeps them in a persistent LRU+TTL cache keyed by parent tweet ID, so
+timeline processing only waits up to a configurable deadline.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+import requests
+from src.browser import DEFAULT_USER_AGENT
+from src.utils import DATA_DIR, load_config, setup_logger
+
+logger = setup_logger('ReplyContext')
+
+REPLY_CACHE_FILE = os.path.join(DATA_DIR, 'reply_context_cache.json')
+
+
+class LRUTTLCache:
+    def __init__(self, path=None, max_size=2000, ttl=7 * 86400):
+        """
+        Size-bounded LRU cache with per-entry expiry, optionally persisted as JSON.
+
+        Args:
+            path: JSON file to persist entries to (None keeps the cache in memory)
+            max_size: Maximum number of entries; least recently used are evicted first
+            ttl: Seconds an entry stays valid (put() may give an entry a shorter one)
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            now = time.time()
+            for key, item in items:
+                if not self._expired(item, now):
+                    self._data[key] = tuple(item)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load reply context cache: {e}")
+
+    def _expired(self, item, now):
+        # (value, stored_at) uses the cache TTL, (value, stored_at, ttl) its own
+        ttl = item[2] if len(item) > 2 else self.ttl
+        return now - item[1] > ttl
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if self._expired(item, time.time()):
+                del self._data[key]
+                self._dirty = True
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, ttl=None):
+        """Store a value; ttl overrides the cache TTL for this entry."""
+        with self._lock:
+            self._data[key] = (value, time.time()) if ttl is None else (value, time.time(), ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """Persist entries (oldest first, so LRU order survives a reload)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            items = [[key, list(item)] for key, item in self._data.items()]
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save reply context cache: {e}")
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ConversationParser(HTMLParser):
+    """
+    Collect the tweets that precede .main-tweet on a Nitter detail page.
+    The last one is the direct parent of the main tweet.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.ancestors = []  # [(tweet_id, text)]
+        self._depth = 0
+        self._done = False
+        self._item_depth = None
+        self._content_depth = None
+        self._current_id = None
+        self._current_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if self._done:
+            return
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'br' and self._content_depth is not None:
+            self._current_text.append('\n')
+            return
+        if tag != 'div' and not (tag == 'a' and 'tweet-link' in classes):
+            if tag not in ('img', 'br', 'hr', 'input', 'meta', 'link', 'source'):
+                self._depth += 1
+            return
+
+        if tag == 'a':
+            self._depth += 1
+            if self._item_depth is not None and self._current_id is None:
+                href = attrs.get('href') or ''
+                self._current_id = href.split('/')[-1].split('#')[0]
+            return
+
+        self._depth += 1
+        if 'main-tweet' in classes:
+            self._done = True
+        elif 'timeline-item' in classes and self._item_depth is None:
+            self._item_depth = self._depth
+            self._current_id = None
+            self._current_text = []
+        elif 'tweet-content' in classes and self._item_depth is not None and self._content_depth is None:
+            self._content_depth = self._depth
+
+    def handle_endtag(self, tag):
+        if self._done or tag in ('img', 'br', 'hr', 'input', 'meta', 'link', 'source'):
+            return
+        if self._content_depth == self._depth:
+            self._content_depth = None
+        if self._item_depth == self._depth:
+            if self._current_id:
+                self.ancestors.append((self._current_id, ''.join(self._current_text).strip()))
+            self._item_depth = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if not self._done and self._content_depth is not None:
+            self._current_text.append(data)
+
+
+def parse_parent_tweet(html):
+    """
+    Extract the parent tweet from a Nitter detail page.
+
+    Returns:
+        (parent_id, parent_text, ancestors) where ancestors is every (id, text)
+        shown above the main tweet; (None, '', []) when the page shows no parent
+    """
+    parser = ConversationParser()
+    parser.feed(html)
+    if not parser.ancestors:
+        return None, '', []
+    parent_id, parent_text = parser.ancestors[-1]
+    return parent_id, parent_text, parser.ancestors
+
+
+class ReplyContextResolver:
+    def __init__(self, max_workers=4, deadline=15, cache_size=2000, ttl=7 * 86400, empty_ttl=600,
+                 cache_path=REPLY_CACHE_FILE):
+        """
+        Initialize resolver.
+
+        Args:
+            max_workers: Detail pages fetched at the same time
+            deadline: Seconds resolve() waits for outstanding fetches; later results still fill the cache
+            cache_size: Maximum cached entries
+            ttl: Seconds cached parent tweets stay valid
+            empty_ttl: Seconds a page without a parsable parent is remembered; short, since a
+                partial page or a Nitter layout change looks the same as a deleted parent
+            cache_path: JSON file for the cache (None keeps it in memory)
+        """
+        self.deadline = deadline
+        self.cache = LRUTTLCache(cache_path, max_size=cache_size, ttl=ttl)
+        self.empty_ttl = empty_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='reply-context')
+        self._http = requests.Session()
+        self._http.headers.update({'User-Agent': DEFAULT_USER_AGENT})
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.stats = {'hits': 0, 'fetched': 0, 'failed': 0, 'deadline_missed': 0}
+
+    def _cached(self, tweet_id):
+        """Return cached parent text for a reply, or None when unknown."""
+        parent_id = self.cache.get(f"reply:{tweet_id}")
+        if parent_id is None:
+            return None
+        if parent_id == '':
+            # Detail page showed no parent (e.g. deleted tweet)
+            return ''
+        return self.cache.get(f"parent:{parent_id}")
+
+    def _fetch(self, tweet_id, full_link):
+        resp = self._http.get(full_link, timeout=max(self.deadline, 10))
+        resp.raise_for_status()
+        parent_id, parent_text, ancestors = parse_parent_tweet(resp.text)
+        # Every ancestor on the page is a parent tweet someone may reply to again
+        for ancestor_id, text in ancestors:
+            self.cache.put(f"parent:{ancestor_id}", text)
+        self._put_reply(tweet_id, parent_id)
+        return parent_text
+
+    def _put_reply(self, tweet_id, parent_id):
+        if parent_id:
+            self.cache.put(f"reply:{tweet_id}", parent_id)
+        else:
+            self.cache.put(f"reply:{tweet_id}", '', ttl=self.empty_ttl)
+
+    def remember(self, tweet_id, parent_id, parent_text):
+        """Cache a parent tweet found some other way (the browser fallback); parent_id None means no parent."""
+        if parent_id:
+            self.cache.put(f"parent:{parent_id}", parent_text or '')
+        self._put_reply(tweet_id, parent_id)
+        self.cache.save()
+
+    def _submit(self, tweet_id, full_link):
+        # One fetch per detail page even if several polls ask for it while it's running
+        key = urlparse(full_link).path
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._fetch, tweet_id, full_link)
+            self._inflight[key] = future
+        # Outside the lock: a fetch that already finished runs the callback right here
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+
+    def resolve(self, replies):
+        """
+        Resolve parent tweets for a batch of replies concurrently.
+
+        Args:
+            replies: List of (tweet_id, detail page URL)
+
+        Returns:
+            Dict {tweet_id: parent_text}. parent_text is '' when the page shows no
+            parent and None when the fetch failed. Replies still pending at the
+            deadline are missing from the dict.
+        """
+        results = {}
+        futures = {}
+        for tweet_id, full_link in replies:
+            cached = self._cached(tweet_id)
+            if cached is not None:
+                self.stats['hits'] += 1
+                results[tweet_id] = cached
+            else:
+                futures[self._submit(tweet_id, full_link)] = tweet_id
+
+        if futures:
+            start = time.perf_counter()
+            done, pending = wait(futures, timeout=self.deadline)
+            for future in done:
+                tweet_id = futures[future]
+                try:
+                    results[tweet_id] = future.result()
+                    self.stats['fetched'] += 1
+                except Exception as e:
+                    logger.error(f"Failed to fetch context for {tweet_id}: {e}")
+                    self.stats['failed'] += 1
+                    results[tweet_id] = None
+            if pending:
+                self.stats['deadline_missed'] += len(pending)
+                logger.warning(f"{len(pending)} reply context(s) not ready after {self.deadline}s; continuing without them")
+            logger.info(f"Resolved {len(done)} reply context(s) in {time.perf_counter() - start:.1f}s "
+                        f"({len(results) - len(done)} from cache)")
+
+        self.cache.save()
+        return results
+
+
+# Global resolver instance
+_reply_resolver = None
+
+
+def get_reply_resolver():
+    """Get or create global reply context resolver."""
+    global _reply_resolver
+    if _reply_resolver is None:
+        try:
+            reply_conf = load_config().get('reply_context', {})
+        except FileNotFoundError:
+            reply_conf = {}
+        _reply_resolver = ReplyContextResolver(
+            max_workers=reply_conf.get('max_workers', 4),
+            deadline=reply_conf.get('deadline', 15),
+            cache_size=reply_conf.get('cache_size', 2000),
+            ttl=reply_conf.get('ttl', 7 * 86400),
+            empty_ttl=reply_conf.get('empty_ttl', 600)
+        )
+    return _reply_resolver
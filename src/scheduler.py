@@ -0,0 +1,199 @@
+"""
+Adaptive per-account polling scheduler.
+Each account gets its own next-poll time. The interval drops to the minimum
+right after the account posts, backs off exponentially while it stays quiet,
+and is scaled by the account's recent posting rate and by how active it
+usually is at this hour. State is persisted so the learned rhythm survives
+restarts.
+"""
+
+import os
+import json
+import time
+import random
+from datetime import datetime
+from src.utils import DATA_DIR, load_config, setup_logger
+
+logger = setup_logger('PollScheduler')
+
+SCHEDULE_FILE = os.path.join(DATA_DIR, 'poll_schedule.json')
+
+# Posts older than this no longer count towards the recent posting rate
+RATE_WINDOW = 86400
+
+# Half-life (seconds) of the hour-of-day activity histogram
+HISTOGRAM_HALF_LIFE = 14 * 86400
+
+
+class AdaptivePollScheduler:
+    def __init__(self, accounts, base_interval=300, min_interval=60, max_interval=1800,
+                 backoff=1.5, jitter=0.1, path=SCHEDULE_FILE, rng=None):
+        """
+        Initialize scheduler. Every account is due immediately after startup.
+
+        Args:
+            accounts: Account handles to schedule
+            base_interval: Starting interval in seconds for accounts without history (check_interval)
+            min_interval: Lower bound in seconds; used right after an account posted
+            max_interval: Upper bound in seconds for quiet accounts
+            backoff: Interval multiplier for every poll that finds nothing new
+            jitter: Random spread of each interval as a fraction (0.1 = +/-10%)
+            path: JSON file for the learned per-account state (None keeps it in memory)
+            rng: random.Random used for jitter (for tests)
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.path = path
+        self.rng = rng or random.Random()
+
+        self.accounts = {}
+        self._load()
+        # Accounts dropped from the config keep their saved state but aren't polled
+        self.active = list(accounts)
+        now = time.time()
+        for account in self.active:
+            self._entry(account)['next_poll'] = now
+        self.stats = {'polls': 0, 'polls_with_news': 0}
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.accounts = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load poll schedule: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.accounts, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save poll schedule: {e}")
+
+    def _entry(self, account):
+        return self.accounts.setdefault(account, {
+            'interval': self.base_interval,
+            'next_poll': 0,
+            # Timestamps of posts seen within RATE_WINDOW
+            'recent_posts': [],
+            # Decayed post counts per local hour of day
+            'hours': [0.0] * 24,
+            'hours_updated': 0,
+        })
+
+    def _decay_hours(self, entry, now):
+        if entry['hours_updated']:
+            factor = 0.5 ** ((now - entry['hours_updated']) / HISTOGRAM_HALF_LIFE)
+            entry['hours'] = [count * factor for count in entry['hours']]
+        entry['hours_updated'] = now
+
+    def _hour_factor(self, entry, now):
+        """Activity of the coming hour relative to the account's average hour, clamped to [0.5, 2]."""
+        hours = entry['hours']
+        total = sum(hours)
+        if total < 1:
+            return 1.0
+        hour = datetime.fromtimestamp(now).hour
+        relative = hours[hour] / (total / 24)
+        return min(2.0, max(0.5, relative))
+
+    def _rate_cap(self, entry):
+        """Interval cap from the recent posting rate: about two polls per expected post gap."""
+        posts = len(entry['recent_posts'])
+        if not posts:
+            return self.max_interval
+        return RATE_WINDOW / posts / 2
+
+    def record_poll(self, account, new_count, now=None):
+        """
+        Update an account's interval after a poll and schedule its next one.
+
+        Args:
+            account: Account handle
+            new_count: Number of new tweets the poll found
+            now: Poll time (defaults to time.time())
+
+        Returns:
+            Seconds until the account's next poll
+        """
+        now = time.time() if now is None else now
+        entry = self._entry(account)
+        entry['recent_posts'] = [t for t in entry['recent_posts'] if now - t <= RATE_WINDOW]
+
+        self.stats['polls'] += 1
+        if new_count:
+            self.stats['polls_with_news'] += 1
+            entry['recent_posts'].extend([now] * new_count)
+            self._decay_hours(entry, now)
+            entry['hours'][datetime.fromtimestamp(now).hour] += new_count
+            # Posts tend to come in bursts: look again soon
+            entry['interval'] = self.min_interval
+        else:
+            entry['interval'] = min(self.max_interval, entry['interval'] * self.backoff)
+
+        delay = min(entry['interval'], self._rate_cap(entry)) / self._hour_factor(entry, now)
+        delay *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+        delay = min(self.max_interval, max(self.min_interval, delay))
+        entry['next_poll'] = now + delay
+        return delay
+
+    def record_polls(self, accounts, new_tweets, now=None):
+        """Record one poll of several accounts given the new tweets it returned."""
+        counts = {account: 0 for account in accounts}
+        for tweet in new_tweets or []:
+            author = tweet.get('author')
+            if author in counts:
+                counts[author] += 1
+        for account, count in counts.items():
+            delay = self.record_poll(account, count, now)
+            logger.info(f"{account}: {count} new, next poll in {delay:.0f}s")
+        self._save()
+
+    def record_failure(self, accounts, now=None):
+        """
+        Reschedule accounts whose poll failed at their current interval.
+        A failed poll says nothing about how active an account is, so it
+        neither backs off nor counts as a poll.
+        """
+        now = time.time() if now is None else now
+        for account in accounts:
+            entry = self._entry(account)
+            entry['next_poll'] = now + min(self.max_interval, max(self.min_interval, entry['interval']))
+        logger.warning(f"Poll of {', '.join(accounts)} failed, retrying at the current interval")
+        self._save()
+
+    def due_accounts(self, now=None):
+        """Accounts whose next poll time has passed."""
+        now = time.time() if now is None else now
+        return [account for account in self.active if self.accounts[account]['next_poll'] <= now]
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the earliest scheduled poll (0 if one is due)."""
+        now = time.time() if now is None else now
+        if not self.active:
+            return self.base_interval
+        return max(0.0, min(self.accounts[account]['next_poll'] for account in self.active) - now)
+
+
+def get_poll_scheduler(accounts, base_interval=300):
+    """Create the adaptive scheduler from config."""
+    try:
+        sched_conf = load_config().get('adaptive_schedule', {})
+    except FileNotFoundError:
+        sched_conf = {}
+    return AdaptivePollScheduler(
+        accounts,
+        base_interval=base_interval,
+        min_interval=sched_conf.get('min_interval', 60),
+        max_interval=sched_conf.get('max_interval', 1800),
+        backoff=sched_conf.get('backoff', 1.5),
+        jitter=sched_conf.get('jitter', 0.1)
+    )
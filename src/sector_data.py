@@ -2,8 +2,10 @@
 Sector and concept data fetching module using akshare with caching.
 """
 
+import time
 import akshare as ak
 from src.cache_manager import get_cache_manager
+from src.candidate_index import CandidateIndex, board_text
 from src.utils import setup_logger
 
 logger = setup_logger('SectorData')
@@ -12,8 +14,19 @@ logger = setup_logger('SectorData')
 class SectorData:
     """Handle sector and concept data fetching with caching."""
 
-    def __init__(self):
+    def __init__(self, use_member_stocks=True, max_member_names=20):
+        """
+        Args:
+            use_member_stocks: Index member-stock names of boards whose constituents are already cached
+            max_member_names: Member-stock names indexed per board
+        """
         self.cache = get_cache_manager()
+        self.use_member_stocks = use_member_stocks
+        self.max_member_names = max_member_names
+        # {'sector'/'concept': (list key, CandidateIndex)}
+        self._board_indexes = {}
+        # {('sector'/'concept', name): Future} of constituent fetches started by prefetch_board_stocks
+        self._prefetched = {}
 
     def get_sector_list(self):
         """
@@ -59,6 +72,12 @@ class SectorData:
         Returns:
             List of dicts with stock info, e.g., [{'代码': '...', '名称': '...'}, ...]
         """
+        future = self._prefetched.pop(('sector', sector_name), None)
+        if future is not None:
+            return future.result()
+        return self._fetch_sector_stocks(sector_name)
+
+    def _fetch_sector_stocks(self, sector_name):
         # Sanitize sector name for filename
         safe_name = sector_name.replace('/', '_').replace('\\', '_')
 
@@ -83,6 +102,12 @@ class SectorData:
         Returns:
             List of dicts with stock info, e.g., [{'代码': '...', '名称': '...'}, ...]
         """
+        future = self._prefetched.pop(('concept', concept_name), None)
+        if future is not None:
+            return future.result()
+        return self._fetch_concept_stocks(concept_name)
+
+    def _fetch_concept_stocks(self, concept_name):
         # Sanitize concept name for filename
         safe_name = concept_name.replace('/', '_').replace('\\', '_')
 
@@ -97,6 +122,24 @@ class SectorData:
         cache_key = f'concept_stocks_{safe_name}'
         return self.cache.get(cache_key, fetch, 'concept_stocks', 'json')
 
+    def prefetch_board_stocks(self, kind, name, executor):
+        """
+        Start fetching a sector's or concept's constituents in the background; the
+        next get_sector_stocks / get_concept_stocks call for it waits for this fetch.
+
+        Args:
+            kind: 'sector' or 'concept'
+            name: Board name
+            executor: concurrent.futures executor to run the fetch on
+        """
+        if (kind, name) not in self._prefetched:
+            fetch = self._fetch_sector_stocks if kind == 'sector' else self._fetch_concept_stocks
+            self._prefetched[(kind, name)] = executor.submit(fetch, name)
+
+    def clear_prefetched(self):
+        """Forget prefetched constituents that were never asked for."""
+        self._prefetched.clear()
+
     def get_multiple_sector_stocks(self, sector_names):
         """
         Get constituent stocks for multiple sectors and merge them.
@@ -164,3 +207,60 @@ class SectorData:
                     stocks[code]['concepts'].append(concept_name)
 
         return stocks
+
+    def _board_index(self, kind, boards):
+        """
+        Get the retrieval index over sector or concept boards, rebuilt when the list changes.
+
+        Args:
+            kind: 'sector' or 'concept'
+            boards: Result of get_sector_list() / get_concept_list()
+        """
+        names = [b.get('板块名称', b.get('name', '')) for b in boards]
+        key = hash(tuple(names))
+        cached = self._board_indexes.get(kind)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        start = time.perf_counter()
+        with_members = 0
+        texts = {}
+        for name in names:
+            members = []
+            if self.use_member_stocks and name:
+                safe_name = name.replace('/', '_').replace('\\', '_')
+                # Only constituents fetched earlier; building the index never hits the network
+                stocks = self.cache.get_cached(f'{kind}_stocks_{safe_name}') or []
+                members = [str(s.get('名称', '')) for s in stocks[:self.max_member_names]]
+                with_members += bool(members)
+            texts[name] = board_text(name, members)
+
+        index = CandidateIndex(boards, lambda b: texts[b.get('板块名称', b.get('name', ''))])
+        self._board_indexes[kind] = (key, index)
+        logger.info(f"Built {kind} retrieval index over {len(boards)} boards "
+                    f"({with_members} with member stocks) in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return index
+
+    def shortlist_boards(self, tweet_text, sector_list, concept_list, sector_top_k=20, concept_top_k=40):
+        """
+        Shortlist the sectors and concepts that best match a tweet.
+
+        Args:
+            tweet_text: Tweet content
+            sector_list: Result of get_sector_list()
+            concept_list: Result of get_concept_list()
+            sector_top_k: Sectors returned, padded with other sectors if fewer match (0 keeps the whole list)
+            concept_top_k: Concepts returned, padded likewise (0 keeps the whole list)
+
+        Returns:
+            (sectors, concepts): shortlisted board dicts, best match first; the whole
+            list of a kind nothing matches
+        """
+        sectors = sector_list
+        if sector_top_k and sector_list:
+            sectors = self._board_index('sector', sector_list).shortlist(tweet_text, sector_top_k)
+        concepts = concept_list
+        if concept_top_k and concept_list:
+            concepts = self._board_index('concept', concept_list).shortlist(tweet_text, concept_top_k)
+        logger.info(f"Shortlisted {len(sectors)} sectors and {len(concepts)} concepts for the LLM")
+        return sectors, concepts
@@ -0,0 +1,118 @@
+"""
+Incremental JSON scanning for streamed LLM replies.
+Reports every element of a top-level array (e.g. "etf_codes") the moment it is
+complete, long before the whole object has arrived, so follow-up work can
+start while the rest of the reply is still streaming. The scanner only reports
+early; on text it can't decode it stops and leaves the reply to the full parse.
+"""
+
+import json
+
+_WHITESPACE = ' \t\r\n'
+
+
+class IncrementalJSONScanner:
+    def __init__(self, on_item=None):
+        """
+        Initialize scanner.
+
+        Args:
+            on_item: Callback on_item(key, value) for each completed element of a
+                top-level array; value is a str, int, float, bool or None
+        """
+        self.on_item = on_item
+        self.items = {}    # {key: [array elements seen so far]}
+        self.fields = {}   # {key: completed top-level scalar}
+        self.done = False
+        self.failed = False  # set (together with done) when the text stopped being valid JSON
+
+        self._started = False
+        self._stack = []          # '{' / '[' for the open containers
+        self._key = None          # current top-level key
+        self._expect_key = False  # at depth 1, the next string is a key
+        self._in_string = False
+        self._escape = False
+        self._buffer = []         # raw characters of the current string or bare token
+
+    def feed(self, chunk):
+        """Consume the next piece of streamed text."""
+        for ch in chunk:
+            if self.done:
+                return
+            if not self._started:
+                # Skip anything before the object, e.g. a ```json fence
+                if ch == '{':
+                    self._started = True
+                    self._stack.append('{')
+                    self._expect_key = True
+                continue
+            self._step(ch)
+
+    def _step(self, ch):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                try:
+                    value = json.loads('"' + ''.join(self._buffer) + '"')
+                except ValueError:
+                    # Raw control character or bad escape: report nothing more
+                    self.failed = self.done = True
+                    return
+                self._complete(value)
+                self._buffer = []
+                return
+            self._buffer.append(ch)
+            return
+
+        if ch == '"':
+            self._flush_token()
+            self._in_string = True
+        elif ch in '{[':
+            self._flush_token()
+            self._stack.append(ch)
+        elif ch in '}]':
+            self._flush_token()
+            if self._stack:
+                self._stack.pop()
+            if not self._stack:
+                self.done = True
+        elif ch == ':':
+            self._flush_token()
+            if len(self._stack) == 1:
+                self._expect_key = False
+        elif ch == ',':
+            self._flush_token()
+            if len(self._stack) == 1:
+                self._expect_key = True
+        elif ch in _WHITESPACE:
+            self._flush_token()
+        else:
+            # Part of a bare number / true / false / null
+            self._buffer.append(ch)
+
+    def _flush_token(self):
+        if not self._buffer or self._in_string:
+            return
+        token = ''.join(self._buffer)
+        self._buffer = []
+        try:
+            value = json.loads(token)
+        except ValueError:
+            return
+        self._complete(value)
+
+    def _complete(self, value):
+        depth = len(self._stack)
+        if depth == 1:
+            if self._expect_key:
+                self._key = value
+            else:
+                self.fields[self._key] = value
+        elif depth == 2 and self._stack[1] == '[':
+            self.items.setdefault(self._key, []).append(value)
+            if self.on_item is not None:
+                self.on_item(self._key, value)
@@ -0,0 +1,133 @@
+"""
+Validator cache for Nitter timeline polling.
+Remembers ETag / Last-Modified / content hash per timeline URL so an unchanged
+timeline can be skipped before any parsing or processed-ID work.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from src.utils import DATA_DIR, setup_logger
+
+logger = setup_logger('TimelineCache')
+
+VALIDATORS_FILE = os.path.join(DATA_DIR, 'timeline_validators.json')
+
+
+def content_digest(data):
+    """Return a short stable hash for bytes or str content."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+class TimelineValidatorCache:
+    def __init__(self, path=VALIDATORS_FILE):
+        """
+        Initialize validator cache.
+
+        Args:
+            path: JSON file where validators are persisted between runs
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.validators = self._load()
+        self.stats = {
+            'requests': 0,
+            'not_modified': 0,
+            'hash_hits': 0,
+            'bytes_saved': 0,
+        }
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load timeline validators: {e}")
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.validators, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save timeline validators: {e}")
+
+    def request_headers(self, key):
+        """
+        Build conditional request headers for a timeline.
+
+        Args:
+            key: Timeline URL
+
+        Returns:
+            Dict with If-None-Match / If-Modified-Since when validators are known
+        """
+        headers = {}
+        entry = self.validators.get(key, {})
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record_not_modified(self, key):
+        """Count a 304 response for a timeline."""
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += self.validators.get(key, {}).get('size', 0)
+
+    def is_unchanged(self, key, digest):
+        """
+        Check a freshly downloaded timeline against the stored content hash.
+        Counts the request either way.
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.validators.get(key, {}).get('digest') == digest:
+                self.stats['hash_hits'] += 1
+                return True
+            return False
+
+    def update(self, key, digest, etag=None, last_modified=None, size=0):
+        """
+        Store validators for a timeline. Call only after its items were processed,
+        otherwise a failed poll would be skipped as unchanged next time.
+        """
+        with self._lock:
+            self.validators[key] = {
+                'digest': digest,
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': size,
+            }
+            self._save()
+
+    def get_stats(self):
+        """Return request counters and the combined hit rate."""
+        requests = self.stats['requests']
+        hits = self.stats['not_modified'] + self.stats['hash_hits']
+        return {
+            **self.stats,
+            'hits': hits,
+            'hit_rate': hits / requests if requests else 0.0,
+        }
+
+
+# Global validator cache instance
+_validator_cache = None
+
+
+def get_validator_cache():
+    """Get or create global timeline validator cache instance."""
+    global _validator_cache
+    if _validator_cache is None:
+        _validator_cache = TimelineValidatorCache()
+    return _validator_cache
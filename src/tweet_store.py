@@ -0,0 +1,196 @@
+"""
+Processed-tweet store backed by SQLite in WAL mode.
+Membership checks and appends touch only the affected rows instead of
+rewriting a JSON file, retention keeps the newest N IDs per account by numeric
+snowflake order, and several monitor processes can share the database.
+Each account also has a numeric high-watermark: the newest tweet ID seen on
+its timeline, below which scanning can stop.
+"""
+
+import os
+import sqlite3
+import threading
+from src.utils import DATA_DIR, PROCESSED_TWEETS_FILE, load_config, load_processed_tweets, setup_logger
+
+logger = setup_logger('TweetStore')
+
+STORE_FILE = os.path.join(DATA_DIR, 'processed_tweets.db')
+
+
+def snowflake(tweet_id):
+    """Numeric sort key for a tweet ID (0 for non-numeric IDs such as test fixtures)."""
+    tweet_id = str(tweet_id)
+    return int(tweet_id) if tweet_id.isdigit() else 0
+
+
+class ProcessedTweetStore:
+    def __init__(self, path=STORE_FILE, keep=1000, compact_every=200, legacy_file=PROCESSED_TWEETS_FILE):
+        """
+        Open (and create if needed) the processed-tweet database.
+
+        Args:
+            path: SQLite database file
+            keep: Newest IDs kept per account; older ones are pruned
+            compact_every: Prune an account after this many inserts for it
+            legacy_file: processed_tweets.json imported on first open
+        """
+        self.path = path
+        self.keep = keep
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._inserts_since_prune = {}
+
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS processed (
+                account TEXT NOT NULL,
+                tweet_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (account, tweet_id)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_processed_seq ON processed (account, seq)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS watermarks (account TEXT PRIMARY KEY, high_id INTEGER NOT NULL)')
+        self._migrate_legacy(legacy_file)
+
+    def _migrate_legacy(self, legacy_file):
+        """Import processed_tweets.json once, then rename it to *.migrated."""
+        if not legacy_file or not os.path.exists(legacy_file):
+            return
+        with self._lock:
+            # IMMEDIATE takes the write lock so two processes can't both import
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                done = self._conn.execute("SELECT value FROM meta WHERE key = 'legacy_migrated'").fetchone()
+                if not done and os.path.exists(legacy_file):
+                    by_account = load_processed_tweets(legacy_file)
+                    for account, ids in by_account.items():
+                        self._conn.executemany(
+                            'INSERT OR IGNORE INTO processed (account, tweet_id, seq) VALUES (?, ?, ?)',
+                            [(account, str(i), snowflake(i)) for i in ids]
+                        )
+                    self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_migrated', '1')")
+                    logger.info(f"Migrated processed tweets for {len(by_account)} account(s) from {legacy_file}")
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        try:
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+        except OSError as e:
+            logger.warning(f"Could not rename {legacy_file}: {e}")
+
+    def contains(self, account, tweet_id):
+        """Check whether a tweet was already processed."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM processed WHERE account = ? AND tweet_id = ?', (account, str(tweet_id))
+            ).fetchone()
+        return row is not None
+
+    def filter_new(self, account, tweet_ids):
+        """
+        Return the subset of tweet_ids not processed yet for an account.
+
+        Args:
+            account: Account handle
+            tweet_ids: Iterable of tweet ID strings
+
+        Returns:
+            Set of unprocessed tweet IDs
+        """
+        tweet_ids = [str(i) for i in tweet_ids]
+        if not tweet_ids:
+            return set()
+        placeholders = ','.join('?' * len(tweet_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT tweet_id FROM processed WHERE account = ? AND tweet_id IN ({placeholders})',
+                [account] + tweet_ids
+            ).fetchall()
+        return set(tweet_ids) - {r[0] for r in rows}
+
+    def add(self, account, tweet_ids):
+        """Mark tweets as processed, pruning the account every compact_every inserts."""
+        rows = [(account, str(i), snowflake(i)) for i in tweet_ids]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO processed (account, tweet_id, seq) VALUES (?, ?, ?)', rows
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._inserts_since_prune[account] = self._inserts_since_prune.get(account, 0) + len(rows)
+            should_prune = self._inserts_since_prune[account] >= self.compact_every
+        if should_prune:
+            self.prune(account)
+
+    def prune(self, account):
+        """Keep only the newest `keep` IDs of an account, by numeric snowflake order."""
+        with self._lock:
+            cursor = self._conn.execute('''
+                DELETE FROM processed WHERE account = ? AND tweet_id NOT IN (
+                    SELECT tweet_id FROM processed WHERE account = ? ORDER BY seq DESC LIMIT ?
+                )
+            ''', (account, account, self.keep))
+            self._inserts_since_prune[account] = 0
+        if cursor.rowcount:
+            logger.info(f"Pruned {cursor.rowcount} old processed tweet(s) for {account}")
+
+    def count(self, account):
+        """Number of processed tweets stored for an account."""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM processed WHERE account = ?', (account,)).fetchone()[0]
+
+    def get_watermark(self, account):
+        """
+        Newest tweet ID seen for an account, or None before its first poll.
+        Accounts tracked before watermarks existed start from their newest processed ID.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT high_id FROM watermarks WHERE account = ?', (account,)).fetchone()
+            if row is None:
+                row = self._conn.execute(
+                    'SELECT MAX(seq) FROM processed WHERE account = ? AND seq > 0', (account,)
+                ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def set_watermark(self, account, tweet_id):
+        """Raise an account's watermark to tweet_id (it never moves backwards)."""
+        seq = snowflake(tweet_id)
+        if not seq:
+            return
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO watermarks (account, high_id) VALUES (?, ?)
+                ON CONFLICT (account) DO UPDATE SET high_id = MAX(high_id, excluded.high_id)
+            ''', (account, seq))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Global tweet store instance
+_tweet_store = None
+
+
+def get_tweet_store():
+    """Get or create global processed-tweet store."""
+    global _tweet_store
+    if _tweet_store is None:
+        try:
+            store_conf = load_config().get('processed_store', {})
+        except FileNotFoundError:
+            store_conf = {}
+        _tweet_store = ProcessedTweetStore(keep=store_conf.get('keep', 1000))
+    return _tweet_store
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import json
 import os
 import logging
@@ -14,7 +15,19 @@ if not os.path.exists(DATA_DIR):
 def convert_to_beijing_time(time_str):
     """
     Convert Nitter time string (e.g. 'Jan 18, 2026 · 11:36 PM UTC') to Beijing Time string.
+    RSS pubDate strings (e.g. 'Sun, 18 Jan 2026 23:36:00 GMT') are accepted as well.
     """
+    beijing_tz = timezone(timedelta(hours=8))
+    if ',' in time_str[:5]:
+        # RFC 822 date from the RSS feed; doesn't depend on locale
+        try:
+            dt = parsedate_to_datetime(time_str)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.astimezone(beijing_tz).strftime('%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            pass
+
     try:
         # Save current locale
         old_locale = locale.getlocale(locale.LC_TIME)
@@ -36,7 +49,6 @@ def convert_to_beijing_time(time_str):
             dt = dt.replace(tzinfo=timezone.utc)
             
             # Convert to Beijing (UTC+8)
-            beijing_tz = timezone(timedelta(hours=8))
             dt_beijing = dt.astimezone(beijing_tz)
             
             return dt_beijing.strftime('%Y-%m-%d %H:%M:%S')
@@ -54,15 +66,15 @@ def load_config():
     with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def load_processed_tweets():
+def load_processed_tweets(path=PROCESSED_TWEETS_FILE):
     """
-    Load processed tweet IDs per account.
+    Load processed tweet IDs per account (legacy JSON format, imported by src.tweet_store).
     Returns: dict[str, list] e.g. {"elonmusk": ["id1", "id2"], "realDonaldTrump": ["id3"]}
     Backward compat: if file contains a list, return {"elonmusk": that_list}.
     """
-    if not os.path.exists(PROCESSED_TWEETS_FILE):
+    if not os.path.exists(path):
         return {}
-    with open(PROCESSED_TWEETS_FILE, 'r', encoding='utf-8') as f:
+    with open(path, 'r', encoding='utf-8') as f:
         try:
             data = json.load(f)
         except json.JSONDecodeError:
@@ -72,20 +84,6 @@ def load_processed_tweets():
     return data
 
 
-def save_processed_tweets(by_account):
-    """
-    Save processed tweet IDs per account.
-    by_account: dict[str, list] e.g. {"elonmusk": ["id1", "id2"], "realDonaldTrump": ["id3"]}
-    """
-    out = {}
-    for account, ids in by_account.items():
-        unique_ids = sorted(list(set(ids)))
-        if len(unique_ids) > 1000:
-            unique_ids = unique_ids[-1000:]
-        out[account] = unique_ids
-    with open(PROCESSED_TWEETS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(out, f, indent=2)
-
 def setup_logger(name):
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
@@ -0,0 +1,107 @@
+"""
+Benchmark the ETF candidate shortlist: prompt tokens and LLM latency with the
+full ETF list vs. the top-K retrieved candidates, on a fixed tweet set.
+Also reports how many of the full-list picks survive the shortlist (recall).
+
+Needs the ETF list (AKShare or data/ cache) and llm_config in config.json.
+With --offline only the index build/query time and prompt sizes are measured.
+
+Usage: python tests/bench_candidate_retrieval.py [top_k] [--offline]
+"""
+
+import sys
+import os
+import time
+import statistics
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.market_data import MarketData
+
+TWEETS = [
+    "Tesla FSD v13 is now rolling out to all customers in North America",
+    "Starship flight 7 was a success! Booster caught by the tower again",
+    "Starlink now available in 100 countries",
+    "Grok 3 is the smartest AI on Earth, trained on 200k GPUs",
+    "Optimus will be the biggest product of all time",
+    "Tariffs are a tax on consumers",
+    "Bitcoin and Doge are the people's currency",
+    "The Fed should cut interest rates now",
+    "Neuralink's third patient is doing well",
+    "Solar + batteries is the future of energy",
+    "Wow",
+    "Mars, here we come!",
+]
+
+
+def prompt_chars(etfs):
+    return sum(len(etf['code']) + len(etf['name']) + 2 for etf in etfs)
+
+
+def run_llm(analyzer, tweet, etfs):
+    start = time.perf_counter()
+    _, codes = analyzer.analyze_relevant_etfs(tweet, etfs)
+    elapsed = (time.perf_counter() - start) * 1000
+    usage = analyzer.last_usage
+    return codes, elapsed, getattr(usage, 'prompt_tokens', 0) if usage else 0
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    top_k = int(args[0]) if args else 40
+    offline = '--offline' in sys.argv
+
+    market_data = MarketData()
+    etf_list = market_data.get_etf_list_for_analysis()
+    if not etf_list:
+        print("ETF list not available")
+        return
+
+    print("=" * 60)
+    print(f"ETF candidate retrieval benchmark ({len(etf_list)} ETFs, top {top_k}, {len(TWEETS)} tweets)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    index = market_data.get_etf_index(etf_list)
+    print(f"\nindex build       : {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    query_ms, shortlists = [], []
+    for tweet in TWEETS:
+        start = time.perf_counter()
+        shortlists.append(index.shortlist(tweet, top_k))
+        query_ms.append((time.perf_counter() - start) * 1000)
+    print(f"query             : median {statistics.median(query_ms):.2f} ms, max {max(query_ms):.2f} ms")
+    print(f"ETF list in prompt: full {prompt_chars(etf_list)} chars, "
+          f"shortlist median {statistics.median(prompt_chars(s) for s in shortlists):.0f} chars")
+
+    if offline:
+        for tweet, shortlist in zip(TWEETS, shortlists):
+            print(f"  {tweet[:40]:40s} -> {', '.join(etf['name'] for etf in shortlist[:5])}")
+        return
+
+    from src.analyzer import ETFAnalyzer
+    analyzer = ETFAnalyzer()
+    full_ms, full_tokens, short_ms, short_tokens = [], [], [], []
+    picked = kept = 0
+    for tweet, shortlist in zip(TWEETS, shortlists):
+        full_codes, ms, tokens = run_llm(analyzer, tweet, etf_list)
+        full_ms.append(ms)
+        full_tokens.append(tokens)
+        _, ms, tokens = run_llm(analyzer, tweet, shortlist)
+        short_ms.append(ms)
+        short_tokens.append(tokens)
+
+        shortlisted = {etf['code'] for etf in shortlist}
+        picked += len(full_codes)
+        kept += sum(1 for code in full_codes if code in shortlisted)
+
+    print(f"\nfull list : prompt tokens median {statistics.median(full_tokens):.0f}, "
+          f"latency median {statistics.median(full_ms):.0f} ms")
+    print(f"shortlist : prompt tokens median {statistics.median(short_tokens):.0f}, "
+          f"latency median {statistics.median(short_ms):.0f} ms")
+    print(f"recall    : {kept}/{picked} full-list picks are in the shortlist")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark the lean scraping profile (resource blocking + domcontentloaded)
+against a full page load. The saved Nitter timeline in tests/fixtures is served
+by a local stand-in with dummy stylesheets, fonts, images and a third-party host,
+and each asset gets a small artificial delay to mimic a remote instance.
+
+Usage: python tests/bench_lean_profile.py [rounds]
+"""
+
+import sys
+import os
+import re
+import time
+import threading
+import statistics
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.browser import BrowserManager
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'nitter_timeline.html')
+ASSET_DELAY = 0.03
+
+# Rough sizes of what a real Nitter page pulls in
+ASSET_SIZES = {
+    '/css/': 40 * 1024,
+    '/fonts/': 60 * 1024,
+    '/pic/profile_banners': 120 * 1024,
+    '/pic/': 25 * 1024,
+    '/js/': 8 * 1024,
+    '/logo.png': 6 * 1024,
+    '/favicon': 2 * 1024,
+    '/responsive-web/': 15 * 1024,
+}
+
+STATS = {'bytes': 0, 'requests': 0}
+STATS_LOCK = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    page = b''
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with STATS_LOCK:
+            STATS['bytes'] += len(body)
+            STATS['requests'] += 1
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/elonmusk':
+            self._send(self.page, 'text/html; charset=utf-8')
+            return
+
+        time.sleep(ASSET_DELAY)
+        size = next((n for prefix, n in ASSET_SIZES.items() if path.startswith(prefix)), 4 * 1024)
+        if path.endswith('.css'):
+            body = b"@font-face{font-family:fontello;src:url('/fonts/fontello.woff2') format('woff2')}"
+            body += b' ' * max(0, size - len(body))
+            self._send(body, 'text/css')
+        elif path.endswith('.js'):
+            self._send(b'/*' + b' ' * size + b'*/', 'application/javascript')
+        elif path.startswith('/fonts/'):
+            self._send(b'\0' * size, 'font/woff2')
+        else:
+            self._send(b'\0' * size, 'image/jpeg')
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    port = server.server_address[1]
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        html = f.read()
+    # localhost is the "instance"; 127.0.0.1 stands in for third-party hosts like twimg.com
+    html = re.sub(r'https://abs\.twimg\.com', f'http://127.0.0.1:{port}', html)
+    StandInHandler.page = html.encode('utf-8')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://localhost:{port}'
+
+
+def measure(manager, instance, wait_until, rounds):
+    timings, transferred, requests = [], [], []
+    for _ in range(rounds):
+        with STATS_LOCK:
+            STATS['bytes'] = STATS['requests'] = 0
+        context = manager.new_context(first_party=instance)
+        page = manager.new_page(context)
+        start = time.perf_counter()
+        page.goto(f'{instance}/elonmusk', wait_until=wait_until)
+        page.wait_for_selector('.timeline-item')
+        timings.append((time.perf_counter() - start) * 1000)
+        # Let late subresources finish so their bytes are counted
+        page.wait_for_load_state('networkidle')
+        context.close()
+        with STATS_LOCK:
+            transferred.append(STATS['bytes'])
+            requests.append(STATS['requests'])
+    return timings, transferred, requests
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    server, instance = start_server()
+
+    print("=" * 60)
+    print("Lean scraping profile benchmark")
+    print("=" * 60)
+
+    profiles = [
+        ('full page load', BrowserManager(block_resources=False), 'load'),
+        ('lean profile', BrowserManager(block_resources=True), 'domcontentloaded'),
+    ]
+    for name, manager, wait_until in profiles:
+        timings, transferred, requests = measure(manager, instance, wait_until, rounds)
+        print(f"\n{name} ({rounds} rounds):")
+        print(f"  requests          : {statistics.mean(requests):.0f}")
+        print(f"  bytes transferred : {statistics.mean(transferred) / 1024:.1f} KB")
+        print(f"  time-to-selector  : median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+        manager.close()
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
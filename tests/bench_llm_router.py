@@ -0,0 +1,95 @@
+"""
+Offline benchmark of LLM routing against local mock OpenAI-compatible servers
+(tests/mock_llm_server.py). A primary provider goes through three phases
+(healthy, slow + failing, healthy again) next to a steady backup; the same
+request sequence is sent through a router over the primary alone and over
+both. Reports latency percentiles, failed calls and where calls went per phase.
+
+Usage: python tests/bench_llm_router.py [--requests 30] [--latency 0.05] [--outage-latency 1.0] [--deadline 3]
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.llm_router import LLMRouter, Provider
+from tests.mock_llm_server import MockLLMServer
+
+PHASES = ('healthy', 'outage', 'recovered')
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+def run(primary, backup, with_backup, args):
+    providers = [Provider('primary', 'primary-model', base_url=primary.url, api_key='bench', timeout=args.timeout)]
+    if with_backup:
+        providers.append(Provider('backup', 'backup-model', base_url=backup.url, api_key='bench',
+                                  timeout=args.timeout, weight=0.5))
+    router = LLMRouter(providers, deadline=args.deadline, cooldown=args.cooldown,
+                       max_cooldown=4 * args.cooldown, explore=0.1)
+    results = {}
+    try:
+        for phase in PHASES:
+            if phase == 'outage':
+                primary.latency, primary.error_rate = args.outage_latency, 0.5
+            else:
+                primary.latency, primary.error_rate = args.latency, 0.0
+            latencies, failed, routed = [], 0, {}
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                try:
+                    response = router.create(model='bench', messages=[{'role': 'user', 'content': 'tweet'}])
+                    routed[response.model] = routed.get(response.model, 0) + 1
+                except Exception:
+                    failed += 1
+                latencies.append(time.perf_counter() - start)
+            if phase == 'outage':
+                # Let the primary's cooldown run out so it can win back traffic
+                time.sleep(max(0.0, providers[0].cooldown_until - time.time()))
+            results[phase] = (latencies, failed, routed)
+        results['failovers'] = router.metrics.get_stats()['failovers']
+    finally:
+        router.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=30, help='Requests per phase')
+    parser.add_argument('--latency', type=float, default=0.05, help='Healthy latency of both servers (s)')
+    parser.add_argument('--outage-latency', type=float, default=1.0, help='Primary latency during the outage (s)')
+    parser.add_argument('--timeout', type=float, default=0.5, help='Per-attempt timeout (s)')
+    parser.add_argument('--deadline', type=float, default=3.0, help='Per-call deadline (s)')
+    parser.add_argument('--cooldown', type=float, default=1.0, help='Cooldown after a failure (s)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"LLM router benchmark ({args.requests} requests per phase, "
+          f"outage: {args.outage_latency}s latency + 50% errors)")
+    print("=" * 60)
+    for with_backup in (False, True):
+        primary = MockLLMServer(latency=args.latency, seed=1).start()
+        backup = MockLLMServer(latency=args.latency * 1.5, seed=2).start()
+        try:
+            results = run(primary, backup, with_backup, args)
+        finally:
+            primary.stop()
+            backup.stop()
+        print(f"\n{'primary + backup' if with_backup else 'primary only'}:")
+        for phase in PHASES:
+            latencies, failed, routed = results[phase]
+            share = ', '.join(f"{model} {count}" for model, count in sorted(routed.items())) or '-'
+            print(f"  {phase:<10} p50 {percentile(latencies, 0.5) * 1000:7.0f} ms   "
+                  f"p95 {percentile(latencies, 0.95) * 1000:7.0f} ms   failed {failed:>3}   ({share})")
+        print(f"  failovers: {results['failovers']}")
+
+
+if __name__ == '__main__':
+    main()
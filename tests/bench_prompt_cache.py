@@ -0,0 +1,116 @@
+"""
+Benchmark provider-side prefix caching: time-to-first-token, cached prompt
+tokens and cost of the ETF selection request with the previous layout (tweet
+first, catalogue after it) vs. the cache-friendly layout (static catalogue in
+a leading system message, tweet last), over a fixed tweet set.
+
+Needs the ETF list (AKShare or data/ cache) and llm_config in config.json.
+Prices default to DeepSeek's per-million-token input prices in CNY.
+
+Usage: python tests/bench_prompt_cache.py [--price-miss 2.0] [--price-hit 0.5] [--price-out 8.0]
+"""
+
+import sys
+import os
+import time
+import argparse
+import statistics
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyzer import ETFAnalyzer, ETFS_INSTRUCTIONS, build_messages, cached_prompt_tokens, etf_catalogue
+from src.market_data import MarketData
+
+TWEETS = [
+    "Tesla FSD v13 is now rolling out to all customers in North America",
+    "Starship flight 7 was a success! Booster caught by the tower again",
+    "Starlink now available in 100 countries",
+    "Grok 3 is the smartest AI on Earth, trained on 200k GPUs",
+    "Optimus will be the biggest product of all time",
+    "Tariffs are a tax on consumers",
+    "Bitcoin and Doge are the people's currency",
+    "Solar + batteries is the future of energy",
+]
+
+
+def legacy_messages(tweet_text, etf_list):
+    """The previous layout: the tweet comes first, so no two requests share a prefix."""
+    etf_list_str = '\n'.join(f"{etf['code']} {etf['name']}" for etf in etf_list)
+    instructions = ETFS_INSTRUCTIONS.split('\n', 2)[2]
+    prompt = f"""
+请分析这条马斯克的推文，并从给定的ETF列表中选择最相关的3个：
+"{tweet_text}"
+
+可用ETF列表（格式：代码 名称）：
+{etf_list_str}
+
+{instructions}"""
+    return [
+        {"role": "system", "content": "你是一个精通中国A股ETF投资和马斯克言论分析的金融助手。"},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def run(analyzer, build, etf_list):
+    ttft, totals, prompt_tokens, cached_tokens, completion_tokens = [], [], [], [], []
+    for tweet in TWEETS:
+        start = time.perf_counter()
+        first = None
+        usage = None
+        stream = analyzer.client.chat.completions.create(
+            model=analyzer.model,
+            messages=build(tweet, etf_list),
+            temperature=0.3,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if first is None and chunk.choices and chunk.choices[0].delta.content:
+                first = time.perf_counter()
+            if getattr(chunk, 'usage', None):
+                usage = chunk.usage
+        end = time.perf_counter()
+        ttft.append(((first or end) - start) * 1000)
+        totals.append((end - start) * 1000)
+        prompt_tokens.append(usage.prompt_tokens if usage else 0)
+        cached_tokens.append(cached_prompt_tokens(usage))
+        completion_tokens.append(usage.completion_tokens if usage else 0)
+    return ttft, totals, prompt_tokens, cached_tokens, completion_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--price-miss', type=float, default=2.0, help='Price per 1M uncached prompt tokens')
+    parser.add_argument('--price-hit', type=float, default=0.5, help='Price per 1M cached prompt tokens')
+    parser.add_argument('--price-out', type=float, default=8.0, help='Price per 1M completion tokens')
+    args = parser.parse_args()
+
+    etf_list = MarketData().get_etf_list_for_analysis()
+    if not etf_list:
+        print("ETF list not available")
+        return
+    analyzer = ETFAnalyzer()
+
+    print("=" * 60)
+    print(f"Prompt prefix cache benchmark ({len(etf_list)} ETFs, {len(TWEETS)} tweets, model {analyzer.model})")
+    print("=" * 60)
+
+    layouts = [
+        ('tweet-first layout', legacy_messages),
+        ('cache-friendly layout', lambda tweet, etfs: build_messages(ETFS_INSTRUCTIONS, etf_catalogue(etfs), tweet)),
+    ]
+    for name, build in layouts:
+        ttft, totals, prompt, cached, completion = run(analyzer, build, etf_list)
+        cost = sum((p - c) * args.price_miss + c * args.price_hit + o * args.price_out
+                   for p, c, o in zip(prompt, cached, completion)) / 1e6
+        print(f"\n{name}:")
+        print(f"  time to first token : median {statistics.median(ttft):.0f} ms, max {max(ttft):.0f} ms")
+        print(f"  total latency       : median {statistics.median(totals):.0f} ms")
+        print(f"  prompt tokens       : {sum(prompt)} ({sum(cached)} cached, "
+              f"{sum(cached) / sum(prompt) if sum(prompt) else 0:.0%})")
+        print(f"  cost                : {cost:.4f} for {len(TWEETS)} requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Replay benchmark of the relevance gate on an archived, labeled tweet set
+(src/relevance_tweets.jsonl: {"text": ..., "relevant": true/false}).
+Reports the skip rate, the false-skip rate (relevant tweets the gate would
+keep from the LLM), the gate's own latency and the LLM time it saves.
+
+Without a trained model the char n-gram model is evaluated by k-fold
+cross-validation on the set; train and save one with
+`python -m src.relevance --train`.
+
+Usage: python tests/bench_relevance_gate.py [tweets.jsonl] [--threshold 0.35] [--llm-seconds 3.0]
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.relevance import (RelevanceGate, RELEVANCE_MODEL_FILE, RELEVANCE_TRAINING_FILE, cross_validate,
+                           load_labeled_tweets, replay)
+
+
+def print_result(name, result, total, llm_seconds):
+    print(f"\n{name}:")
+    print(f"  skip rate       : {result['skipped']}/{total} ({result['skipped'] / total:.0%})")
+    print(f"  false-skip rate : {result['false_skips']}/{result['relevant']} relevant tweets "
+          f"({result['false_skips'] / max(result['relevant'], 1):.1%})")
+    print(f"  irrelevant kept : {result['missed']}")
+    print(f"  gate latency    : {result['gate_ms']:.3f} ms per tweet")
+    print(f"  LLM time saved  : ~{result['skipped'] * llm_seconds:.0f}s over the set")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default=RELEVANCE_TRAINING_FILE, help='Labeled tweets (JSONL)')
+    parser.add_argument('--threshold', type=float, default=0.35)
+    parser.add_argument('--llm-seconds', type=float, default=3.0, help='Average LLM analysis time per tweet')
+    args = parser.parse_args()
+
+    texts, labels = load_labeled_tweets(args.path)
+    print("=" * 60)
+    print(f"Relevance gate replay ({len(texts)} tweets, {sum(labels)} relevant)")
+    print("=" * 60)
+
+    gate = RelevanceGate(mode='skip', threshold=args.threshold, model_path='')
+    print_result('lexicon + trivial filter only', replay(gate, texts, labels), len(texts), args.llm_seconds)
+
+    if os.path.exists(RELEVANCE_MODEL_FILE):
+        gate = RelevanceGate(mode='skip', threshold=args.threshold)
+        print_result(f'with model {RELEVANCE_MODEL_FILE}', replay(gate, texts, labels), len(texts), args.llm_seconds)
+    else:
+        print_result('with model (5-fold cross-validation)',
+                     cross_validate(texts, labels, args.threshold), len(texts), args.llm_seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: per-element timeline extraction vs. a single page.evaluate.
+Loads the saved Nitter timeline in tests/fixtures and extracts it both ways.
+
+Usage: python tests/bench_timeline_extract.py [rounds]
+"""
+
+import sys
+import os
+import time
+import statistics
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+from src.monitor import TwitterMonitor, TIMELINE_ITEMS_JS, entries_from_items
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'nitter_timeline.html')
+
+
+def extract_per_element(page, max_items):
+    """The previous extraction path: several Playwright round trips per item."""
+    entries = []
+    calls = 1
+    for item in page.query_selector_all('.timeline-item')[:max_items]:
+        link_el = item.query_selector('a.tweet-link')
+        calls += 1
+        if not link_el: continue
+        tweet_link_suffix = link_el.get_attribute('href')
+        content_el = item.query_selector('.tweet-content')
+        date_el = item.query_selector('.tweet-date a')
+        username_el = item.query_selector('.tweet-header a.username')
+        calls += 4
+        entries.append({
+            'id': tweet_link_suffix.split('/')[-1].split('#')[0],
+            'href': tweet_link_suffix,
+            'text': content_el.inner_text() if content_el else "",
+            'published_raw': date_el.get_attribute('title') if date_el else "Unknown time",
+            'is_reply': item.query_selector('.replying-to') is not None,
+            'is_pinned': item.query_selector('.pinned') is not None,
+            'is_retweet': item.query_selector('.retweet-header') is not None,
+            'author': username_el.inner_text() if username_el else ""
+        })
+        calls += 6
+    return entries, calls
+
+
+def extract_evaluate(page, max_items):
+    return entries_from_items(page.evaluate(TIMELINE_ITEMS_JS, {'maxItems': max_items, 'watermark': None})), 1
+
+
+def run(page, func, max_items, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        entries, calls = func(page, max_items)
+        timings.append((time.perf_counter() - start) * 1000)
+    return entries, calls, timings
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    print("=" * 60)
+    print("Timeline extraction micro-benchmark")
+    print("=" * 60)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(html)
+
+        for max_items in (TwitterMonitor.max_items, 20):
+            legacy, legacy_calls, legacy_t = run(page, extract_per_element, max_items, rounds)
+            oneshot, oneshot_calls, oneshot_t = run(page, extract_evaluate, max_items, rounds)
+            assert legacy == oneshot, "extraction paths disagree"
+
+            print(f"\n{max_items} items, {rounds} rounds:")
+            print(f"  per-element : {legacy_calls:3d} IPC calls, median {statistics.median(legacy_t):7.2f} ms, "
+                  f"p95 {sorted(legacy_t)[int(len(legacy_t) * 0.95) - 1]:7.2f} ms")
+            print(f"  evaluate    : {oneshot_calls:3d} IPC call,  median {statistics.median(oneshot_t):7.2f} ms, "
+                  f"p95 {sorted(oneshot_t)[int(len(oneshot_t) * 0.95) - 1]:7.2f} ms")
+            print(f"  speedup     : {statistics.median(legacy_t) / statistics.median(oneshot_t):.1f}x")
+
+        browser.close()
+
+
+if __name__ == '__main__':
+    main()
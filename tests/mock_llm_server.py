@@ -0,0 +1,174 @@
+"""
+Local mock of an OpenAI-compatible chat completions endpoint, for testing and
+benchmarking LLM routing offline. Latency, jitter, error rate, error status
+and hangs can be set per server (and changed while it runs); plain and
+streamed (SSE) replies are supported.
+
+Usage: python tests/mock_llm_server.py [--port 8001] [--latency 0.5] [--jitter 0.1] [--error-rate 0.2]
+Then point llm_config / llm_router at http://127.0.0.1:8001/v1
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = '{"etf_codes": ["515030"], "sectors": ["汽车整车"], "concepts": ["特斯拉"], "summary": "特斯拉交付创新高"}'
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-reply; that is expected here
+        pass
+
+
+class MockLLMServer:
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, hang=False,
+                 reply=DEFAULT_REPLY, seed=None):
+        """
+        Args:
+            port: Port to listen on (0 picks a free one)
+            latency: Seconds before the reply (before the first chunk when streaming)
+            jitter: Extra random seconds, uniform in [0, jitter]
+            error_rate: Share of requests answered with error_status
+            error_status: HTTP status of injected errors (429, 500, 503, ...)
+            hang: Never answer (until the client gives up)
+            reply: Assistant message content
+            seed: Random seed for reproducible jitter and errors
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang = hang
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        """API base for OpenAI clients."""
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.hang = False
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _plan(self):
+        """(delay seconds, error status or None) of the next request."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, self.error_status if failed else None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    return self._json(404, {'error': {'message': f"unknown path {self.path}"}})
+                delay, status = server._plan()
+                while server.hang:
+                    time.sleep(0.05)
+                time.sleep(delay)
+                if status:
+                    return self._json(status, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+                if body.get('stream'):
+                    return self._stream(body)
+                self._json(200, {
+                    'id': 'chatcmpl-mock',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'mock'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': server.reply}}],
+                    'usage': self._usage(body),
+                })
+
+            def _usage(self, body):
+                prompt = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 2
+                completion = len(server.reply) // 2
+                return {'prompt_tokens': prompt, 'completion_tokens': completion,
+                        'total_tokens': prompt + completion}
+
+            def _json(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                base = {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk',
+                        'created': int(time.time()), 'model': body.get('model', 'mock')}
+                reply = server.reply
+                for i in range(0, len(reply), 8):
+                    chunk = dict(base, choices=[{'index': 0, 'delta': {'content': reply[i:i + 8]},
+                                                 'finish_reason': None}])
+                    self._event(chunk)
+                self._event(dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))
+                if (body.get('stream_options') or {}).get('include_usage'):
+                    self._event(dict(base, choices=[], usage=self._usage(body)))
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _event(self, payload):
+                self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=500)
+    args = parser.parse_args()
+    server = MockLLMServer(args.port, args.latency, args.jitter, args.error_rate, args.error_status).start()
+    print(f"Mock OpenAI-compatible server at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
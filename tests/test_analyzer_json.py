@@ -0,0 +1,93 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.analyzer import ETFAnalyzer
+from src.llm_metrics import LLMMetrics
+
+ETFS = [{'code': '159206', 'name': '卫星ETF'}]
+
+
+def chunks(content, size=8):
+    """A streamed reply of content in pieces of `size` characters."""
+    return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))], usage=None)
+            for i in range(0, len(content), size)]
+
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, message='', body=None):
+        super().__init__(f"HTTP {status_code} {message}")
+        self.status_code = status_code
+        self.body = body
+
+
+class TestAnalyzerJSON(unittest.TestCase):
+    def setUp(self):
+        with mock.patch('src.analyzer.load_config', return_value={}), \
+                mock.patch('src.analyzer.get_llm_cache', return_value=None), \
+                mock.patch('src.analyzer.get_llm_client', return_value=None), \
+                mock.patch('src.analyzer.get_llm_router', return_value=None), \
+                mock.patch('src.analyzer.get_llm_metrics', return_value=LLMMetrics(ledger_path=None)), \
+                mock.patch('src.analyzer.OpenAI'):
+            self.analyzer = ETFAnalyzer()
+        self.create = self.analyzer.client.chat.completions.create
+
+    def parse_stats(self):
+        return {k: v for k, v in self.analyzer.metrics.summary()['etfs'].items()
+                if k in ('parsed', 'repaired', 'parse_failures')}
+
+    def test_json_mode_and_tolerant_parsing(self):
+        self.create.return_value = reply('结果如下：{"summary": "星舰", "etf_codes": [159206]} 以上')
+        self.assertEqual(self.analyzer.analyze_relevant_etfs('Starship', ETFS), ('星舰', ['159206']))
+        self.assertEqual(self.create.call_args.kwargs['response_format'], {'type': 'json_object'})
+        self.assertEqual(self.parse_stats(), {'parsed': 1, 'repaired': 0, 'parse_failures': 0})
+
+    def test_omitted_list_key_is_not_repaired(self):
+        self.create.return_value = reply('{"summary": "闲聊"}')
+        self.assertEqual(self.analyzer.analyze_relevant_etfs('gm', ETFS), ('闲聊', []))
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(self.parse_stats(), {'parsed': 1, 'repaired': 0, 'parse_failures': 0})
+
+    def test_malformed_reply_is_repaired(self):
+        self.create.side_effect = [reply('{"summary": "星舰", "etf_codes": ["159206",]'),
+                                   reply(json.dumps({'summary': '星舰', 'etf_codes': ['159206']}))]
+        self.assertEqual(self.analyzer.analyze_relevant_etfs('Starship', ETFS), ('星舰', ['159206']))
+        repair = self.create.call_args_list[1].kwargs['messages']
+        self.assertIn('"etf_codes": ["159206",]', repair[1]['content'])
+        self.assertEqual(self.parse_stats(), {'parsed': 1, 'repaired': 1, 'parse_failures': 0})
+
+    def test_failed_repair_returns_empty_result(self):
+        self.create.side_effect = [reply('oops'), reply('still oops')]
+        self.assertEqual(self.analyzer.analyze_relevant_etfs('Starship', ETFS), ("", []))
+        self.assertEqual(self.parse_stats(), {'parsed': 1, 'repaired': 0, 'parse_failures': 1})
+
+    def test_json_mode_rejected_by_provider(self):
+        error = StatusError(400, body={'error': {'message': "'response_format.type' json_object is not supported"}})
+        self.create.side_effect = [error, reply('{"summary": "s", "etf_codes": []}')]
+        self.assertEqual(self.analyzer.analyze_relevant_etfs('Starship', ETFS), ('s', []))
+        self.assertFalse(self.analyzer.json_mode)
+        self.assertNotIn('response_format', self.create.call_args.kwargs)
+
+    def test_unrelated_bad_request_keeps_json_mode(self):
+        self.create.side_effect = [StatusError(400, "This model's maximum context length is 8192 tokens")]
+        self.assertEqual(self.analyzer.analyze_relevant_etfs('Starship', ETFS), ("", []))
+        self.assertTrue(self.analyzer.json_mode)
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_streamed_reply_with_malformed_string(self):
+        broken = '{"etf_codes": ["159206"], "summary": "星舰\n试飞", "sectors": ["航天航空"], "concepts": []}'
+        fixed = json.dumps({'etf_codes': ['159206'], 'summary': '星舰试飞', 'sectors': ['航天航空'], 'concepts': []})
+        self.create.side_effect = [iter(chunks(broken)), reply(fixed)]
+        seen = []
+        result = self.analyzer.analyze_combined('Starship', ETFS, [], [], on_item=lambda k, v: seen.append((k, v)))
+        self.assertEqual(result['summary'], '星舰试飞')
+        self.assertEqual(result['sectors'], ['航天航空'])
+        self.assertEqual(seen, [('etf_codes', '159206')])
+
+
+if __name__ == '__main__':
+    unittest.main()
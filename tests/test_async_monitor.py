@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.async_monitor import AsyncMonitorRunner
+from src.browser import BrowserManager
+
+
+def loop_running():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class FakeAsyncMonitor:
+    """AsyncTwitterMonitor stand-in: behaviour per account comes from the test's plan."""
+
+    plan = {}
+    active = 0
+    max_active = 0
+
+    def __init__(self, account, browser_manager=None):
+        self.account = account
+        self.browser_manager = browser_manager
+
+    async def fetch_tweets_async(self):
+        delay, result = self.plan[self.account]
+        cls = type(self)
+        cls.active += 1
+        cls.max_active = max(cls.max_active, cls.active)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            cls.active -= 1
+        if isinstance(result, Exception):
+            raise result
+        return [dict(t) for t in result]
+
+
+class TestAsyncMonitorRunner(unittest.TestCase):
+    def setUp(self):
+        FakeAsyncMonitor.active = FakeAsyncMonitor.max_active = 0
+        patcher = mock.patch('src.async_monitor.AsyncTwitterMonitor', FakeAsyncMonitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.browser_manager = mock.Mock(recycle_async=mock.AsyncMock(), aclose=mock.AsyncMock())
+
+    def make_runner(self, **kwargs):
+        runner = AsyncMonitorRunner(browser_manager=self.browser_manager, **kwargs)
+        self.addCleanup(runner.close)
+        return runner
+
+    def test_results_merged_in_account_order(self):
+        FakeAsyncMonitor.plan = {
+            'elonmusk': (0.05, [{'id': '1'}, {'id': '2', 'author': 'SpaceX'}]),
+            'tesla': (0.0, [{'id': '3'}]),
+            'quiet': (0.0, []),
+        }
+        tweets = self.make_runner().fetch_all(['elonmusk', 'tesla', 'quiet'])
+        self.assertEqual([(t['id'], t['author']) for t in tweets],
+                         [('1', 'elonmusk'), ('2', 'SpaceX'), ('3', 'tesla')])
+        self.browser_manager.recycle_async.assert_awaited_once()
+
+    def test_concurrency_limit(self):
+        FakeAsyncMonitor.plan = {str(i): (0.02, [{'id': str(i)}]) for i in range(6)}
+        tweets = self.make_runner(concurrency=2).fetch_all([str(i) for i in range(6)])
+        self.assertEqual(len(tweets), 6)
+        self.assertEqual(FakeAsyncMonitor.max_active, 2)
+
+    def test_slow_or_failing_account_does_not_block_others(self):
+        FakeAsyncMonitor.plan = {
+            'slow': (5, [{'id': '1'}]),
+            'broken': (0.0, RuntimeError('all instances down')),
+            'tesla': (0.0, [{'id': '3'}]),
+        }
+        with self.assertLogs('AsyncMonitor', 'WARNING'):
+            tweets = self.make_runner(account_timeout=0.1).fetch_all(['slow', 'broken', 'tesla'])
+        self.assertEqual([t['id'] for t in tweets], ['3'])
+
+    def test_close_releases_async_browser(self):
+        runner = AsyncMonitorRunner(browser_manager=self.browser_manager)
+        runner.close()
+        self.browser_manager.aclose.assert_awaited_once()
+        self.assertTrue(runner.loop.is_closed())
+
+
+class TestSyncBrowserHandover(unittest.TestCase):
+    def test_sync_browser_closed_outside_event_loop(self):
+        closed_in_loop = []
+        sync_browser = mock.Mock(**{'close.side_effect': lambda: closed_in_loop.append(loop_running())})
+        sync_playwright = mock.Mock(**{'chromium.launch.return_value': sync_browser})
+        async_browser = mock.Mock(**{'is_connected.return_value': True, 'close': mock.AsyncMock()})
+        async_playwright = SimpleNamespace(chromium=SimpleNamespace(launch=mock.AsyncMock(return_value=async_browser)),
+                                           stop=mock.AsyncMock())
+
+        manager = BrowserManager()
+        with mock.patch('src.browser.sync_playwright', return_value=mock.Mock(start=lambda: sync_playwright)), \
+                mock.patch('src.browser.async_playwright',
+                           return_value=mock.Mock(start=mock.AsyncMock(return_value=async_playwright))):
+            manager.new_context()
+
+            class BrowsingMonitor(FakeAsyncMonitor):
+                async def fetch_tweets_async(self):
+                    await self.browser_manager._ensure_async_browser()
+                    return []
+
+            runner = AsyncMonitorRunner(browser_manager=manager)
+            with mock.patch('src.async_monitor.AsyncTwitterMonitor', BrowsingMonitor):
+                runner.fetch_all(['elonmusk'])
+            runner.close()
+
+        self.assertEqual(closed_in_loop, [False])
+        sync_playwright.stop.assert_called_once()
+        self.assertIsNone(manager._browser)
+        async_browser.close.assert_awaited_once()
+        self.assertEqual(manager.get_stats()['launches'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.analyzer import ETFAnalyzer
+from src.llm_metrics import LLMMetrics
+
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def batch_reply(*ids):
+    return reply(json.dumps({'results': [
+        {'id': i, 'etf_codes': ['159206'], 'sectors': [], 'concepts': [], 'summary': f's{i}'} for i in ids
+    ]}))
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    def setUp(self):
+        with mock.patch('src.analyzer.load_config', return_value={}), \
+                mock.patch('src.analyzer.get_llm_cache', return_value=None), \
+                mock.patch('src.analyzer.get_llm_client', return_value=None), \
+                mock.patch('src.analyzer.get_llm_router', return_value=None), \
+                mock.patch('src.analyzer.get_llm_metrics', return_value=LLMMetrics(ledger_path=None)), \
+                mock.patch('src.analyzer.OpenAI'):
+            self.analyzer = ETFAnalyzer()
+        self.create = self.analyzer.client.chat.completions.create
+        self.tweets = [
+            {'id': str(1900000000000000000 + n), 'text': f'tweet {n}',
+             'etf_list': [{'code': '159206', 'name': '卫星ETF'}], 'sector_list': [], 'concept_list': []}
+            for n in range(4)
+        ]
+
+    def test_one_request_per_batch(self):
+        single = reply(json.dumps({'etf_codes': [159206], 'sectors': [], 'concepts': [], 'summary': 'single'}))
+        self.create.side_effect = [batch_reply(1, 2, 3), single]
+        results = self.analyzer.analyze_combined_batch(self.tweets, max_batch=3)
+        self.assertEqual(self.create.call_count, 2)
+        self.assertEqual(results[self.tweets[2]['id']]['summary'], 's3')
+        # A batch of one is a plain combined request
+        self.assertEqual(results[self.tweets[3]['id']], {'summary': 'single', 'etf_codes': ['159206'],
+                                                          'sectors': [], 'concepts': []})
+
+    def test_split_and_retry_on_bad_reply(self):
+        # Broken reply, failed repair, then one request per half
+        self.create.side_effect = [reply('not json'), reply('still not json'), batch_reply(1, 2), batch_reply(1, 2)]
+        results = self.analyzer.analyze_combined_batch(self.tweets, max_batch=4)
+        self.assertEqual(self.create.call_count, 4)
+        self.assertEqual(len(results), 4)
+
+    def test_request_errors_are_not_split(self):
+        self.create.side_effect = ConnectionError('provider down')
+        with self.assertLogs('ETFAnalyzer', level='ERROR'):
+            results = self.analyzer.analyze_combined_batch(self.tweets, max_batch=4)
+        self.assertEqual(results, {})
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_missing_tweets_are_retried(self):
+        self.create.side_effect = [batch_reply(1, 3), batch_reply(1, 2)]
+        results = self.analyzer.analyze_combined_batch(self.tweets, max_batch=4)
+        self.assertEqual(self.create.call_count, 2)
+        self.assertEqual(results[self.tweets[3]['id']]['summary'], 's2')
+
+    def test_token_budget_limits_batch(self):
+        with mock.patch.object(self.analyzer, 'analyze_combined',
+                               return_value={'summary': 's', 'etf_codes': [], 'sectors': [], 'concepts': []}):
+            results = self.analyzer.analyze_combined_batch(self.tweets, max_batch=4, max_tokens=1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.create.call_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
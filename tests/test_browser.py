@@ -0,0 +1,121 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.browser import BrowserManager
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.fail_next_context = False
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **kwargs):
+        if self.fail_next_context:
+            self.fail_next_context = False
+            raise RuntimeError('Target closed')
+        context = mock.Mock()
+        context.options = kwargs
+        return context
+
+    def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakePlaywright:
+    """Stands in for sync_playwright(): start() returns itself, chromium.launch() a FakeBrowser."""
+
+    def __init__(self):
+        self.browsers = []
+        self.stopped = False
+        self.chromium = SimpleNamespace(launch=self._launch)
+
+    def _launch(self, headless=True):
+        self.browsers.append(FakeBrowser())
+        return self.browsers[-1]
+
+    def start(self):
+        return self
+
+    def stop(self):
+        self.stopped = True
+
+
+class TestBrowserManager(unittest.TestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = mock.patch('src.browser.sync_playwright', return_value=self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_page(self, manager, first_party=None):
+        context = manager.new_context(first_party)
+        return context, manager.new_page(context)
+
+    def test_browser_is_launched_lazily_and_shared(self):
+        manager = BrowserManager(max_pages=0)
+        self.assertEqual(self.playwright.browsers, [])
+        for _ in range(3):
+            self.open_page(manager)
+        self.assertEqual(len(self.playwright.browsers), 1)
+        stats = manager.get_stats()
+        self.assertEqual((stats['launches'], stats['restarts'], stats['pages']), (1, 0, 3))
+
+    def test_recycled_after_max_pages(self):
+        manager = BrowserManager(max_pages=2)
+        for _ in range(5):
+            self.open_page(manager)
+        self.assertEqual(len(self.playwright.browsers), 3)
+        self.assertTrue(all(browser.closed for browser in self.playwright.browsers[:2]))
+        self.assertFalse(self.playwright.browsers[2].closed)
+        stats = manager.get_stats()
+        self.assertEqual((stats['launches'], stats['restarts'], stats['pages']), (3, 2, 5))
+        self.assertEqual(stats['pages_since_launch'], 1)
+
+    def test_restarted_after_crash(self):
+        manager = BrowserManager(max_pages=0)
+        self.open_page(manager)
+        self.playwright.browsers[0].connected = False
+        self.open_page(manager)
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertEqual(manager.get_stats()['restarts'], 1)
+
+    def test_new_context_failure_relaunches_once(self):
+        manager = BrowserManager(max_pages=0)
+        self.open_page(manager)
+        self.playwright.browsers[0].fail_next_context = True
+        context, _ = self.open_page(manager)
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertTrue(self.playwright.browsers[0].closed)
+        self.assertEqual(context.options['user_agent'], manager.user_agent)
+
+    def test_lean_profile_route(self):
+        manager = BrowserManager(block_resources=True)
+        context, _ = self.open_page(manager, 'http://localhost:8080/elonmusk')
+        handle = context.route.call_args.args[1]
+        for url, resource_type, aborted in [('http://localhost:8080/elonmusk', 'document', False),
+                                            ('http://localhost:8080/pic/a.jpg', 'image', True),
+                                            ('https://ads.example.com/x.js', 'script', True)]:
+            route = mock.Mock(request=SimpleNamespace(url=url, resource_type=resource_type))
+            handle(route)
+            self.assertEqual(route.abort.called, aborted, url)
+            self.assertEqual(route.continue_.called, not aborted, url)
+
+        unblocked = BrowserManager(block_resources=False)
+        context, _ = self.open_page(unblocked)
+        context.route.assert_not_called()
+
+    def test_close_stops_playwright(self):
+        manager = BrowserManager()
+        self.open_page(manager)
+        manager.close()
+        self.assertTrue(self.playwright.browsers[0].closed)
+        self.assertTrue(self.playwright.stopped)
+
+
+if __name__ == '__main__':
+    unittest.main()
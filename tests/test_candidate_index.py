@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+from src.candidate_index import CandidateIndex, board_text, expand_query, tokenize
+
+ETFS = [
+    {'code': '515030', 'name': '新能源车ETF'},
+    {'code': '159995', 'name': '芯片ETF'},
+    {'code': '512660', 'name': '军工ETF'},
+    {'code': '159206', 'name': '卫星ETF'},
+    {'code': '518880', 'name': '黄金ETF'},
+    {'code': '512880', 'name': '证券ETF'},
+    {'code': '515070', 'name': '人工智能AIETF'},
+    {'code': '562500', 'name': '机器人ETF'},
+]
+
+
+class TestCandidateIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = CandidateIndex(ETFS, lambda etf: etf['name'])
+
+    def codes(self, tweet, top_k=3):
+        return [etf['code'] for etf in self.index.search(tweet, top_k)]
+
+    def test_tokenize_bigrams_and_words(self):
+        self.assertEqual(tokenize('人工智能AI ETF'), ['ai', 'etf', '人工', '工智', '智能'])
+
+    def test_expansion_matches_whole_words(self):
+        self.assertIn('人工智能', expand_query('Grok is the best AI.'))
+        self.assertNotIn('人工智能', expand_query('I said, wait'))
+
+    def test_english_tweet_finds_chinese_etf(self):
+        self.assertEqual(self.codes('Tesla deliveries hit a record', 1), ['515030'])
+        self.assertIn('159206', self.codes('Starlink is now in 100 countries'))
+        self.assertIn('562500', self.codes('Optimus will be huge'))
+
+    def test_chinese_tweet(self):
+        self.assertEqual(self.codes('黄金价格创新高', 1), ['518880'])
+
+    def test_unrelated_tweet_returns_nothing(self):
+        self.assertEqual(self.codes('Wow'), [])
+
+    def test_shortlist_falls_back_to_full_list(self):
+        for tweet in ('Nuclear power is the future', 'Argentina economy is booming'):
+            self.assertEqual(self.index.shortlist(tweet, 3), ETFS)
+
+    def test_shortlist_is_padded_to_top_k(self):
+        codes = [etf['code'] for etf in self.index.shortlist('黄金价格创新高', 3)]
+        self.assertEqual(codes, ['518880', '515030', '159995'])
+
+
+class TestBoardIndex(unittest.TestCase):
+    BOARDS = [{'板块名称': name} for name in ['汽车整车', '半导体', '航天航空', '银行', '脑机接口', '小米汽车']]
+
+    def search(self, tweet, members=None, top_k=2):
+        members = members or {}
+        texts = {b['板块名称']: board_text(b['板块名称'], members.get(b['板块名称'], ())) for b in self.BOARDS}
+        index = CandidateIndex(self.BOARDS, lambda b: texts[b['板块名称']])
+        return [b['板块名称'] for b in index.search(tweet, top_k)]
+
+    def test_synonyms_reach_jargon_names(self):
+        self.assertEqual(self.search('Neuralink update', top_k=1), ['脑机接口'])
+        self.assertIn('半导体', self.search('We ordered more Nvidia GPUs'))
+
+    def test_member_stocks_add_signal(self):
+        self.assertEqual(self.search('比亚迪销量', top_k=1), [])
+        self.assertEqual(self.search('比亚迪销量', {'汽车整车': ['比亚迪', '长城汽车']}, top_k=1), ['汽车整车'])
+
+
+class TestShortlistBoards(unittest.TestCase):
+    SECTORS = [{'板块名称': name} for name in ['汽车整车', '半导体', '航天航空', '银行']]
+    CONCEPTS = [{'板块名称': name} for name in ['脑机接口', '小米汽车', '特斯拉']]
+
+    def setUp(self):
+        from src.sector_data import SectorData
+        with mock.patch('src.sector_data.get_cache_manager'):
+            self.sector_data = SectorData(use_member_stocks=False)
+
+    def names(self, boards):
+        return [b['板块名称'] for b in boards]
+
+    def test_padded_to_top_k(self):
+        sectors, concepts = self.sector_data.shortlist_boards('Neuralink update', self.SECTORS, self.CONCEPTS, 2, 2)
+        self.assertEqual(self.names(concepts), ['脑机接口', '小米汽车'])
+
+    def test_no_match_sends_full_lists(self):
+        sectors, concepts = self.sector_data.shortlist_boards('Nuclear power is the future',
+                                                              self.SECTORS, self.CONCEPTS, 2, 2)
+        self.assertEqual(sectors, self.SECTORS)
+        self.assertEqual(concepts, self.CONCEPTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from src.entity_resolver import EntityIndex, EntityResolver, core_name, edit_distance, normalize_name
+
+ETFS = [
+    {'code': '515030', 'name': '新能源车ETF'},
+    {'code': '512660', 'name': '军工ETF'},
+    {'code': '159206', 'name': '卫星ETF'},
+]
+SECTORS = [{'板块名称': name} for name in ['半导体', '半导体设备', '汽车整车', '通信设备', '电池']]
+CONCEPTS = [{'板块名称': name} for name in ['星链概念', '人形机器人', 'AI芯片', '固态电池', '锂电池']]
+
+
+class TestEntityResolver(unittest.TestCase):
+    def setUp(self):
+        self.resolver = EntityResolver(ETFS, SECTORS, CONCEPTS)
+
+    def test_normalization(self):
+        self.assertEqual(normalize_name('ＡＩ 芯片（概念）'), 'ai芯片概念')
+        self.assertEqual(core_name('半导体概念板块'), '半导体')
+        self.assertEqual(core_name('概念'), '概念')
+        self.assertEqual(edit_distance('锂电', '锂电池'), 1)
+
+    def test_etf_code_formats(self):
+        self.assertEqual(
+            self.resolver.etf_codes(['159206', 512660, '１５９２０６', 'SZ159206', '515030.SH', '新能源车']),
+            ['159206', '512660', '515030']
+        )
+        self.assertEqual(self.resolver.etf_codes(['999999', '']), [])
+
+    def test_suffix_variants_prefer_bare_core(self):
+        self.assertEqual(self.resolver.sectors(['半导体概念', '半导体设备行业', '电池板块']),
+                         ['半导体', '半导体设备', '电池'])
+        self.assertEqual(self.resolver.concepts(['星链', 'ai芯片']), ['星链概念', 'AI芯片'])
+
+    def test_fuzzy_near_miss(self):
+        self.assertEqual(self.resolver.resolve_board('concept', '人型机器人'), '人形机器人')
+        self.assertEqual(self.resolver.resolve_board('sector', '汽车整车制造'), '汽车整车')
+
+    def test_unknown_and_ambiguous_are_dropped(self):
+        self.assertEqual(self.resolver.sectors(['航空航天', '不存在的行业']), [])
+        index = EntityIndex(['风电设备', '水电设备'])
+        self.assertIsNone(index.resolve('核电设备'))
+
+
+if __name__ == '__main__':
+    unittest.main()
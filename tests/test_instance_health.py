@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from src.instance_health import InstanceHealthRegistry
+
+
+class TestInstanceHealth(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'instance_health.json')
+        self.registry = InstanceHealthRegistry(path=self.path, probe_rate=0)
+
+    def test_fastest_healthy_first(self):
+        for _ in range(5):
+            self.registry.record_success('https://slow', 2000, 'rss')
+            self.registry.record_success('https://fast', 300, 'rss')
+        order = self.registry.order_instances(['https://slow', 'https://fast'], 'rss')
+        self.assertEqual(order, ['https://fast', 'https://slow'])
+
+    def test_failing_instance_goes_last(self):
+        self.registry.record_success('https://a', 300, 'rss')
+        self.registry.record_failure('https://a', 'timeout')
+        order = self.registry.order_instances(['https://a', 'https://b'], 'rss')
+        self.assertEqual(order, ['https://b', 'https://a'])
+
+    def test_cooldown_expiry_probes_instance_again(self):
+        self.registry.base_cooldown = 0
+        self.registry.record_failure('https://a', 'timeout')
+        order = self.registry.order_instances(['https://a'], 'rss')
+        self.assertEqual(order, ['https://a'])
+        self.assertFalse(self.registry.get_stats()['https://a']['cooling_down'])
+
+    def test_adaptive_timeout(self):
+        self.assertEqual(self.registry.timeout_for('https://a', 'rss'), self.registry.max_timeout)
+        for _ in range(10):
+            self.registry.record_success('https://a', 200, 'rss')
+        self.assertEqual(self.registry.timeout_for('https://a', 'rss'), self.registry.min_timeout)
+
+    def test_shared_between_processes(self):
+        self.registry.record_failure('https://a', 'HTTP 429', rate_limited=True)
+        other = InstanceHealthRegistry(path=self.path, probe_rate=0)
+        stats = other.get_stats()['https://a']
+        self.assertEqual(stats['rate_limited'], 1)
+        self.assertTrue(stats['cooling_down'])
+
+
+if __name__ == '__main__':
+    unittest.main()
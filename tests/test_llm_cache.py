@@ -0,0 +1,55 @@
+import os
+import time
+import tempfile
+import unittest
+from src.llm_cache import LLMResponseCache, make_key
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'llm_cache.db')
+        self.cache = LLMResponseCache(path=self.path, max_size=2, ttl=60)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.put('a', ['summary', ['159123']])
+        self.assertEqual(self.cache.get('a'), ['summary', ['159123']])
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_key_ignores_case_spacing_and_links(self):
+        a = make_key('etfs', 'Tesla  is great https://t.co/abc', 1, 'deepseek-chat', 'v1')
+        b = make_key('etfs', 'tesla is great', 1, 'deepseek-chat', 'v1')
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, make_key('etfs', 'tesla is great', 2, 'deepseek-chat', 'v1'))
+        self.assertNotEqual(a, make_key('etfs', 'tesla is great', 1, 'deepseek-chat', 'v2'))
+
+    def test_least_recently_used_evicted(self):
+        self.cache.put('a', 1)
+        time.sleep(0.01)
+        self.cache.put('b', 2)
+        time.sleep(0.01)
+        self.cache.get('a')
+        time.sleep(0.01)
+        self.cache.put('c', 3)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_expired_entry_is_a_miss(self):
+        self.cache.put('a', 1)
+        self.cache.ttl = 0
+        time.sleep(0.01)
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_shared_between_processes(self):
+        self.cache.put('a', {'sectors': ['半导体'], 'concepts': []})
+        other = LLMResponseCache(path=self.path)
+        self.assertEqual(other.get('a'), {'sectors': ['半导体'], 'concepts': []})
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
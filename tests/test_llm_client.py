@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from src.llm_client import AsyncLLMClient, LLMDeadlineExceeded
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeCompletions:
+    """Plays back a script of (delay seconds, result or exception) per call."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        delay, result = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make_client(script, **kwargs):
+    completions = FakeCompletions(script)
+
+    async def close():
+        pass
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=completions), close=close)
+    kwargs.setdefault('backoff', 0.01)
+    return AsyncLLMClient(client=fake, **kwargs), completions
+
+
+class TestAsyncLLMClient(unittest.TestCase):
+    def tearDown(self):
+        self.client.close()
+
+    def test_retries_rate_limit_and_server_errors(self):
+        self.client, completions = make_client([(0, StatusError(429)), (0, StatusError(503)), (0, 'ok')])
+        self.assertEqual(self.client.create(model='m', messages=[]), 'ok')
+        self.assertEqual(completions.calls, 3)
+        self.assertEqual(self.client.metrics.get_stats()['retries'], 2)
+
+    def test_latency_excludes_backoff(self):
+        self.client, _ = make_client([(0, StatusError(503)), (0, 'ok')], backoff=0.2)
+        self.client.create(model='m', messages=[])
+        self.assertLess(self.client.metrics.get_stats()['max_ms'], 50)
+
+    def test_client_errors_are_not_retried(self):
+        self.client, completions = make_client([(0, StatusError(400)), (0, 'ok')])
+        with self.assertRaises(StatusError):
+            self.client.create(model='m', messages=[])
+        self.assertEqual(completions.calls, 1)
+        self.assertEqual(self.client.metrics.get_stats()['failures'], 1)
+
+    def test_deadline(self):
+        self.client, _ = make_client([(1.0, 'late')], deadline=0.05)
+        with self.assertRaises(LLMDeadlineExceeded):
+            self.client.create(model='m', messages=[])
+        self.assertEqual(self.client.metrics.get_stats()['deadline_exceeded'], 1)
+
+    def test_hedged_request_wins_over_slow_one(self):
+        self.client, completions = make_client([(1.0, 'slow'), (0, 'fast')], hedge=True, hedge_min_delay=0.05)
+        self.assertEqual(self.client.create(model='m', messages=[]), 'fast')
+        stats = self.client.metrics.get_stats()
+        self.assertEqual((stats['hedges'], stats['hedge_wins']), (1, 1))
+        self.assertEqual(completions.calls, 2)
+
+    def test_concurrency_is_bounded(self):
+        self.client, completions = make_client([(0.05, 'ok')], concurrency=2)
+        active, peak = [0], [0]
+        create = completions.create
+
+        async def tracked(**kwargs):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            try:
+                return await create(**kwargs)
+            finally:
+                active[0] -= 1
+        completions.create = tracked
+
+        async def run_all():
+            return await asyncio.gather(*(self.client.acreate(model='m', messages=[]) for _ in range(6)))
+
+        self.assertEqual(self.client.run(run_all()), ['ok'] * 6)
+        self.assertEqual(peak[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from src.llm_json import (
+    LLMJSONError, extract_json_object, parse_json_reply, validate, COMBINED_SCHEMA, ETFS_SCHEMA
+)
+
+
+class TestLLMJSON(unittest.TestCase):
+    def test_extract_from_fences_and_prose(self):
+        text = 'Here you go {see below}:\n```json\n{"summary": "a}b", "etf_codes": ["159206"]}\n```\nHope it helps'
+        self.assertEqual(extract_json_object(text), '{"summary": "a}b", "etf_codes": ["159206"]}')
+
+    def test_extract_skips_stray_brace(self):
+        self.assertEqual(extract_json_object('{ oops {"a": 1}'), '{"a": 1}')
+        self.assertIsNone(extract_json_object('{"a": 1'))
+        self.assertIsNone(extract_json_object('no json here'))
+
+    def test_nested_fragments_of_broken_object_are_not_returned(self):
+        text = '{"results": [{"id": 1, "summary": "x"},, ]}'
+        self.assertEqual(extract_json_object(text), text)
+        with self.assertRaises(LLMJSONError):
+            parse_json_reply(text)
+
+    def test_schema(self):
+        reply = {'etf_codes': [159206, '512660'], 'sectors': [], 'concepts': ['卫星导航'], 'summary': 'x'}
+        self.assertEqual(validate(reply, COMBINED_SCHEMA), [])
+        self.assertEqual(validate({'summary': 1}, ETFS_SCHEMA), ["'summary' must be str", "missing key 'etf_codes'"])
+        self.assertEqual(validate({'summary': '', 'etf_codes': [{'code': 1}]}, ETFS_SCHEMA),
+                         ["'etf_codes' must be a list of strings"])
+        self.assertEqual(validate([], ETFS_SCHEMA), ['expected an object, got list'])
+
+    def test_parse(self):
+        self.assertEqual(parse_json_reply('```json\n{"summary": "s", "etf_codes": []}\n```', ETFS_SCHEMA),
+                         {'summary': 's', 'etf_codes': []})
+        # Omitted keys default to empty values, wrong types are errors
+        self.assertEqual(parse_json_reply('{"etf_codes": ["159206"]}', COMBINED_SCHEMA),
+                         {'etf_codes': ['159206'], 'sectors': [], 'concepts': [], 'summary': ''})
+        with self.assertRaises(LLMJSONError):
+            parse_json_reply('{"summary": "s", "etf_codes": "159206"}', ETFS_SCHEMA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.llm_metrics import LLMMetrics, LatencyHistogram, format_report, load_ledger, summarize, usage_tokens
+
+
+def deepseek_usage(prompt, hit, completion):
+    return SimpleNamespace(prompt_tokens=prompt, prompt_cache_hit_tokens=hit, completion_tokens=completion)
+
+
+class TestLLMMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ledger = os.path.join(self.tmp.name, 'ledger.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_usage_tokens(self):
+        self.assertEqual(usage_tokens(deepseek_usage(100, 64, 20)), (100, 64, 20))
+        openai_usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20,
+                                       prompt_tokens_details=SimpleNamespace(cached_tokens=32))
+        self.assertEqual(usage_tokens(openai_usage), (100, 32, 20))
+        self.assertEqual(usage_tokens(None), (0, 0, 0))
+
+    def test_histogram(self):
+        hist = LatencyHistogram(buckets=(100, 1000))
+        for ms in (50, 60, 500, 5000):
+            hist.observe(ms)
+        self.assertEqual(hist.counts, [2, 1, 1])
+        self.assertEqual(hist.quantile(0.5), 100)
+        self.assertEqual(hist.quantile(0.75), 1000)
+        self.assertEqual(hist.quantile(1.0), float('inf'))
+
+    def test_ledger_and_window(self):
+        metrics = LLMMetrics(ledger_path=self.ledger, window=60)
+        with mock.patch('src.llm_metrics.time.time', return_value=1000.0):
+            metrics.record('combined', 'deepseek-chat', 1200, deepseek_usage(1000, 800, 50), ttft_ms=300)
+        with mock.patch('src.llm_metrics.time.time', return_value=1100.0):
+            metrics.record('summary', 'deepseek-chat', 400, deepseek_usage(100, 0, 30))
+            metrics.record('summary', 'deepseek-chat', 9000, ok=False)
+
+        # The rolling window dropped the call from 100s ago
+        summary = metrics.summary()
+        self.assertEqual(list(summary), ['summary'])
+        self.assertEqual((summary['summary']['calls'], summary['summary']['errors']), (2, 1))
+
+        records = load_ledger(self.ledger)
+        self.assertEqual([r['type'] for r in records], ['combined', 'summary', 'summary'])
+        self.assertEqual(records[0]['cached_tokens'], 800)
+        self.assertEqual(records[0]['ttft_ms'], 300)
+        self.assertEqual(len(load_ledger(self.ledger, since=1050)), 2)
+
+        report = format_report(records, 24, prices={'prompt': 1.0, 'cached': 0.0, 'completion': 0.0})
+        self.assertIn('[combined] 1 calls, 0 errors, cost 0.0002', report)
+        self.assertIn('time to first token', report)
+
+    def test_cost_per_model(self):
+        records = [{'type': 'combined', 'model': model, 'prompt_tokens': 1000000, 'cached_tokens': 0,
+                    'completion_tokens': 0, 'wall_ms': 100} for model in ('deepseek-chat', 'backup')]
+        prices = {'prompt': 2.0, 'models': {'backup': {'prompt': 10.0}}}
+        summary = summarize(records, prices)['combined']
+        self.assertEqual(summary['cost_by_model'], {'deepseek-chat': 2.0, 'backup': 10.0})
+        self.assertEqual(summary['cost'], 12.0)
+        self.assertIn('cost by model: backup 10.0000, deepseek-chat 2.0000', format_report(records, 1, prices))
+
+    def test_missing_ledger(self):
+        self.assertEqual(load_ledger(os.path.join(self.tmp.name, 'missing.jsonl'), since=time.time()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from src.analyzer import ETFAnalyzer, combined_catalogue
+from src.llm_cache import LLMResponseCache
+from src.llm_router import LLMRouter, Provider
+from src.llm_client import LLMDeadlineExceeded
+from src.llm_metrics import LLMMetrics
+from tests.mock_llm_server import MockLLMServer
+
+
+class TestLLMRouter(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+        self.router = None
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def tearDown(self):
+        if self.router is not None:
+            self.router.close()
+        for server in self.servers:
+            server.stop()
+
+    def make_router(self, specs, **kwargs):
+        """specs: (name, server kwargs, provider kwargs) per provider."""
+        providers = []
+        for name, server_kwargs, provider_kwargs in specs:
+            server = MockLLMServer(seed=0, **server_kwargs).start()
+            self.servers.append(server)
+            providers.append(Provider(name, f"{name}-model", base_url=server.url, api_key='test', **provider_kwargs))
+        kwargs.setdefault('explore', 0)
+        self.router = LLMRouter(providers, **kwargs)
+        return self.servers
+
+    def ask(self):
+        response = self.router.create(model='ignored', messages=[{'role': 'user', 'content': 'hi'}])
+        return response.model
+
+    def test_routes_to_fastest_provider(self):
+        slow, fast = self.make_router([('slow', {'latency': 0.15}, {}), ('fast', {'latency': 0.0}, {})],
+                                      prior_latency=0.0)
+        self.ask()
+        self.ask()
+        # Both measured once (unknown providers look fast), then only the fast one is used
+        self.assertEqual([self.ask() for _ in range(5)], ['fast-model'] * 5)
+        self.assertEqual(slow.requests, 1)
+
+    def test_weight_prefers_provider_while_unmeasured(self):
+        self.make_router([('a', {}, {'weight': 1.0}), ('b', {}, {'weight': 3.0})])
+        self.assertEqual(self.ask(), 'b-model')
+
+    def test_fails_over_on_server_error_and_cools_down(self):
+        broken, backup = self.make_router([('primary', {'error_rate': 1.0, 'error_status': 503}, {}),
+                                           ('backup', {}, {})], cooldown=60)
+        self.assertEqual(self.ask(), 'backup-model')
+        self.assertEqual(self.ask(), 'backup-model')
+        self.assertEqual(broken.requests, 1)
+        self.assertEqual(self.router.metrics.get_stats()['failovers'], 1)
+        self.assertTrue(self.router.get_stats()['primary']['cooling_down'])
+        self.assertEqual(self.router.served_model(), 'backup-model')
+
+    def test_retry_waits_for_cooldown(self):
+        broken, = self.make_router([('only', {'error_rate': 1.0, 'error_status': 503}, {})], cooldown=0.2)
+        start = time.perf_counter()
+        with self.assertRaises(Exception):
+            self.ask()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+        self.assertEqual(broken.requests, 2)
+
+    def test_fails_over_on_timeout(self):
+        self.make_router([('hung', {'hang': True}, {'timeout': 0.2}), ('ok', {}, {})])
+        self.assertEqual(self.ask(), 'ok-model')
+
+    def test_deadline(self):
+        self.make_router([('hung', {'hang': True}, {'timeout': 5}), ('hung2', {'hang': True}, {'timeout': 5})],
+                         deadline=0.3)
+        with self.assertRaises(LLMDeadlineExceeded):
+            self.ask()
+        self.assertEqual(self.router.metrics.get_stats()['deadline_exceeded'], 1)
+
+    def test_stream(self):
+        self.make_router([('down', {'error_rate': 1.0}, {}), ('up', {}, {})])
+        parts = []
+        text, usage = self.router.stream(parts.append, model='ignored', messages=[{'role': 'user', 'content': 'hi'}],
+                                         stream_options={'include_usage': True})
+        self.assertEqual(''.join(parts), text)
+        self.assertEqual(text, self.servers[1].reply)
+        self.assertGreater(usage.completion_tokens, 0)
+
+
+    def test_analyzer_records_and_caches_answering_model(self):
+        self.make_router([('primary', {'error_rate': 1.0, 'error_status': 503}, {}), ('backup', {}, {})],
+                         cooldown=60)
+        cache = LLMResponseCache(os.path.join(self.tmp.name, 'cache.db'))
+        with mock.patch('src.analyzer.load_config', return_value={'llm_config': {'model': 'primary-model'}}), \
+                mock.patch('src.analyzer.get_llm_cache', return_value=cache), \
+                mock.patch('src.analyzer.get_llm_router', return_value=self.router), \
+                mock.patch('src.analyzer.get_llm_metrics', return_value=LLMMetrics(ledger_path=None)), \
+                mock.patch('src.analyzer.OpenAI'):
+            analyzer = ETFAnalyzer()
+        etfs = [{'code': '515030', 'name': '新能源车ETF'}]
+        analysis = analyzer.analyze_combined('Tesla', etfs, [], [])
+        self.assertEqual(analysis['etf_codes'], ['515030'])
+        self.assertEqual([r['model'] for r in analyzer.metrics.records if 'model' in r], ['backup-model'])
+        # Stored under the backup's model; found again by a lookup over the router's models
+        key = analyzer._cache_key('combined', 'Tesla', combined_catalogue(etfs, [], []), 'backup-model')
+        self.assertIsNotNone(cache.get(key))
+        requests = sum(server.requests for server in self.servers)
+        self.assertEqual(analyzer.analyze_combined('Tesla', etfs, [], []), analysis)
+        self.assertEqual(sum(server.requests for server in self.servers), requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+from src.monitor import MultiAccountMonitor, RSSUnavailableError, TwitterMonitor, _strip_title_prefix
+from src.reply_context import ReplyContextResolver
+from src.timeline_cache import TimelineValidatorCache
+from src.tweet_store import ProcessedTweetStore
+
+
+class FakePage:
+    def __init__(self, parent, delay=0.0):
+        self.parent = parent
+        self.delay = delay
+        self.timeouts = []
+
+    def goto(self, url, wait_until=None, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+
+    def wait_for_selector(self, selector, timeout=None):
+        self.timeouts.append(timeout)
+
+    def evaluate(self, script, *args):
+        return self.parent
+
+    def close(self):
+        pass
+
+
+class FakeBrowserManager:
+    def __init__(self, page):
+        self.page = page
+        self.pages = 0
+
+    def new_context(self, first_party=None):
+        return mock.Mock()
+
+    def new_page(self, context):
+        self.pages += 1
+        return self.page
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def make_monitor(page, deadline=15, watermark=None, accounts=None, watermarks=None):
+    """TwitterMonitor for elonmusk, or a MultiAccountMonitor when accounts are given."""
+    tmp = tempfile.mkdtemp()
+    store = ProcessedTweetStore(os.path.join(tmp, 'tweets.db'), legacy_file=os.path.join(tmp, 'none.json'))
+    watermarks = dict(watermarks or {})
+    if watermark is not None:
+        watermarks['elonmusk'] = watermark
+    for account, value in watermarks.items():
+        store.set_watermark(account, value)
+    resolver = ReplyContextResolver(deadline=deadline, cache_path=None)
+    with mock.patch('src.monitor.load_config', return_value={'nitter_instances': ['https://n.example']}), \
+            mock.patch('src.monitor.get_tweet_store', return_value=store), \
+            mock.patch('src.monitor.get_reply_resolver', return_value=resolver), \
+            mock.patch('src.monitor.get_validator_cache'), \
+            mock.patch('src.monitor.get_health_registry'):
+        if accounts:
+            return MultiAccountMonitor(accounts, browser_manager=FakeBrowserManager(page))
+        return TwitterMonitor('elonmusk', browser_manager=FakeBrowserManager(page))
+
+
+def rss_response(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return SimpleNamespace(content=f.read(), headers={'Content-Type': 'application/rss+xml; charset=utf-8'})
+
+
+def entry(tweet_id, is_reply=False, **flags):
+    return {'id': str(tweet_id), 'href': f'/elonmusk/status/{tweet_id}#m', 'text': f'tweet {tweet_id}',
+            'published_raw': 'Unknown time', 'is_reply': is_reply, 'author': '@elonmusk', **flags}
+
+
+class TestReplyFallback(unittest.TestCase):
+    def test_browser_result_is_cached(self):
+        monitor = make_monitor(FakePage({'id': '100', 'text': 'parent text'}))
+        failed = [('200', 'https://n.example/elonmusk/status/200#m')]
+        with mock.patch.object(monitor, '_resolve_reply_contexts', return_value=({'200': None}, failed, time.monotonic() + 5)):
+            tweets = monitor._process_entries([entry(200, is_reply=True)], 'https://n.example')
+        self.assertEqual(tweets, [])  # first poll only sets the watermark
+        self.assertEqual(monitor.reply_resolver.resolve(failed), {'200': 'parent text'})
+
+    def test_fallback_stops_at_deadline(self):
+        page = FakePage({'id': '100', 'text': 'parent'}, delay=0.1)
+        monitor = make_monitor(page, watermark=1)
+        failed = [(str(i), f'https://n.example/elonmusk/status/{i}#m') for i in (201, 202, 203)]
+        deadline_at = time.monotonic() + 0.15
+        with mock.patch.object(monitor, '_resolve_reply_contexts',
+                               return_value=({i: None for i, _ in failed}, failed, deadline_at)):
+            monitor._process_entries([entry(i, is_reply=True) for i in (203, 202, 201)], 'https://n.example')
+        self.assertEqual(monitor.browser_manager.pages, 2)
+        self.assertTrue(all(t <= 150 for t in page.timeouts))
+
+
+class TestWatermark(unittest.TestCase):
+    def test_first_poll_of_pinned_and_retweets_sets_watermark(self):
+        monitor = make_monitor(FakePage(None))
+        entries = [entry(300, is_pinned=True), entry(250, is_retweet=True)]
+        self.assertEqual(monitor._process_entries(entries, 'https://n.example'), [])
+        self.assertEqual(monitor.watermark, 300)
+        self.assertFalse(monitor.is_first_run)
+
+    def test_new_tweet_after_watermark(self):
+        monitor = make_monitor(FakePage(None), watermark=300)
+        tweets = monitor._process_entries([entry(301), entry(300)], 'https://n.example')
+        self.assertEqual([t['id'] for t in tweets], ['301'])
+        self.assertEqual(monitor.watermark, 301)
+
+    def test_new_pinned_tweet_is_returned_once(self):
+        monitor = make_monitor(FakePage(None), watermark=300)
+        entries = [entry(310, is_pinned=True), entry(310), entry(305), entry(300)]
+        tweets = monitor._process_entries(entries, 'https://n.example')
+        self.assertEqual([t['id'] for t in tweets], ['310', '305'])
+
+
+class TestRSS(unittest.TestCase):
+    def test_strip_title_prefix(self):
+        self.assertEqual(_strip_title_prefix('R to @Tesla: Yes: FSD v14'), 'Yes: FSD v14')
+        self.assertEqual(_strip_title_prefix('RT by @elonmusk: Liftoff'), 'Liftoff')
+        self.assertEqual(_strip_title_prefix('Note to self: tariffs'), 'Note to self: tariffs')
+        self.assertEqual(_strip_title_prefix('R to @Tesla'), 'R to @Tesla')
+
+    def test_parse_feed(self):
+        monitor = make_monitor(FakePage(None))
+        entries = monitor._parse_rss_entries(rss_response('nitter_elonmusk.rss'), 'https://n.example')
+        # The non-status link is dropped
+        self.assertEqual([e['id'] for e in entries],
+                         ['1845300000000000400', '1845300000000000300', '1845300000000000200'])
+        retweet, reply, tweet = entries
+        self.assertEqual((retweet['text'], retweet['is_retweet'], retweet['is_reply'], retweet['author']),
+                         ('Starship flight 12 lifts off at 7:00', True, False, '@SpaceX'))
+        self.assertEqual(retweet['href'], '/SpaceX/status/1845300000000000400#m')
+        self.assertEqual((reply['text'], reply['is_reply'], reply['is_retweet']),
+                         ('Yes: FSD v14 ships next month', True, False))
+        self.assertEqual((tweet['text'], tweet['is_reply'], tweet['is_retweet'], tweet['is_pinned']),
+                         ('Note to self: tariffs are bad for everyone', False, False, False))
+        self.assertEqual(tweet['href'], '/elonmusk/status/1845300000000000200/')
+        self.assertEqual(tweet['published_raw'], 'Tue, 13 Oct 2026 06:20:00 GMT')
+
+    def test_parse_respects_max_items(self):
+        monitor = make_monitor(FakePage(None))
+        monitor.max_items = 2
+        entries = monitor._parse_rss_entries(rss_response('nitter_elonmusk.rss'), 'https://n.example')
+        self.assertEqual(len(entries), 2)
+
+    def test_html_response_is_not_a_feed(self):
+        monitor = make_monitor(FakePage(None))
+        resp = SimpleNamespace(content=b'<html><body>Instance has been rate limited.</body></html>',
+                               headers={'Content-Type': 'text/html'})
+        with self.assertRaises(RSSUnavailableError):
+            monitor._parse_rss_entries(resp, 'https://n.example')
+
+
+class TestValidators(unittest.TestCase):
+    def setUp(self):
+        self.monitor = make_monitor(FakePage(None))
+        self.monitor.validators = TimelineValidatorCache(os.path.join(tempfile.mkdtemp(), 'validators.json'))
+        self.monitor.health = mock.Mock(**{'timeout_for.return_value': 5000})
+
+    def poll_rss(self, status_code, content=b'', etag=None):
+        headers = {'Content-Type': 'application/rss+xml; charset=utf-8'}
+        if etag:
+            headers['ETag'] = etag
+        resp = SimpleNamespace(status_code=status_code, content=content, headers=headers)
+        with mock.patch('src.monitor._http.get', return_value=resp) as get, \
+                mock.patch.object(self.monitor, '_parse_rss_entries', wraps=self.monitor._parse_rss_entries) as parse:
+            tweets = self.monitor._fetch_rss('https://n.example')
+        return tweets, get.call_args.kwargs['headers'], parse.called
+
+    def test_rss_not_modified(self):
+        feed = rss_response('nitter_elonmusk.rss').content
+        # First poll ignores validators and stores the ETag
+        self.assertEqual(self.poll_rss(200, feed, etag='"v1"'), ([], {}, True))
+        self.assertEqual(self.monitor.watermark, 1845300000000000300)
+
+        tweets, headers, parsed = self.poll_rss(304)
+        self.assertEqual((tweets, parsed), ([], False))
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(self.monitor.validators.get_stats()['not_modified'], 1)
+
+    def test_rss_same_digest(self):
+        feed = rss_response('nitter_elonmusk.rss').content
+        self.poll_rss(200, feed)
+        self.assertEqual(self.poll_rss(200, feed), ([], {}, False))
+        self.assertEqual(self.monitor.validators.get_stats()['hash_hits'], 1)
+
+        changed = feed.replace(b'Note to self', b'Reminder')
+        self.assertEqual(self.poll_rss(200, changed)[2], True)
+
+    def test_browser_timeline_same_digest(self):
+        items = [{'id': str(i), 'href': f'/elonmusk/status/{i}#m', 'text': f'tweet {i}', 'date_title': '',
+                  'is_reply': False, 'author': '@elonmusk'} for i in (310, 305)]
+        self.monitor.browser_manager.page.parent = items
+        self.assertEqual(self.monitor._fetch_browser('https://n.example'), [])
+        with mock.patch.object(self.monitor, '_process_entries') as process:
+            self.assertEqual(self.monitor._fetch_browser('https://n.example'), [])
+        process.assert_not_called()
+        self.assertEqual(self.monitor.validators.get_stats()['hash_hits'], 1)
+
+
+class TestMultiAccount(unittest.TestCase):
+    def setUp(self):
+        # No network for replies: they go without parent context
+        patcher = mock.patch.object(TwitterMonitor, '_resolve_reply_contexts',
+                                    side_effect=lambda *args: ({}, [], time.monotonic() + 5))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rss_items_split_by_creator(self):
+        monitor = make_monitor(FakePage(None), accounts=['elonmusk', 'tesla'],
+                               watermarks={'elonmusk': 1, 'tesla': 1})
+        entries = monitor._parse_rss_entries(rss_response('nitter_combined.rss'), 'https://n.example')
+        self.assertEqual([e['author'] for e in entries], ['@Tesla', '@elonmusk', '@elonmusk'])
+        tweets = monitor._process_entries(entries, 'https://n.example')
+        by_author = {t['id']: t['author'] for t in tweets}
+        self.assertEqual(by_author, {'1845000000000000100': 'elonmusk', '1845000000000000200': 'elonmusk',
+                                     '1845000000000000300': 'tesla'})
+        self.assertEqual(monitor.monitors['tesla'].watermark, 1845000000000000300)
+
+    def test_unmonitored_author_is_skipped(self):
+        monitor = make_monitor(FakePage(None), accounts=['elonmusk', 'tesla'],
+                               watermarks={'elonmusk': 300, 'tesla': 300})
+        tweets = monitor._process_entries([entry(302, author='@someone'), entry(301)], 'https://n.example')
+        self.assertEqual([(t['id'], t['author']) for t in tweets], [('301', 'elonmusk')])
+
+    def test_account_missing_from_page_gets_watermark(self):
+        monitor = make_monitor(FakePage(None), accounts=['elonmusk', 'quiet'])
+        self.assertEqual(monitor._process_entries([entry(310), entry(305)], 'https://n.example'), [])
+        self.assertEqual(monitor.monitors['quiet'].watermark, 305)
+        self.assertFalse(monitor.is_first_run)
+
+        tweets = monitor._process_entries([entry(320, author='@quiet'), entry(310)], 'https://n.example')
+        self.assertEqual([(t['id'], t['author']) for t in tweets], [('320', 'quiet')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from src.relevance import RELEVANCE_TRAINING_FILE, RelevanceGate, RelevanceModel, lexicon_hits, load_labeled_tweets
+
+
+class TestRelevanceGate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp.name, 'model.npz')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lexicon(self):
+        self.assertIn('tesla', lexicon_hits('Tesla deliveries beat estimates'))
+        self.assertIn('$TSLA', lexicon_hits('$TSLA'))
+        self.assertIn('关税', lexicon_hits('美国加征关税'))
+        self.assertEqual(lexicon_hits('Good morning'), [])
+        # Whole words only
+        self.assertEqual(lexicon_hits('Fedora is great'), [])
+
+    def test_trivial_tweets_are_gated(self):
+        with self.assertLogs('Relevance', level='WARNING') as logs:
+            gate = RelevanceGate(mode='skip', model_path=self.model_path)
+        self.assertIn('--train', logs.output[0])
+        for text in ('Wow', '🔥🔥🔥', 'https://t.co/abc', '@someone Exactly'):
+            self.assertFalse(gate.check(text)[0], text)
+        self.assertTrue(gate.check('Tesla')[0])
+        # Longer text without a model passes through
+        self.assertEqual(gate.check('Free speech is the bedrock of democracy'), (True, 'no model'))
+        self.assertEqual(gate.stats, {'checked': 6, 'gated': 4})
+
+    def test_off_mode(self):
+        gate = RelevanceGate(mode='off', model_path=self.model_path)
+        self.assertTrue(gate.check('Wow')[0])
+        self.assertEqual(gate.stats['gated'], 0)
+
+    def test_model_train_save_load(self):
+        texts = ['rocket launch to orbit', 'battery factory output', 'chip supply shortage',
+                 'happy birthday friend', 'love this meme', 'what a great movie'] * 3
+        labels = [1, 1, 1, 0, 0, 0] * 3
+        model = RelevanceModel.train(texts, labels, dim=2 ** 12)
+        model.save(self.model_path)
+        loaded = RelevanceModel.load(self.model_path)
+        self.assertEqual(loaded.ngram_range, (2, 4))
+        self.assertAlmostEqual(loaded.score('rocket factory'), model.score('rocket factory'), places=5)
+        self.assertGreater(loaded.score('rocket launch to orbit'), 0.5)
+        self.assertLess(loaded.score('happy birthday friend'), 0.5)
+
+        gate = RelevanceGate(mode='summary_only', threshold=0.5, model_path=self.model_path)
+        self.assertFalse(gate.check('what a great movie')[0])
+
+    def test_labeled_set_ships_with_package(self):
+        # Training must work from the Docker image, which excludes tests/ and data/
+        self.assertEqual(os.path.basename(os.path.dirname(RELEVANCE_TRAINING_FILE)), 'src')
+        texts, labels = load_labeled_tweets()
+        self.assertEqual(len(texts), len(labels))
+        self.assertTrue(any(labels) and not all(labels))
+
+
+if __name__ == '__main__':
+    unittest.main()
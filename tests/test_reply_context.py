@@ -0,0 +1,97 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.reply_context import LRUTTLCache, ReplyContextResolver, parse_parent_tweet
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'nitter_status.html')
+
+
+class TestParseParentTweet(unittest.TestCase):
+    def test_parent_is_last_tweet_before_main(self):
+        with open(FIXTURE, 'r', encoding='utf-8') as f:
+            parent_id, parent_text, ancestors = parse_parent_tweet(f.read())
+        self.assertEqual(parent_id, '1879999999999999002')
+        self.assertEqual(parent_text, "Good luck on today's flight!\nWe'll be watching.")
+        self.assertEqual([a[0] for a in ancestors], ['1879999999999999001', '1879999999999999002'])
+        self.assertEqual(ancestors[0][1], 'Starship is go for launch & landing')
+
+    def test_no_parent(self):
+        html = '<div class="main-tweet"><div class="timeline-item"><a class="tweet-link" href="/a/status/1#m"></a></div></div>'
+        self.assertEqual(parse_parent_tweet(html), (None, '', []))
+
+
+class TestLRUTTLCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUTTLCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_expiry_and_persistence(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cache.json')
+        cache = LRUTTLCache(path, ttl=60)
+        cache.put('parent:1', 'text')
+        cache.save()
+        self.assertEqual(LRUTTLCache(path, ttl=60).get('parent:1'), 'text')
+
+        cache.ttl = 0
+        time.sleep(0.01)
+        self.assertIsNone(cache.get('parent:1'))
+
+    def test_per_entry_ttl(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cache.json')
+        cache = LRUTTLCache(path, ttl=60)
+        cache.put('reply:1', '', ttl=0.05)
+        cache.put('reply:2', '100')
+        cache.save()
+        reloaded = LRUTTLCache(path, ttl=60)
+        self.assertEqual((reloaded.get('reply:1'), reloaded.get('reply:2')), ('', '100'))
+        time.sleep(0.06)
+        self.assertIsNone(reloaded.get('reply:1'))
+        self.assertEqual(reloaded.get('reply:2'), '100')
+
+
+class TestReplyContextResolver(unittest.TestCase):
+    def make_resolver(self, html):
+        resolver = ReplyContextResolver(deadline=5, empty_ttl=0.05, cache_path=None)
+        self.addCleanup(resolver._executor.shutdown)
+        page = SimpleNamespace(text=html, raise_for_status=lambda: None)
+        patcher = mock.patch.object(resolver._http, 'get', return_value=page)
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        return resolver
+
+    def test_parent_is_cached(self):
+        with open(FIXTURE, 'r', encoding='utf-8') as f:
+            resolver = self.make_resolver(f.read())
+        replies = [('1879999999999999003', 'https://n.example/elonmusk/status/1879999999999999003#m')]
+        self.assertEqual(resolver.resolve(replies),
+                         {'1879999999999999003': "Good luck on today's flight!\nWe'll be watching."})
+        time.sleep(0.06)
+        resolver.resolve(replies)
+        self.assertEqual(self.get.call_count, 1)
+
+    def test_page_without_parent_is_cached_briefly(self):
+        resolver = self.make_resolver('<html><body>Loading...</body></html>')
+        replies = [('300', 'https://n.example/elonmusk/status/300#m')]
+        self.assertEqual(resolver.resolve(replies), {'300': ''})
+        self.assertEqual(resolver.resolve(replies), {'300': ''})
+        self.assertEqual(self.get.call_count, 1)
+
+        time.sleep(0.06)
+        resolver.resolve(replies)
+        self.assertEqual(self.get.call_count, 2)
+
+        resolver.remember('301', None, None)
+        time.sleep(0.06)
+        self.assertIsNone(resolver._cached('301'))
+
+
+if __name__ == '__main__':
+    unittest.main()
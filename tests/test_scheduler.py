@@ -0,0 +1,50 @@
+import random
+import unittest
+from src.scheduler import AdaptivePollScheduler
+
+
+class TestAdaptivePollScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = AdaptivePollScheduler(
+            ['busy', 'quiet'], base_interval=300, min_interval=60, max_interval=1800,
+            backoff=2, jitter=0, path=None, rng=random.Random(0)
+        )
+
+    def test_all_accounts_due_at_startup(self):
+        self.assertEqual(self.scheduler.due_accounts(), ['busy', 'quiet'])
+
+    def test_quiet_account_backs_off_to_max(self):
+        delays = [self.scheduler.record_poll('quiet', 0, now=1000 + i) for i in range(6)]
+        self.assertEqual(delays[:3], [600, 1200, 1800])
+        self.assertEqual(delays[-1], 1800)
+
+    def test_new_tweets_poll_fast_again(self):
+        for i in range(4):
+            self.scheduler.record_poll('busy', 0, now=1000 + i)
+        self.assertEqual(self.scheduler.record_poll('busy', 3, now=2000), 60)
+        self.assertNotIn('busy', self.scheduler.due_accounts(now=2059))
+        self.assertIn('busy', self.scheduler.due_accounts(now=2060))
+
+    def test_jitter_stays_within_bounds(self):
+        scheduler = AdaptivePollScheduler(['a'], min_interval=60, max_interval=1800, jitter=0.5,
+                                          path=None, rng=random.Random(1))
+        for i in range(50):
+            delay = scheduler.record_poll('a', i % 3 == 0, now=1000 + i)
+            self.assertGreaterEqual(delay, 60)
+            self.assertLessEqual(delay, 1800)
+
+    def test_record_polls_counts_by_author(self):
+        self.scheduler.record_polls(['busy', 'quiet'], [{'author': 'busy'}, {'author': 'busy'}], now=1000)
+        self.assertEqual(self.scheduler.accounts['busy']['interval'], 60)
+        self.assertEqual(self.scheduler.accounts['quiet']['interval'], 600)
+
+    def test_failed_poll_keeps_interval(self):
+        self.scheduler.record_poll('quiet', 0, now=1000)
+        self.scheduler.record_failure(['quiet'], now=2000)
+        self.assertEqual(self.scheduler.accounts['quiet']['interval'], 600)
+        self.assertEqual(self.scheduler.accounts['quiet']['next_poll'], 2600)
+        self.assertEqual(self.scheduler.stats['polls'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
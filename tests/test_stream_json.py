@@ -0,0 +1,47 @@
+import unittest
+from src.stream_json import IncrementalJSONScanner
+
+REPLY = '''```json
+{
+    "summary": "马斯克称\\"星舰\\"试飞成功",
+    "etf_codes": ["159206", 512660, "515030"],
+    "sectors": ["航天航空"],
+    "concepts": []
+}
+```'''
+
+
+class TestIncrementalJSONScanner(unittest.TestCase):
+    def test_items_reported_before_object_completes(self):
+        seen = []
+        scanner = IncrementalJSONScanner(on_item=lambda key, value: seen.append((key, value)))
+        cutoff = REPLY.index('"sectors"')
+        for ch in REPLY[:cutoff]:
+            scanner.feed(ch)
+        self.assertEqual(seen, [('etf_codes', '159206'), ('etf_codes', 512660), ('etf_codes', '515030')])
+        self.assertFalse(scanner.done)
+
+        scanner.feed(REPLY[cutoff:])
+        self.assertTrue(scanner.done)
+        self.assertEqual(seen[-1], ('sectors', '航天航空'))
+        self.assertEqual(scanner.fields['summary'], '马斯克称"星舰"试飞成功')
+        self.assertEqual(scanner.items, {'etf_codes': ['159206', 512660, '515030'], 'sectors': ['航天航空']})
+
+    def test_nested_values_are_not_items(self):
+        scanner = IncrementalJSONScanner()
+        scanner.feed('{"a": [{"b": "x"}, "y"], "n": 3}')
+        self.assertEqual(scanner.items, {'a': ['y']})
+        self.assertEqual(scanner.fields, {'n': 3})
+
+    def test_malformed_string_stops_scanning(self):
+        seen = []
+        scanner = IncrementalJSONScanner(on_item=lambda key, value: seen.append((key, value)))
+        # Literal newline inside a string value
+        scanner.feed('{"etf_codes": ["515030"], "summary": "line one\nline two", "sectors": ["汽车整车"]}')
+        self.assertEqual(seen, [('etf_codes', '515030')])
+        self.assertTrue(scanner.failed)
+        self.assertTrue(scanner.done)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import json
+import tempfile
+import unittest
+from src.tweet_store import ProcessedTweetStore
+
+
+class TestProcessedTweetStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'processed_tweets.db')
+        self.store = ProcessedTweetStore(path=self.path, keep=3, compact_every=1, legacy_file=None)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_add_and_filter(self):
+        self.store.add('elonmusk', ['1', '2'])
+        self.assertTrue(self.store.contains('elonmusk', '1'))
+        self.assertFalse(self.store.contains('realDonaldTrump', '1'))
+        self.assertEqual(self.store.filter_new('elonmusk', ['1', '2', '3']), {'3'})
+
+    def test_retention_keeps_numerically_newest(self):
+        # "999..." would sort after "1880..." as a string
+        ids = ['999999999999999999', '1880000000000000001', '1880000000000000002', '1880000000000000003']
+        self.store.add('elonmusk', ids)
+        self.assertEqual(self.store.count('elonmusk'), 3)
+        self.assertFalse(self.store.contains('elonmusk', '999999999999999999'))
+        self.assertTrue(self.store.contains('elonmusk', '1880000000000000001'))
+
+    def test_watermark_only_moves_forward(self):
+        self.assertIsNone(self.store.get_watermark('elonmusk'))
+        self.store.set_watermark('elonmusk', '1880000000000000002')
+        self.store.set_watermark('elonmusk', '999999999999999999')
+        self.assertEqual(self.store.get_watermark('elonmusk'), 1880000000000000002)
+
+    def test_watermark_seeded_from_processed_ids(self):
+        self.store.add('elonmusk', ['1880000000000000001', '1880000000000000002'])
+        self.assertEqual(self.store.get_watermark('elonmusk'), 1880000000000000002)
+
+    def test_shared_between_processes(self):
+        self.store.add('elonmusk', ['1'])
+        other = ProcessedTweetStore(path=self.path, legacy_file=None)
+        self.assertTrue(other.contains('elonmusk', '1'))
+        other.close()
+
+    def test_migrates_legacy_json(self):
+        legacy = os.path.join(self.dir, 'processed_tweets.json')
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({'elonmusk': ['1', '2'], 'realDonaldTrump': ['3']}, f)
+
+        store = ProcessedTweetStore(path=os.path.join(self.dir, 'migrated.db'), legacy_file=legacy)
+        self.assertEqual(store.count('elonmusk'), 2)
+        self.assertTrue(store.contains('realDonaldTrump', '3'))
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(f"{legacy}.migrated"))
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()